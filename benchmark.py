@@ -0,0 +1,842 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+import misocp
+import misocp2
+import scenario
+import decompose
+import dispatch
+import multifeeder
+import oa
+import multiyear
+import montecarlo
+import stochastic
+import heuristic
+import export
+from powerflow import PowerFlow
+from profiler import Profiler, model_stats
+from synthetic import TEMPLATE_XLSX, make_feeder
+from solver import get_backend, OPTIMAL_STATUS
+
+PATH_PY = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_JSON = os.path.join(PATH_PY, 'config.json')
+
+def time_build(module, xlsx_file, json_file=TEMPLATE_JSON):
+    # misocp2: thoi gian tung buoc lay tu Profiler cua build(); misocp (ban cu, khong co build) do tung buoc define_*
+    timing = {}
+    t0 = time.perf_counter()
+    if hasattr(module.MISOCP, 'build'):
+        prof = Profiler()
+        opt = module.MISOCP(xlsx_file, json_file, profiler=prof)
+        timing['read'] = time.perf_counter() - t0
+        n = len(prof.phases)
+        opt.build()
+        timing.update({row['phase']: row['wall_time'] for row in prof.phases[n:]})
+    else:
+        opt = module.MISOCP(xlsx_file, json_file)
+        timing['read'] = time.perf_counter() - t0
+        for phase in ('define_Set', 'define_Parameter', 'define_Variable', 'define_Equation', 'define_Obj'):
+            t0 = time.perf_counter()
+            getattr(opt, phase)()
+            timing[phase] = time.perf_counter() - t0
+    timing['build'] = sum(v for k, v in timing.items() if k != 'read')
+
+    return timing
+
+
+def bench_build(sizes, module=misocp):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bus in sizes:
+            xlsx_file = make_feeder(os.path.join(tmp, f'feeder_{n_bus}.xlsx'), n_bus)
+            timing = time_build(module, xlsx_file)
+            rows.append({'n_bus': n_bus, **timing, 'build_per_bus_ms': 1000 * timing['build'] / n_bus})
+            print(f"  {module.__name__} n_bus={n_bus:>6}: build {timing['build']:.3f}s "
+                  f"({rows[-1]['build_per_bus_ms']:.3f} ms/bus)")
+
+    return pd.DataFrame(rows)
+
+
+def bench_parallel(scenarios, xlsx_file=TEMPLATE_XLSX, json_file=TEMPLATE_JSON, workers=(1, 2, 4)):
+    # toc do tang theo so tien trinh (so voi lan chay 1 tien trinh, them vao neu workers khong co 1),
+    # tong so luong solver giu bang so nhan
+    rows = []
+    for n in sorted(set(workers) | {1}):
+        t0 = time.perf_counter()
+        df = scenario.run_parallel(scenarios, xlsx_file, json_file, max_workers=n)
+        wall = time.perf_counter() - t0
+        # n_ok: so kich ban co nghiem toi uu (OptimalGlobal / OptimalLocal)
+        n_ok = int(df['status'].isin([status.name for status in OPTIMAL_STATUS]).sum())
+        rows.append({'workers': n, 'wall_time': wall, 'n_ok': n_ok})
+    base = next(row['wall_time'] for row in rows if row['workers'] == 1)
+    for row in rows:
+        row['speedup'] = base / row['wall_time']
+        row['efficiency'] = row['speedup'] / row['workers']
+
+    return pd.DataFrame(rows)
+
+
+def build_full(xlsx_file, json_file=TEMPLATE_JSON, tighten=None, substitute_load=None):
+    opt = misocp2.MISOCP(xlsx_file, json_file)
+    if substitute_load is not None:
+        opt.substitute_load = substitute_load
+    opt.build(tighten)
+    # file.lst ghi vao thu muc tam cua Container, khong ghi canh file.xlsx (thu muc du an voi TEMPLATE_XLSX)
+    opt.opts.listing_file = os.path.join(opt.CONTAINER.working_directory, 'full.lst')
+    return opt
+
+
+def solve_full(xlsx_file, json_file=TEMPLATE_JSON):
+    opt = build_full(xlsx_file, json_file)
+    opt.MODEL.solve(options=opt.opts)
+    return opt.MODEL.objective_value
+
+
+def read_miptrace(trace_file):
+    # dong 'I' = nghiem nguyen moi, 'E' = ket thuc (lineNum, seriesID, node, seconds, bestFound, bestBound)
+    first, nodes = None, None
+    with open(trace_file) as f:
+        for line in f:
+            if line.startswith('*'):
+                continue
+            fields = [x.strip() for x in line.split(',')]
+            if fields[1] == 'I' and first is None:
+                first = float(fields[3])
+            if fields[1] == 'E':
+                nodes = int(fields[2])
+    return first, nodes
+
+
+def bench_warmstart(xlsx_files, json_file=TEMPLATE_JSON):
+    # so sanh giai nguoi / warm start tu heuristic / warm start tu nghiem lan truoc (chi ho tro CPLEX miptrace)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for xlsx_file in xlsx_files:
+            previous = None
+            for mode in ('cold', 'greedy', 'previous'):
+                opt = build_full(xlsx_file, json_file)
+                if mode == 'greedy':
+                    opt.set_WarmStart('greedy')
+                elif mode == 'previous':
+                    opt.set_WarmStart(previous)
+                trace_file = os.path.join(tmp, f'{mode}.trc')
+                options = {**(opt.solver_options or {}), 'miptrace': trace_file}
+                t0 = time.perf_counter()
+                opt.MODEL.solve(solver=opt.solver, options=opt.opts, solver_options=options)
+                wall = time.perf_counter() - t0
+                first, nodes = read_miptrace(trace_file)
+                rows.append({
+                    'case': os.path.basename(xlsx_file), 'mode': mode, 'objective': opt.MODEL.objective_value,
+                    'first_incumbent': first, 'solve_time': opt.MODEL.solve_model_time, 'wall_time': wall, 'nodes': nodes,
+                })
+                if mode == 'cold':
+                    df = opt.Zcap.records
+                    previous = {(int(b), int(c)): 1 for b, c, z in zip(df.iloc[:, 0], df.iloc[:, 1], df['level']) if z > 0.5}
+                print(f"  {rows[-1]}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_decompose(hours_list, n_bus=33, n_cap=None, json_file=TEMPLATE_JSON, max_workers=None, full=True):
+    # thoi gian giai MIQCP day du so voi phan ra theo gio khi tang so gio
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for hours in hours_list:
+            xlsx_file = make_feeder(os.path.join(tmp, f'feeder_{n_bus}_{hours}h.xlsx'), n_bus, hours, n_cap)
+            row = {'n_bus': n_bus, 'hours': hours}
+            if full:
+                t0 = time.perf_counter()
+                try:
+                    row['full_obj'] = solve_full(xlsx_file, json_file)
+                except Exception as e:
+                    print(f'Loi giai mo hinh day du ({hours}h): {e}')
+                    row['full_obj'] = None
+                row['full_time'] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            res = decompose.solve_decomposed(xlsx_file, json_file, max_workers=max_workers, output=None)
+            row['decomp_time'] = time.perf_counter() - t0
+            row['decomp_obj'] = res['objective']
+            row['decomp_iter'] = len(res['log'])
+            rows.append(row)
+            print(f"  {hours:>4}h: {row}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_heuristic(sizes, xlsx_files=(), json_file=TEMPLATE_JSON, solve=True):
+    # heuristic sweep: thoi gian theo kich thuoc luoi, chi phi so voi muc tieu MIQCP (neu giai duoc)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = list(xlsx_files) + [make_feeder(os.path.join(tmp, f'feeder_{n}.xlsx'), n) for n in sizes]
+        for xlsx_file in cases:
+            opt = misocp2.MISOCP(xlsx_file, json_file)
+            t0 = time.perf_counter()
+            pf = PowerFlow(opt)
+            zcap = heuristic.greedy_zcap(opt, pf=pf)
+            row = {'case': os.path.basename(xlsx_file), 'n_bus': len(opt.id_bus), 'heur_time': time.perf_counter() - t0}
+            cost = heuristic.placement_cost(opt, zcap, pf)
+            row.update({'n_cap': len(zcap), 'heur_obj': cost['objective'], 'no_cap_obj': heuristic.placement_cost(opt, {}, pf)['objective']})
+            if solve and xlsx_file in xlsx_files:
+                t0 = time.perf_counter()
+                try:
+                    row['miqcp_obj'] = solve_full(xlsx_file, json_file)
+                    row['gap'] = row['heur_obj'] / row['miqcp_obj'] - 1
+                except Exception as e:
+                    print(f'Loi giai MIQCP ({row["case"]}): {e}')
+                row['miqcp_time'] = time.perf_counter() - t0
+            rows.append(row)
+            print(f"  {row}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_powerflow(sizes, n_siting=1000, json_file=TEMPLATE_JSON, seed=0):
+    # so phuong an tu bu danh gia duoc moi giay bang sweep theo lo
+    rng = np.random.default_rng(seed)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bus in sizes:
+            opt = misocp2.MISOCP(make_feeder(os.path.join(tmp, f'feeder_{n_bus}.xlsx'), n_bus), json_file)
+            pf = PowerFlow(opt)
+            # phuong an ngau nhien: Y tu, dung luong khong vuot tong Q tai dinh / Y (tranh bu qua muc lam sweep phan ky)
+            q_cap = np.asarray(opt.Q_cap)
+            q_cap = q_cap[q_cap <= max(pf.Q.sum(axis=0).max() / opt.Y, q_cap.min())]
+            qcap = np.zeros((n_bus, n_siting))
+            for k in range(n_siting):
+                bus = rng.choice(np.arange(1, n_bus), size=min(opt.Y, n_bus - 1), replace=False)
+                qcap[bus, k] = rng.choice(q_cap, size=len(bus))
+            t0 = time.perf_counter()
+            res = pf.evaluate(qcap)
+            wall = time.perf_counter() - t0
+            rows.append({'n_bus': n_bus, 'hours': len(opt.time), 'n_siting': n_siting, 'time': wall,
+                         'siting_per_s': n_siting / wall, 'converged': res['converged']})
+            print(f"  {rows[-1]}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_candidate(xlsx_files, n_candidates=(5, 10, 20), json_file=TEMPLATE_JSON):
+    # so bien nhi phan / so nut nhanh can / thoi gian: Zcap day du so voi tap ung vien loc theo do nhay
+    with open(json_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for xlsx_file in xlsx_files:
+            for n in (None,) + tuple(n_candidates):
+                config.update({'candidate': None if n is None else 'sensitivity', 'n_candidate': n})
+                cfg_file = os.path.join(tmp, 'config.json')
+                with open(cfg_file, 'w', encoding='utf-8') as f:
+                    json.dump(config, f)
+                opt = build_full(xlsx_file, cfg_file)
+                t0 = time.perf_counter()
+                opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+                rows.append({
+                    'case': os.path.basename(xlsx_file), 'candidate': n or 'all', 'n_binary': len(opt.cand_list),
+                    'objective': opt.MODEL.objective_value, 'nodes': opt.MODEL.num_nodes_used,
+                    'solve_time': opt.MODEL.solve_model_time, 'wall_time': time.perf_counter() - t0,
+                })
+                print(f"  {rows[-1]}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_tighten(xlsx_files, json_file=TEMPLATE_JSON):
+    # so nut nhanh can va thoi gian giai truoc / sau khi thu hep gioi han
+    rows = []
+    for xlsx_file in xlsx_files:
+        for tighten in (False, True):
+            t0 = time.perf_counter()
+            opt = build_full(xlsx_file, json_file, tighten)
+            build = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+            rows.append({
+                'case': os.path.basename(xlsx_file), 'tighten': tighten, 'objective': opt.MODEL.objective_value,
+                'nodes': opt.MODEL.num_nodes_used, 'build_time': build, 'solve_time': opt.MODEL.solve_model_time, 'wall_time': time.perf_counter() - t0,
+            })
+            print(f"  {rows[-1]}")
+
+    return pd.DataFrame(rows)
+
+
+def fill_levels(opt):
+    # gan level cho cac bien tu phan bo cong suat (khong can giai) de do thoi gian xuat ket qua o quy mo lon
+    pf = PowerFlow(opt)
+    res = pf.solve()
+    topo = opt.topo
+    child = topo.bfs_order[1:]
+    f_bus = np.repeat([str(opt.id_bus[b]) for b in topo.parent[child]], len(opt.time))
+    t_bus = np.repeat([str(opt.id_bus[b]) for b in child], len(opt.time))
+    bus = np.repeat([str(b) for b in opt.id_bus], len(opt.time))
+    time_brn = np.tile([str(t) for t in opt.time], len(child))
+    time_bus = np.tile([str(t) for t in opt.time], len(opt.id_bus))
+    for var, key in (('Pbrn', 'Pbrn'), ('Qbrn', 'Qbrn'), ('Ibrn_sqr', 'Ibrn_sqr')):
+        getattr(opt, var).setRecords(pd.DataFrame({'BUS': f_bus, 'NODE': t_bus, 'TIME': time_brn, 'level': res[key][child].ravel()}))
+    opt.Usqr.setRecords(pd.DataFrame({'BUS': bus, 'TIME': time_bus, 'level': res['Usqr'].ravel()}))
+    opt.PD.setRecords(pd.DataFrame({'BUS': bus, 'TIME': time_bus, 'level': pf.P.ravel()}))
+    opt.QD.setRecords(pd.DataFrame({'BUS': bus, 'TIME': time_bus, 'level': pf.Q.ravel()}))
+    slack = [str(opt.id_slack)] * len(opt.time)
+    opt.Pgen.setRecords(pd.DataFrame({'SLACK': slack, 'TIME': [str(t) for t in opt.time], 'level': res['Pgen']}))
+    opt.Qgen.setRecords(pd.DataFrame({'SLACK': slack, 'TIME': [str(t) for t in opt.time], 'level': res['Qgen']}))
+    opt.OBJ.setRecords(0)
+    return opt
+
+
+def bench_export(sizes, hours=24, formats=('xlsx', 'xlsx_summary', 'parquet', 'parquet32', 'gdx'), json_file=TEMPLATE_JSON):
+    # thoi gian xuat ket qua va dung luong theo dinh dang, level lay tu sweep (khong giai)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bus in sizes:
+            opt = build_full(make_feeder(os.path.join(tmp, f'feeder_{n_bus}.xlsx'), n_bus, hours), json_file)
+            fill_levels(opt)
+            n_rows = sum(len(getattr(opt, attr).records) for attr in export.RESULT_VARS.values()
+                         if getattr(opt, attr).records is not None)
+            for fmt in formats:
+                out_dir = os.path.join(tmp, f'{n_bus}_{fmt}')
+                t0 = time.perf_counter()
+                export.export_result(opt, out_dir, [fmt.replace('_summary', '').replace('32', '')],
+                                     float32=fmt.endswith('32'), summary_only=fmt.endswith('_summary'))
+                wall = time.perf_counter() - t0
+                size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(out_dir) for f in files)
+                rows.append({'n_bus': n_bus, 'hours': hours, 'rows': n_rows, 'format': fmt, 'time': wall, 'size_mb': size / 2**20})
+                print(f"  {rows[-1]}")
+
+    return pd.DataFrame(rows)
+
+
+def run_case(xlsx_file, json_file=TEMPLATE_JSON, solve=True, export_formats=('gdx',), out_dir=None, **meta):
+    # mot lan chay day du (doc, tao mo hinh, heuristic, giai, xuat) co do tung buoc
+    prof = Profiler(xlsx_file=os.path.basename(xlsx_file), **meta)
+    opt = misocp2.MISOCP(xlsx_file, json_file, profiler=prof)
+    prof.meta.update({'n_bus': len(opt.id_bus), 'n_time': len(opt.time), 'n_cap': len(opt.id_cap)})
+    opt.build()
+    opt.opts.listing_file = os.path.join(opt.CONTAINER.working_directory, 'suite.lst')
+    with opt.Phase('heuristic') as row:
+        row['objective'] = heuristic.placement_cost(opt, heuristic.greedy_zcap(opt, candidate=opt.cand_list))['objective']
+
+    solved = False
+    if solve:
+        with opt.Phase('Solve') as row:
+            try:
+                opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+                row.update(model_stats(opt.MODEL))
+                solved = True
+            except Exception as e:
+                row['error'] = str(e).splitlines()[0]
+                print(f"Loi giai ({os.path.basename(xlsx_file)}): {row['error']}")
+    if not solved:
+        # khong giai duoc (vd. gioi han license): lay level tu sweep de van do duoc buoc xuat ket qua
+        fill_levels(opt)
+    with opt.Phase('export'):
+        export.export_result(opt, out_dir or os.path.dirname(os.path.abspath(xlsx_file)), export_formats,
+                             summary_only=True)
+    return prof.report()
+
+
+def scaling_table(reports):
+    rows = [{'n_bus': r['meta']['n_bus'], 'hours': r['meta']['n_time'], 'kind': r['meta'].get('kind'),
+             'phase': p['phase'], 'wall_time': p['wall_time'], 'peak_rss_mb': p['peak_rss_mb']}
+            for r in reports for p in r['phases']]
+    return pd.DataFrame(rows)
+
+
+def scaling_exponent(df, phase):
+    # do doc log(thoi gian) theo log(so bus): ~1 la tuyen tinh
+    part = df[(df['phase'] == phase) & (df['wall_time'] > 0)]
+    if part['n_bus'].nunique() < 2:
+        return None
+    return float(np.polyfit(np.log(part['n_bus']), np.log(part['wall_time']), 1)[0])
+
+
+def compare_baseline(df, baseline_file, tol=1.5, min_time=0.05):
+    # bao hoi quy khi mot buoc cham hon baseline qua tol lan (bo qua cac buoc qua nhanh)
+    base = pd.read_json(baseline_file)
+    merged = df.merge(base, on=['n_bus', 'hours', 'kind', 'phase'], suffixes=('', '_base'))
+    merged['ratio'] = merged['wall_time'] / merged['wall_time_base']
+    slow = merged[(merged['ratio'] > tol) & (merged['wall_time'] > min_time)]
+    for row in slow.itertuples():
+        print(f"  HOI QUY: n_bus={row.n_bus} {row.phase} {row.wall_time_base:.3f}s -> {row.wall_time:.3f}s (x{row.ratio:.2f})")
+    return slow
+
+
+def bench_suite(sizes, hours=24, kind='replicated', n_cap=None, cap_step=None, solve_max=None, json_file=TEMPLATE_JSON,
+                out_file=None, baseline=None, seed=0):
+    # chuoi luoi tong hop 33 -> 10k+ bus: thoi gian tung buoc theo kich thuoc, luu JSON de so sanh giua cac phien ban
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bus in sizes:
+            t0 = time.perf_counter()
+            xlsx_file = make_feeder(os.path.join(tmp, f'{kind}_{n_bus}.xlsx'), n_bus, hours, n_cap, kind=kind,
+                                    seed=seed, cap_step=cap_step)
+            gen_time = time.perf_counter() - t0
+            solve = solve_max is None or n_bus * hours <= solve_max
+            report = run_case(xlsx_file, json_file, solve, out_dir=os.path.join(tmp, f'out_{n_bus}'), kind=kind)
+            report['phases'].insert(0, {'phase': 'generate', 'wall_time': gen_time, 'peak_rss_mb': None})
+            reports.append(report)
+            print(f"  n_bus={n_bus:>6}: " + ", ".join(f"{p['phase']} {p['wall_time']:.3f}s" for p in report['phases']))
+
+    df = scaling_table(reports)
+    for phase in ('get_xlsx', 'define_Equation', 'heuristic', 'Solve', 'export'):
+        slope = scaling_exponent(df, phase)
+        if slope is not None:
+            print(f"  {phase}: thoi gian ~ n_bus^{slope:.2f}")
+    if out_file:
+        with open(out_file, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, default=str)
+        df.to_json(os.path.splitext(out_file)[0] + '_table.json', orient='records', indent=2)
+    if baseline:
+        compare_baseline(df, baseline)
+
+    return df.pivot_table(index=['n_bus', 'hours'], columns='phase', values='wall_time', sort=False).reset_index()
+
+
+def bench_solvers(xlsx_files, backends=('gams:cplex', 'gams:sbb', 'scip'), json_file=TEMPLATE_JSON):
+    # cung mot mo hinh, giai bang nhieu backend: thoi gian, muc tieu, vi tri tu
+    # bo qua backend khong giai duoc loai bai toan (vd. HiGHS voi MIQCP)
+    rows = []
+    for xlsx_file in xlsx_files:
+        for spec in backends:
+            opt = build_full(xlsx_file, json_file)
+            backend = get_backend(spec)
+            if not backend.supports(opt.MODEL.problem):
+                print(f"  {spec}: bo qua, khong ho tro {opt.MODEL.problem}")
+                continue
+            row = {'case': os.path.basename(xlsx_file), 'backend': spec}
+            try:
+                res = backend.solve(opt)
+                row.update({key: res.get(key) for key in ('status', 'objective', 'solve_time', 'wall_time', 'nodes')})
+                row['installed'] = ' '.join(f'{b}:{c}' for b, c in sorted(res['zcap']))
+            except Exception as e:
+                row['status'] = f'Error: {str(e).splitlines()[0]}'
+            rows.append(row)
+            print(f"  {row}")
+
+    df = pd.DataFrame(rows)
+    if 'objective' in df:
+        best = df.groupby('case')['objective'].transform('min')
+        df['obj_gap'] = df['objective'] / best - 1
+    return df
+
+
+def solve_row(opt, **kwargs):
+    try:
+        opt.MODEL.solve(options=opt.opts, **kwargs)
+        return {'generation_time': opt.MODEL.model_generation_time, 'objective': opt.MODEL.objective_value}
+    except Exception as e:
+        return {'status': f'Error: {str(e).splitlines()[0]}'}
+
+
+def bench_substitute(xlsx_files, json_file=TEMPLATE_JSON):
+    # kich thuoc mo hinh va thoi gian sinh / giai khi giu hoac bo bien PD/QD
+    rows = []
+    for xlsx_file in xlsx_files:
+        for substitute in (False, True):
+            t0 = time.perf_counter()
+            opt = build_full(xlsx_file, json_file, substitute_load=substitute)
+            row = {'file': os.path.basename(xlsx_file), 'substitute_load': substitute, 'build_time': time.perf_counter() - t0}
+            t0 = time.perf_counter()
+            try:
+                opt.MODEL.solve(options=opt.opts)
+                opt.set_Load()
+                row['wall_time'] = time.perf_counter() - t0
+                stats = model_stats(opt.MODEL)
+                row.update({key: stats[key] for key in ('num_equations', 'num_variables', 'num_nonzeros',
+                                                        'model_generation_time', 'solve_model_time', 'objective_value')})
+                row['pd_total'] = opt.PD.records['level'].sum()
+            except Exception as e:
+                row['status'] = f'Error: {str(e).splitlines()[0]}'
+            rows.append(row)
+            print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_update(xlsx_files, scales=(1.05, 0.95), json_file=TEMPLATE_JSON, solve=True):
+    # du bao moi = bieu do phu tai nhan he so: tao lai mo hinh, cap nhat records (GAMS sinh lai), cap nhat mo hinh dong bang
+    rows = []
+    for xlsx_file in xlsx_files:
+        for scale in scales:
+            opt = build_full(xlsx_file, json_file)
+            prf = pd.DataFrame({'Time': opt.time, 'Residential': opt.res_prf, 'Commercial': opt.com_prf,
+                                'Industrial': opt.ind_prf})
+            new = prf.copy()
+            new[['Residential', 'Commercial', 'Industrial']] *= scale
+            base = {'file': os.path.basename(xlsx_file), 'scale': scale, 'n_bus': len(opt.id_bus), 'n_time': len(opt.time)}
+            if solve:
+                solve_row(opt)
+
+            # tao lai: doc du lieu (cache), khai bao toan bo symbol, GAMS sinh lai mo hinh
+            t0 = time.perf_counter()
+            rebuild = build_full(xlsx_file, json_file)
+            rebuild.update_profile(new)
+            row = {**base, 'mode': 'rebuild', 'update_time': time.perf_counter() - t0}
+            row.update(solve_row(rebuild) if solve else {})
+            row['wall_time'] = time.perf_counter() - t0
+            rows.append(row)
+
+            # cap nhat records cua mo hinh da tao, GAMS van sinh lai mo hinh khi giai
+            t0 = time.perf_counter()
+            opt.update_profile(new)
+            row = {**base, 'mode': 'update', 'update_time': time.perf_counter() - t0}
+            row.update(solve_row(opt) if solve else {})
+            row['wall_time'] = time.perf_counter() - t0
+            rows.append(row)
+
+            # mo hinh dong bang: chi thay LoadData trong mo hinh da sinh
+            if solve:
+                opt.update_profile(prf)
+                t0 = time.perf_counter()
+                row = {**base, 'mode': 'frozen'}
+                try:
+                    opt.Freeze()
+                    row['freeze_time'] = time.perf_counter() - t0
+                    opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+                    t0 = time.perf_counter()
+                    opt.update_profile(new)
+                    row['update_time'] = time.perf_counter() - t0
+                    opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+                    row['objective'] = opt.MODEL.objective_value
+                    row['wall_time'] = time.perf_counter() - t0
+                except Exception as e:
+                    row['status'] = f'Error: {str(e).splitlines()[0]}'
+                finally:
+                    opt.Unfreeze()
+                rows.append(row)
+            for row in rows[-3 if solve else -2:]:
+                print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_fleet(n_feeders=(2, 4, 8), xlsx_file=TEMPLATE_XLSX, json_file=TEMPLATE_JSON, packs=(1, 2), workers=(1, 2)):
+    # doi xuat tuyen giong nhau khong co ngan sach chung: so mo hinh / tien trinh anh huong thoi gian ca doi
+    rows = []
+    for n in n_feeders:
+        feeders = [{'xlsx': xlsx_file, 'name': f'F{k + 1}'} for k in range(n)]
+        for pack in packs:
+            for max_workers in workers:
+                t0 = time.perf_counter()
+                df = multifeeder.solve_fleet(feeders, json_file, max_workers=max_workers, pack=pack, output=None)
+                row = {
+                    'n_feeder': n, 'pack': pack, 'workers': max_workers,
+                    'n_block': df['block'].nunique() if 'block' in df else None,
+                    'wall_time': time.perf_counter() - t0,
+                    'solve_time': df.drop_duplicates('block')['solve_time'].sum() if 'solve_time' in df else None,
+                    'objective': df['objective'].sum() if 'objective' in df else None,
+                    'status': df['status'].value_counts().idxmax(),
+                }
+                rows.append(row)
+                print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_dispatch(windows=(3, 6, 12, 24), hours=24, installed='greedy', max_switch=4, xlsx_file=TEMPLATE_XLSX,
+                   json_file=TEMPLATE_JSON, time_limit=5):
+    # tao mo hinh mot lan roi truot cua so: do tre moi buoc so voi thoi gian tao lai mo hinh
+    rows = []
+    for window in windows:
+        t0 = time.perf_counter()
+        opt = dispatch.DispatchModel(xlsx_file, json_file, installed=installed, window=window, max_switch=max_switch,
+                                     time_limit=time_limit)
+        opt.build()
+        build_time = time.perf_counter() - t0
+        try:
+            log = dispatch.rolling_dispatch(opt, hours=hours)
+        except Exception as e:
+            rows.append({'window': window, 'build_time': build_time, 'status': f'Error: {str(e).splitlines()[0]}'})
+            print(f"  {rows[-1]}")
+            continue
+        row = {
+            'window': window,
+            'n_cap': len(opt.inst_bus),
+            'build_time': build_time,
+            'latency_mean': log['latency'].mean(),
+            'latency_max': log['latency'].max(),
+            'solve_time_mean': log['solve_time'].mean(),
+            'n_switch': int(log['n_switch'].sum()),
+            'status': log['status'].value_counts().idxmax(),
+        }
+        rows.append(row)
+        print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_oa(xlsx_files, backends=(None, 'highs'), json_file=TEMPLATE_JSON, tol=1e-6):
+    # MIQCP (Eqs16 day du) so voi xap xi ngoai: MILP + lat cat tiep tuyen them dan tai nhanh-gio bi vi pham
+    rows = []
+    for xlsx_file in xlsx_files:
+        name = os.path.basename(xlsx_file)
+        t0 = time.perf_counter()
+        opt = build_full(xlsx_file, json_file)
+        row = {'file': name, 'method': 'miqcp', 'build_time': time.perf_counter() - t0}
+        t0 = time.perf_counter()
+        row.update(solve_row(opt))
+        row['wall_time'] = time.perf_counter() - t0
+        rows.append(row)
+        print(f"  {row}")
+        for backend in backends:
+            t0 = time.perf_counter()
+            opt = oa.OAModel(xlsx_file, json_file, tol=tol, backend=backend)
+            opt.build()
+            row = {'file': name, 'method': f"oa:{backend or opt.solver}", 'build_time': time.perf_counter() - t0}
+            t0 = time.perf_counter()
+            try:
+                res = oa.solve_oa(opt, output=None)
+                row.update({
+                    'objective': res['objective'],
+                    'lower_bound': res['lower_bound'],
+                    'iterations': len(res['log']),
+                    'n_cut': int(res['log']['n_cut'].iloc[-1]),
+                    'max_viol': res['log']['max_viol'].iloc[-1],
+                })
+            except Exception as e:
+                row['status'] = f'Error: {str(e).splitlines()[0]}'
+            row['wall_time'] = time.perf_counter() - t0
+            rows.append(row)
+            print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_multiyear(years_list=(2, 5, 10), xlsx_file=TEMPLATE_XLSX, json_file=TEMPLATE_JSON, workers=(1, 2), full=True):
+    # mo hinh day du nhieu nam so voi phan ra theo nam (giai doc lap song song + noi chuoi)
+    rows = []
+    for years in years_list:
+        if full:
+            t0 = time.perf_counter()
+            opt = multiyear.MultiYearModel(xlsx_file, json_file, years=years)
+            opt.build()
+            row = {'years': years, 'method': 'full', 'build_time': time.perf_counter() - t0}
+            t0 = time.perf_counter()
+            row.update(solve_row(opt, solver=opt.solver))
+            row['wall_time'] = time.perf_counter() - t0
+            if 'objective' in row:
+                row['n_cap'] = len(opt.stages()[years])
+            rows.append(row)
+            print(f"  {row}")
+        for n in workers:
+            row = {'years': years, 'method': f'rolling/{n}'}
+            try:
+                res = multiyear.solve_rolling(xlsx_file, json_file, years=years, max_workers=n, output=None)
+                row.update({
+                    'objective': res['objective'],
+                    'n_cap': len(res['plan'][years]),
+                    'resolved': int(res['log']['resolved'].sum()),
+                    'parallel_time': res['parallel_time'],
+                    'wall_time': res['wall_time'],
+                })
+            except Exception as e:
+                row['status'] = f'Error: {str(e).splitlines()[0]}'
+            rows.append(row)
+            print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def bench_montecarlo(sizes=(33, 330, 1000), n_sample=10000, hours=24, json_file=TEMPLATE_JSON, seed=0):
+    # Monte Carlo kich ban tai cho phuong an greedy: kich ban / giay theo kich thuoc luoi
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bus in sizes:
+            opt = misocp2.MISOCP(make_feeder(os.path.join(tmp, f'feeder_{n_bus}.xlsx'), n_bus, hours), json_file)
+            pf = PowerFlow(opt)
+            t0 = time.perf_counter()
+            zcap = heuristic.greedy_zcap(opt, pf=pf, candidate=opt.cand_list)
+            greedy_time = time.perf_counter() - t0
+            res = montecarlo.monte_carlo(opt, zcap, n_sample, seed=seed, pf=pf, output=None)
+            row = {'greedy_time': greedy_time, 'n_cap': sum(z > 0.5 for z in zcap.values()), **res['summary']}
+            rows.append(row)
+            print(f"  {row}")
+
+    return pd.DataFrame(rows)
+
+
+def bench_stochastic(n_scenarios=(2, 4, 8, 16), xlsx_file=TEMPLATE_XLSX, json_file=TEMPLATE_JSON, workers=(1, 2),
+                     extensive=True, gap_tol=1e-4):
+    # dang mo rong (moi kich ban trong mot MIQCP) so voi progressive hedging giai song song theo kich ban
+    rows = []
+    for n in n_scenarios:
+        if extensive:
+            t0 = time.perf_counter()
+            opt = stochastic.ScenarioModel(xlsx_file, json_file, n_scenario=n)
+            opt.build()
+            row = {'n_scenario': n, 'method': 'extensive', 'build_time': time.perf_counter() - t0}
+            t0 = time.perf_counter()
+            row.update(solve_row(opt, solver=opt.solver))
+            row['wall_time'] = time.perf_counter() - t0
+            rows.append(row)
+            print(f"  {row}")
+        for k in workers:
+            row = {'n_scenario': n, 'method': f'ph/{k}'}
+            try:
+                res = stochastic.solve_ph(xlsx_file, json_file, n_scenario=n, max_workers=k, gap_tol=gap_tol, output=None)
+                row.update({
+                    'objective': res['objective'],
+                    'lower_bound': res['lower_bound'],
+                    'iterations': len(res['log']),
+                    'stop': res['stop'],
+                    'consensus': float(res['log']['consensus'].iloc[-1]),
+                    'solve_time': float(res['log']['solve_time'].sum()),
+                    'wall_time': res['wall_time'],
+                })
+            except Exception as e:
+                row['status'] = f'Error: {str(e).splitlines()[0]}'
+            rows.append(row)
+            print(f"  {row}")
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Capacitor Place')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='Thoi gian tao mo hinh theo kich thuoc luoi')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 330, 1650, 3300])
+    p = sub.add_parser('parallel', help='Toc do giai song song theo so nhan')
+    p.add_argument('--xlsx', default=TEMPLATE_XLSX)
+    p.add_argument('--json', default=TEMPLATE_JSON)
+    p.add_argument('--workers', nargs='*', type=int, default=[1, 2, 4, os.cpu_count() or 1])
+    p = sub.add_parser('decompose', help='MIQCP day du so voi phan ra theo gio')
+    p.add_argument('hours', nargs='*', type=int, default=[6, 12, 24, 48, 96])
+    p.add_argument('--n-bus', type=int, default=33)
+    p.add_argument('--n-cap', type=int, default=None)
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--no-full', action='store_true')
+    p = sub.add_parser('warmstart', help='Giai nguoi so voi warm start')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p = sub.add_parser('heuristic', help='Heuristic sweep so voi MIQCP')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 330, 3300, 10000])
+    p.add_argument('--xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p.add_argument('--no-solve', action='store_true')
+    p = sub.add_parser('powerflow', help='So phuong an tu bu danh gia bang sweep moi giay')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 330, 3300])
+    p.add_argument('--n-siting', type=int, default=1000)
+    p = sub.add_parser('candidate', help='Zcap day du so voi tap ung vien')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p.add_argument('--n', nargs='*', type=int, default=[5, 10, 20])
+    p = sub.add_parser('tighten', help='Truoc / sau khi thu hep gioi han bien')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p = sub.add_parser('export', help='Thoi gian xuat ket qua theo dinh dang')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 330, 3300])
+    p.add_argument('--hours', type=int, default=24)
+    p = sub.add_parser('suite', help='Chuoi luoi tong hop: thoi gian tung buoc theo kich thuoc')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 100, 330, 1000, 3300, 10000])
+    p.add_argument('--hours', type=int, default=24)
+    p.add_argument('--kind', choices=['replicated', 'random'], default='replicated')
+    p.add_argument('--n-cap', type=int, default=None)
+    p.add_argument('--cap-step', type=float, default=None, help='Buoc dung luong tu (kVAr) cho danh muc tong hop')
+    p.add_argument('--solve-max', type=int, default=None, help='Chi giai khi n_bus * hours <= gia tri nay')
+    p.add_argument('--out', default=None, help='File JSON luu ket qua')
+    p.add_argument('--baseline', default=None, help='File *_table.json cua lan chay truoc de phat hien hoi quy')
+    p = sub.add_parser('solvers', help='So sanh cac backend giai tren cung mo hinh')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p.add_argument('--backends', nargs='*', default=['gams:cplex', 'gams:sbb', 'scip', 'highs'])
+    p = sub.add_parser('substitute', help='Kich thuoc mo hinh khi bo bien PD/QD va Eqs_PL/Eqs_QL')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p = sub.add_parser('update', help='Tao lai mo hinh so voi cap nhat records / mo hinh dong bang khi du bao thay doi')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p.add_argument('--scales', nargs='*', type=float, default=[1.05, 0.95])
+    p.add_argument('--no-solve', action='store_true')
+    p = sub.add_parser('fleet', help='Doi xuat tuyen: khoi doc lap giai song song / gop mo hinh')
+    p.add_argument('n_feeders', nargs='*', type=int, default=[2, 4, 8])
+    p.add_argument('--xlsx', default=TEMPLATE_XLSX)
+    p.add_argument('--json', default=TEMPLATE_JSON)
+    p.add_argument('--packs', nargs='*', type=int, default=[1, 2])
+    p.add_argument('--workers', nargs='*', type=int, default=[1, 2])
+    p = sub.add_parser('dispatch', help='Do tre dieu do tu bu dong cat theo cua so truot')
+    p.add_argument('windows', nargs='*', type=int, default=[3, 6, 12, 24])
+    p.add_argument('--hours', type=int, default=24)
+    p.add_argument('--installed', default='greedy', help="'greedy' hoac duong dan result.xlsx")
+    p.add_argument('--max-switch', type=int, default=4)
+    p.add_argument('--time-limit', type=float, default=5)
+    p = sub.add_parser('oa', help='MIQCP so voi xap xi ngoai Eqs16 (MILP + lat cat)')
+    p.add_argument('xlsx', nargs='*', default=[TEMPLATE_XLSX])
+    p.add_argument('--backends', nargs='*', default=['gams', 'highs'], help="'gams' = solver trong config.json")
+    p.add_argument('--tol', type=float, default=1e-6)
+    p = sub.add_parser('multiyear', help='Quy hoach nhieu nam: mo hinh day du so voi phan ra theo nam')
+    p.add_argument('years', nargs='*', type=int, default=[2, 5, 10])
+    p.add_argument('--xlsx', default=TEMPLATE_XLSX)
+    p.add_argument('--json', default=TEMPLATE_JSON)
+    p.add_argument('--workers', nargs='*', type=int, default=[1, 2])
+    p.add_argument('--no-full', action='store_true')
+    p = sub.add_parser('montecarlo', help='Monte Carlo kich ban tai cho mot phuong an dat tu')
+    p.add_argument('sizes', nargs='*', type=int, default=[33, 330, 1000])
+    p.add_argument('--n', type=int, default=10000)
+    p.add_argument('--hours', type=int, default=24)
+    p = sub.add_parser('stochastic', help='Hai giai doan: dang mo rong so voi progressive hedging theo kich ban')
+    p.add_argument('n_scenarios', nargs='*', type=int, default=[2, 4, 8, 16])
+    p.add_argument('--xlsx', default=TEMPLATE_XLSX)
+    p.add_argument('--json', default=TEMPLATE_JSON)
+    p.add_argument('--workers', nargs='*', type=int, default=[1, 2])
+    p.add_argument('--gap-tol', type=float, default=1e-4)
+    p.add_argument('--no-extensive', action='store_true')
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        print("=== Thoi gian tao mo hinh theo kich thuoc luoi ===")
+        df = bench_build(args.sizes)
+    elif args.cmd == 'warmstart':
+        print("=== Warm start Zcap ===")
+        df = bench_warmstart(args.xlsx)
+    elif args.cmd == 'heuristic':
+        print("=== Heuristic sweep ===")
+        df = bench_heuristic(args.sizes, args.xlsx, solve=not args.no_solve)
+    elif args.cmd == 'powerflow':
+        print("=== Danh gia phuong an bang sweep ===")
+        df = bench_powerflow(args.sizes, args.n_siting)
+    elif args.cmd == 'candidate':
+        print("=== Tap ung vien Zcap ===")
+        df = bench_candidate(args.xlsx, args.n)
+    elif args.cmd == 'tighten':
+        print("=== Thu hep gioi han bien ===")
+        df = bench_tighten(args.xlsx)
+    elif args.cmd == 'export':
+        print("=== Xuat ket qua ===")
+        df = bench_export(args.sizes, args.hours)
+    elif args.cmd == 'suite':
+        print("=== Chuoi luoi tong hop ===")
+        df = bench_suite(args.sizes, args.hours, args.kind, args.n_cap, args.cap_step, args.solve_max,
+                         out_file=args.out, baseline=args.baseline)
+    elif args.cmd == 'solvers':
+        print("=== So sanh backend giai ===")
+        df = bench_solvers(args.xlsx, args.backends)
+    elif args.cmd == 'substitute':
+        print("=== Thay tai vao phuong trinh can bang ===")
+        df = bench_substitute(args.xlsx)
+    elif args.cmd == 'update':
+        print("=== Cap nhat du bao phu tai ===")
+        df = bench_update(args.xlsx, args.scales, solve=not args.no_solve)
+    elif args.cmd == 'fleet':
+        print("=== Doi xuat tuyen ===")
+        df = bench_fleet(args.n_feeders, args.xlsx, args.json, args.packs, args.workers)
+    elif args.cmd == 'dispatch':
+        print("=== Dieu do tu bu dong cat ===")
+        df = bench_dispatch(args.windows, args.hours, args.installed, args.max_switch, time_limit=args.time_limit)
+    elif args.cmd == 'oa':
+        print("=== Xap xi ngoai Eqs16 ===")
+        df = bench_oa(args.xlsx, [None if b == 'gams' else b for b in args.backends], tol=args.tol)
+    elif args.cmd == 'multiyear':
+        print("=== Quy hoach nhieu nam ===")
+        df = bench_multiyear(args.years, args.xlsx, args.json, args.workers, full=not args.no_full)
+    elif args.cmd == 'montecarlo':
+        print("=== Monte Carlo kich ban tai ===")
+        df = bench_montecarlo(args.sizes, args.n, args.hours)
+    elif args.cmd == 'stochastic':
+        print("=== Hai giai doan ngau nhien ===")
+        df = bench_stochastic(args.n_scenarios, args.xlsx, args.json, args.workers, not args.no_extensive, args.gap_tol)
+    elif args.cmd == 'decompose':
+        print("=== Phan ra theo gio ===")
+        df = bench_decompose(args.hours, args.n_bus, args.n_cap, max_workers=args.workers, full=not args.no_full)
+    else:
+        print(f"=== Giai song song, may co {os.cpu_count()} nhan ===")
+        scenarios = [
+            {'name': f'{type_load}/Y={y}', 'type_load': type_load, 'Y': y}
+            for type_load in ('Residential', 'Commercial', 'Industrial', 'All')
+            for y in (2, 5, 10)
+        ]
+        df = bench_parallel(scenarios, args.xlsx, args.json, sorted(set(args.workers)))
+    print(df.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
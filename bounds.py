@@ -0,0 +1,29 @@
+import numpy as np
+
+from powerflow import PowerFlow
+from heuristic import candidate_mask
+
+
+def branch_bounds(opt, pf=None, candidate=None):
+    # gioi han duoi Pbrn, Qbrn, Ibrn_sqr cua nhanh cha -> bus, mang (bus, time); dong cua bus nguon khong dung
+    # chi suy ra tu du lieu va rang buoc cua mo hinh (dung cho ca noi long SOCP), khong cat nghiem kha thi nao:
+    # - Pbrn >= tong tai phia sau (ton that >= 0)
+    # - Qbrn >= tong Q tai - Q bu toi da phia sau
+    # - Ibrn_sqr >= (P^2 + Q^2) / Umax^2 tu Eqs16
+    pf = pf or PowerFlow(opt)
+    topo = pf.topo
+
+    P_lo = pf.subtree_sum(pf.P)
+    Q_sub = pf.subtree_sum(pf.Q)
+
+    # Q bu lon nhat co the dat phia sau moi nhanh: moi bus mot tu, tong khong qua Y tu lon nhat
+    q_bus = (candidate_mask(opt, candidate) * np.asarray(opt.Q_cap)[None]).max(axis=1)
+    q_top = np.sort(q_bus)[::-1][:int(opt.Y)].sum()
+    Q_lo = Q_sub - np.minimum(pf.subtree_sum(q_bus), q_top)[:, None]
+
+    I_lo = (P_lo**2 + np.maximum(Q_lo, 0)**2) / opt.u_max**2
+    I_lo[topo.root] = 0
+
+    # diem tiep tuyen cho lat cat tuyen tinh cua Eqs16: dong cong suat khi chua dat tu
+    base = pf.solve()
+    return {'Plo': P_lo, 'Qlo': Q_lo, 'Ilo': I_lo, 'P0': base['Pbrn'], 'Q0': base['Qbrn']}
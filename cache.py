@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+from topology import FeederTopology
+
+CACHE_VERSION = 3
+
+
+def hash_file(path, h=None):
+    h = h or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h
+
+
+class XlsxCache:
+    # cache du lieu da doc tu file.xlsx (da quy doi p.u) duoi dang .npy, khoa theo noi dung file + base
+    def __init__(self, xlsx_file, base, attrs, cache_dir=None):
+        self.xlsx_file = xlsx_file
+        self.attrs = tuple(attrs)
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(xlsx_file)), '.xlsx_cache')
+
+        h = hash_file(xlsx_file)
+        h.update(json.dumps({'version': CACHE_VERSION, 'base': base, 'attrs': self.attrs}, sort_keys=True).encode())
+        self.key = h.hexdigest()[:32]
+        self.path = os.path.join(self.cache_dir, self.key)
+
+    def load(self):
+        meta_file = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        # doc toan bo mang roi doi ve list: cac lop mo hinh sua / noi / so sanh cac thuoc tinh nay nhu list
+        data = meta['values']
+        for name in meta['arrays']:
+            data[name] = np.load(os.path.join(self.path, f'{name}.npy')).tolist()
+        return data
+
+    def save(self, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            values, arrays = {}, []
+            for name in self.attrs:
+                value = data[name]
+                arr = np.asarray(value) if isinstance(value, list) else None
+                if arr is not None and arr.dtype.kind in 'iuf':
+                    np.save(os.path.join(tmp, f'{name}.npy'), arr)
+                    arrays.append(name)
+                else:
+                    values[name] = value.item() if isinstance(value, np.generic) else value
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'xlsx_file': os.path.abspath(self.xlsx_file), 'arrays': arrays, 'values': values}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            # cache da duoc tao boi tien trinh khac
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(self.path):
+                raise
+
+
+def load_xlsx(opt):
+    # doc du lieu file.xlsx cua mot lop GetData qua XlsxCache: can xlsx_file, s_base, u_base, XLSX_ATTRS, cache_dir,
+    # use_cache va read_xlsx(); tra ve True neu lay tu cache
+    cache = data = None
+    if opt.use_cache:
+        try:
+            base = {'s_base': opt.s_base, 'u_base': opt.u_base}
+            cache = XlsxCache(opt.xlsx_file, base, opt.XLSX_ATTRS, opt.cache_dir)
+            data = cache.load()
+        except Exception as e:
+            print(f'Loi doc cache: {e}')
+            cache = None
+
+    if data is not None:
+        for name, value in data.items():
+            setattr(opt, name, value)
+        opt.topo = FeederTopology(opt.id_bus, opt.f_bus, opt.t_bus, opt.id_slack)
+        return True
+
+    opt.read_xlsx()
+    if cache is not None:
+        try:
+            cache.save({name: getattr(opt, name) for name in opt.XLSX_ATTRS})
+        except Exception as e:
+            print(f'Loi ghi cache: {e}')
+    return False
+
+
+def source_hash(path=None):
+    # phien ban ma nguon: noi dung cac file .py cua du an (ke ca thay doi chua commit)
+    path = path or os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.py'):
+            h.update(name.encode())
+            hash_file(os.path.join(path, name), h)
+    return h.hexdigest()[:16]
+
+
+def hash_value(h, value):
+    # mang so -> bytes float64 (khong phu thuoc list / ndarray / int / float), con lai -> JSON
+    arr = np.asarray(value) if isinstance(value, (list, tuple, np.ndarray)) else None
+    if arr is not None and arr.dtype.kind in 'iuf':
+        h.update(str(arr.shape).encode())
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    else:
+        h.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+class ResultCache:
+    # cache ket qua giai: moi muc la mot thu muc <key>/ gom meta.json (objective, Zcap, trang thai) va records.gdx
+    # (toan bo Variable); khoa = hash du lieu dau vao da chuan hoa + tuy chon solver + phien ban ma nguon
+    # LRU: mtime cua meta.json la lan dung cuoi, xoa muc cu nhat khi tong dung luong vuot max_mb
+    def __init__(self, cache_dir, max_mb=1024):
+        self.cache_dir = cache_dir
+        self.max_mb = max_mb
+
+    def key(self, inputs):
+        h = hashlib.sha256()
+        h.update(json.dumps({'version': CACHE_VERSION, 'code': source_hash()}).encode())
+        for name in sorted(inputs):
+            h.update(name.encode())
+            hash_value(h, inputs[name])
+        return h.hexdigest()[:32]
+
+    def load(self, key, container=None):
+        path = os.path.join(self.cache_dir, key)
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if container is not None:
+                container.loadRecordsFromGdx(os.path.join(path, 'records.gdx'), meta['symbols'])
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(meta_file)
+        return meta
+
+    def save(self, key, meta, container=None, symbols=()):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, key)
+        tmp = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            meta = {**meta, 'symbols': list(symbols)}
+            if container is not None:
+                container.write(os.path.join(tmp, 'records.gdx'), symbol_names=meta['symbols'])
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, default=str)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+        return path
+
+    def entries(self):
+        # [(lan dung cuoi, dung luong byte, duong dan)] cua cac muc trong cache
+        rows = []
+        if not os.path.isdir(self.cache_dir):
+            return rows
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_file = os.path.join(path, 'meta.json')
+            if not os.path.exists(meta_file):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            rows.append((os.path.getmtime(meta_file), size, path))
+        return sorted(rows)
+
+    def evict(self):
+        rows = self.entries()
+        total = sum(size for _, size, _ in rows)
+        removed = []
+        # giu lai it nhat muc moi nhat
+        for _, size, path in rows[:-1]:
+            if total <= self.max_mb * 2**20:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed.append(path)
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,138 @@
+import numpy as np
+
+from powerflow import PowerFlow, profile_load
+
+LOAD_TYPES = ('Residential', 'Commercial', 'Industrial')
+
+
+def kmeans(X, k, n_init=10, max_iter=100, seed=0):
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(n_init):
+        # khoi tao k-means++
+        centers = [X[rng.integers(len(X))]]
+        for _ in range(1, k):
+            d2 = np.min(((X[:, None, :] - np.array(centers)[None]) ** 2).sum(axis=2), axis=1)
+            p = d2 / d2.sum() if d2.sum() > 0 else None
+            centers.append(X[rng.choice(len(X), p=p)])
+        centers = np.array(centers)
+
+        for _ in range(max_iter):
+            labels = ((X[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+            new = np.array([X[labels == c].mean(axis=0) if np.any(labels == c) else centers[c] for c in range(k)])
+            if np.allclose(new, centers):
+                break
+            centers = new
+        inertia = ((X - centers[labels]) ** 2).sum()
+        if best is None or inertia < best[2]:
+            best = (labels, centers, inertia)
+
+    return best[0], best[1]
+
+
+def kmedoids(X, k, max_iter=100, seed=0):
+    # PAM rut gon: gan nhan theo medoid gan nhat, cap nhat medoid trong tung cum
+    D = np.sqrt(((X[:, None, :] - X[None]) ** 2).sum(axis=2))
+    labels, _ = kmeans(X, k, seed=seed)
+    medoids = np.array([np.flatnonzero(labels == c)[D[np.ix_(labels == c, labels == c)].sum(axis=1).argmin()]
+                        for c in range(k) if np.any(labels == c)])
+    for _ in range(max_iter):
+        labels = D[:, medoids].argmin(axis=1)
+        new = np.array([np.flatnonzero(labels == c)[D[np.ix_(labels == c, labels == c)].sum(axis=1).argmin()]
+                        for c in range(len(medoids))])
+        if np.array_equal(new, medoids):
+            break
+        medoids = new
+
+    return labels, X[medoids]
+
+
+def representative_periods(prf, k, period=24, method='kmeans', seed=0):
+    # prf: (so gio, so loai tai) -> k chu ky dai dien, trong so = so chu ky (ngay/nam) ma moi cum dai dien
+    prf = np.asarray(prf, dtype=float)
+    n_period = len(prf) // period
+    if n_period < k:
+        raise ValueError(f'Khong du du lieu: {n_period} chu ky {period}h < k={k}')
+    X = prf[:n_period * period].reshape(n_period, period * prf.shape[1])
+
+    if method == 'kmeans':
+        labels, centers = kmeans(X, k, seed=seed)
+    elif method == 'kmedoids':
+        labels, centers = kmedoids(X, k, seed=seed)
+    else:
+        raise ValueError(f'Phuong phap phan cum khong hop le: {method}')
+
+    used = np.unique(labels)
+    count = np.bincount(labels, minlength=len(centers))[used]
+    centers = centers[used]
+    labels = np.searchsorted(used, labels)
+
+    # quy doi ve 365 ngay/nam neu du lieu khong du mot nam
+    weight = count * (365 * 24 / period) / n_period
+    return {
+        'profile': centers.reshape(len(used) * period, prf.shape[1]),
+        'weight': np.repeat(weight, period),
+        'labels': labels,
+        'period': period,
+        'n_period': n_period,
+    }
+
+
+def approximation_error(prf, rep):
+    # so sanh bieu do phu tai dai dien voi ca nam
+    prf = np.asarray(prf, dtype=float)
+    period, n_period = rep['period'], rep['n_period']
+    full = prf[:n_period * period]
+    scale = (365 * 24 / period) / n_period
+    approx = rep['profile'].reshape(-1, period, prf.shape[1])[rep['labels']].reshape(full.shape)
+    w = rep['weight'][:, None]
+
+    energy_full = full.sum(axis=0) * scale
+    loss_full = (full ** 2).sum(axis=0) * scale
+    return {
+        # sai so nang luong (tong tai) va chi so thay the cho ton that (tong binh phuong tai, khong giai luoi)
+        'energy_error': (w * rep['profile']).sum(axis=0) / energy_full - 1,
+        'loss_proxy_error': (w * rep['profile'] ** 2).sum(axis=0) / loss_full - 1,
+        'rmse': np.sqrt(((approx - full) ** 2).mean(axis=0)),
+        'peak_error': rep['profile'].max(axis=0) / full.max(axis=0) - 1,
+    }
+
+
+def loss_error(opt, prf, rep, chunk=None):
+    # sai so ton that dien nang ca nam cua luoi (sweep chinh xac, chua dat tu): bieu do dai dien so voi day du
+    # opt dang giu bieu do dai dien; bieu do day du duoc giai theo lo gio de gioi han bo nho bus x gio
+    pf = PowerFlow(opt)
+    loss_rep = pf.solve()['loss'] @ np.asarray(rep['weight'])
+    full = np.asarray(prf, dtype=float)[:rep['n_period'] * rep['period']]
+    chunk = chunk or max(1, int(2**22 // pf.topo.n_bus))
+    loss_full = 0.0
+    for k in range(0, len(full), chunk):
+        P, Q = profile_load(opt, full[k:k + chunk])
+        loss_full += pf.solve(P=P, Q=Q)['loss'].sum()
+    loss_full *= (365 * 24 / rep['period']) / rep['n_period']
+    return loss_rep / loss_full - 1
+
+
+def apply_clustering(opt, sweep=False):
+    # gan trong so gio w_time cho opt va thay loadprofile bang cac ngay dai dien neu co rep_days
+    # moi gio trong loadprofile dai dien cho 8760 / len(time) gio trong nam (24h -> 365)
+    opt.w_time = [365 * 24 / len(opt.time)] * len(opt.time)
+    if not opt.rep_days:
+        return False
+
+    prf = np.column_stack([opt.res_prf, opt.com_prf, opt.ind_prf])
+    rep = representative_periods(prf, opt.rep_days, method=opt.cluster_method)
+    opt.cluster_error = approximation_error(prf, rep)
+
+    opt.time = list(range(1, len(rep['profile']) + 1))
+    opt.res_prf, opt.com_prf, opt.ind_prf = (rep['profile'][:, k].tolist() for k in range(3))
+    opt.w_time = rep['weight'].tolist()
+
+    print(f"Phan cum loadprofile: {rep['n_period']} ngay -> {len(opt.time) // rep['period']} ngay dai dien ({opt.cluster_method})")
+    for key, err in opt.cluster_error.items():
+        print(f"  {key}: " + ", ".join(f"{name}={e:.2%}" if key != 'rmse' else f"{name}={e:.4f}"
+                                      for name, e in zip(LOAD_TYPES, err)))
+    if sweep:
+        opt.cluster_error['loss_error'] = loss_error(opt, prf, rep)
+        print(f"  loss_error (sweep, chua dat tu): {opt.cluster_error['loss_error']:.2%}")
+    return True
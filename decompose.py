@@ -0,0 +1,271 @@
+import os, sys
+import time
+import tempfile
+import pandas as pd
+from gamspy import (
+    Container,
+    Set,
+    Domain,
+    Parameter,
+    Variable,
+    Equation,
+    Sum,
+    Options,
+    Model,
+    Problem,
+    Sense,
+)
+
+from misocp2 import GetData, MISOCP
+from scenario import WorkerPool, worker_state
+
+
+class HourModel(MISOCP):
+    # bai toan con cho mot gio: Zcap co dinh, chi con cac bien dong chay (SOCP)
+    def __init__(self, xlsx_file=None, json_file=None, hour=None, cache_dir=None, working_directory=None, sub_solver='conopt4'):
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        # lat cat Benders lay tu marginal cua bai toan con -> khong them gioi han / lat cat cua define_Tighten
+        self.tighten = False
+        self.sub_solver = sub_solver
+        k = self.time.index(hour)
+        self.time = [self.time[k]]
+        self.res_prf = [self.res_prf[k]]
+        self.com_prf = [self.com_prf[k]]
+        self.ind_prf = [self.ind_prf[k]]
+        self.w_time = [self.w_time[k]]
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.ZFIX = Parameter(
+            self.CONTAINER,
+            name='ZFIX',
+            domain=[self.BUS, self.CAP],
+            description='Vi tri tu bu co dinh tu bai toan chinh'
+        )
+
+    def define_Obj(self):
+        # chi phi ton that cua gio dang xet (cung don vi voi Eqs_Obj)
+        self.Eqs_Obj = Equation(
+            self.CONTAINER,
+            name='Eqs_Obj',
+        )
+        self.Eqs_Obj[...] = (
+            self.OBJ ==
+            Sum(
+                (self.BUS, self.NODE, self.TIME),
+                (self.WTIME[self.TIME] *
+                self.BrnData[self.BUS, self.NODE, 'R'] *
+                self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
+                self.SBASE * self.COSTA
+                ).where[self.BRN[self.BUS, self.NODE]]
+            )
+        )
+
+    def define_Model(self):
+        self.MODEL = Model(
+            self.CONTAINER,
+            name='Capacitor_Place_Hour',
+            equations=self.CONTAINER.getEquations(),
+            sense=Sense.MIN,
+            objective=self.OBJ,
+            problem=Problem.RMIQCP
+        )
+        # can gia tri doi ngau cua Zcap: CPLEX khong tra ve marginal cho QCP nen dung solver NLP (bai toan loi)
+        self.opts.rmiqcp = self.sub_solver
+
+        return True
+
+    def evaluate(self, zcap):
+        # zcap: {(bus, cap): 0/1}; tra ve ton that va dao ham theo Zcap (reduced cost)
+        self.ZFIX.setRecords([(bus, cap, 1) for (bus, cap), z in zcap.items() if z > 0.5])
+        self.Zcap.fx[self.BUS, self.CAP] = self.ZFIX[self.BUS, self.CAP]
+        self.MODEL.solve(options=self.opts)
+
+        status = self.MODEL.status.name
+        if status not in ('OptimalGlobal', 'OptimalLocal'):
+            return {'hour': self.time[0], 'status': status}
+        df = self.Zcap.records
+        grad = {(int(b), int(c)): m for b, c, m in zip(df.iloc[:, 0], df.iloc[:, 1], df['marginal']) if m != 0}
+        return {'hour': self.time[0], 'status': status, 'loss': self.MODEL.objective_value, 'grad': grad}
+
+
+class Master(GetData):
+    # bai toan chinh MILP: chon Zcap, theta[t] xap xi ton that tung gio bang cac lat cat Benders
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None, max_iter=50):
+        super().__init__(xlsx_file, json_file, cache_dir)
+        self.get_json()
+        self.get_xlsx()
+        self.cluster_profile()
+        self.get_candidate()
+        self.max_iter = max_iter
+        self.CONTAINER = Container()
+        self.n_cut = 0
+        self.cut_const, self.cut_coef, self.zhat = [], [], []
+        self.nogood = []
+
+    def build(self):
+        m = self.CONTAINER
+        self.BUS = Set(m, name='BUS', records=self.id_bus, description='Tap bus')
+        self.CAP = Set(m, name='CAP', records=self.id_cap, description='Tap du lieu Capacitor')
+        self.TIME = Set(m, name='TIME', records=self.time, description='Tap thoi gian')
+        self.CANDIDATE = Set(m, name='CANDIDATE', domain=[self.BUS, self.CAP], records=self.cand_list, description='Tap vi tri va loai tu ung vien')
+        self.ITER = Set(m, name='ITER', records=list(range(1, self.max_iter + 1)), description='Tap vong lap')
+        self.OPT_CUT = Set(m, name='OPT_CUT', domain=[self.ITER], description='Vong lap co lat cat toi uu')
+        self.NG_CUT = Set(m, name='NG_CUT', domain=[self.ITER], description='Vong lap co lat cat no-good')
+        #
+        crf = self.r * (1 + self.r)**self.M / ((1 + self.r)**self.M - 1)
+        self.INVEST = Parameter(
+            m, name='INVEST', domain=self.CAP,
+            records=[(c, cost * q * self.s_base * crf) for c, cost, q in zip(self.id_cap, self.cost_cap, self.Q_cap)],
+            description='Chi phi dau tu quy doi hang nam'
+        )
+        self.CUTCONST = Parameter(m, name='CUTCONST', domain=[self.ITER, self.TIME], description='Hang so lat cat Benders')
+        self.CUTCOEF = Parameter(m, name='CUTCOEF', domain=[self.ITER, self.TIME, self.BUS, self.CAP], description='He so lat cat Benders')
+        self.ZHAT = Parameter(m, name='ZHAT', domain=[self.ITER, self.BUS, self.CAP], description='Zcap da danh gia o moi vong lap')
+        #
+        self.Zcap = Variable(m, name='Zcap', domain=[self.BUS, self.CAP], type='binary')
+        self.THETA = Variable(m, name='THETA', domain=self.TIME, type='positive')
+        self.OBJ = Variable(m, name='OBJ', type='free')
+        #
+        self.Eqs9 = Equation(m, name='Eqs9')
+        self.Eqs9[...] = Sum(self.CANDIDATE[self.BUS, self.CAP], self.Zcap[self.BUS, self.CAP]) <= self.Y
+        self.Eqs10 = Equation(m, name='Eqs10', domain=self.BUS)
+        self.Eqs10[self.BUS].where[Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = (
+            Sum(self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]], self.Zcap[self.BUS, self.CAP]) <= 1
+        )
+        #
+        self.Eqs_Cut = Equation(m, name='Eqs_Cut', domain=[self.ITER, self.TIME])
+        self.Eqs_Cut[self.ITER, self.TIME].where[self.OPT_CUT[self.ITER]] = (
+            self.THETA[self.TIME] >= self.CUTCONST[self.ITER, self.TIME] + Sum(
+                Domain(self.BUS, self.CAP).where[self.CUTCOEF[self.ITER, self.TIME, self.BUS, self.CAP]],
+                self.CUTCOEF[self.ITER, self.TIME, self.BUS, self.CAP] * self.Zcap[self.BUS, self.CAP]
+            )
+        )
+        self.Eqs_NoGood = Equation(m, name='Eqs_NoGood', domain=self.ITER)
+        self.Eqs_NoGood[self.ITER].where[self.NG_CUT[self.ITER]] = (
+            Sum(Domain(self.BUS, self.CAP).where[self.ZHAT[self.ITER, self.BUS, self.CAP] > 0.5], 1 - self.Zcap[self.BUS, self.CAP]) +
+            Sum(Domain(self.BUS, self.CAP).where[self.ZHAT[self.ITER, self.BUS, self.CAP] < 0.5], self.Zcap[self.BUS, self.CAP]) >= 1
+        )
+        #
+        self.Eqs_Obj = Equation(m, name='Eqs_Obj')
+        self.Eqs_Obj[...] = self.OBJ == (
+            Sum(self.CANDIDATE[self.BUS, self.CAP], self.INVEST[self.CAP] * self.Zcap[self.BUS, self.CAP]) + Sum(self.TIME, self.THETA[self.TIME])
+        )
+        self.MODEL = Model(
+            m, name='Capacitor_Place_Master',
+            equations=m.getEquations(),
+            sense=Sense.MIN,
+            objective=self.OBJ,
+            problem=Problem.MIP
+        )
+        self.opts = Options(
+            absolute_optimality_gap=0.0,
+            relative_optimality_gap=0.0,
+            mip=self.solver,
+            listing_file=os.path.join(tempfile.gettempdir(), 'misocp_master.lst')
+        )
+
+        return True
+
+    def invest(self, zcap):
+        crf = self.r * (1 + self.r)**self.M / ((1 + self.r)**self.M - 1)
+        cost = {c: cost * q * self.s_base * crf for c, cost, q in zip(self.id_cap, self.cost_cap, self.Q_cap)}
+        return sum(cost[c] for (b, c), z in zcap.items() if z > 0.5)
+
+    def add_cuts(self, zcap, results):
+        k = self.n_cut + 1
+        if k > self.max_iter:
+            raise RuntimeError(f'Vuot qua so vong lap toi da ({self.max_iter})')
+        self.n_cut = k
+        self.zhat += [(k, b, c, 1) for (b, c), z in zcap.items() if z > 0.5]
+
+        if all('loss' in res for res in results):
+            # theta[t] >= loss + g * (Z - Zhat) = (loss - g * Zhat) + g * Z
+            self.cut_const += [
+                (k, res['hour'], res['loss'] - sum(g * zcap.get(key, 0) for key, g in res['grad'].items()))
+                for res in results
+            ]
+            self.cut_coef += [(k, res['hour'], b, c, g) for res in results for (b, c), g in res['grad'].items()]
+            self.CUTCONST.setRecords(self.cut_const)
+            self.CUTCOEF.setRecords(self.cut_coef)
+            self.OPT_CUT.setRecords(sorted({rec[0] for rec in self.cut_const}))
+        else:
+            # Zcap lam bai toan con vo nghiem -> loai bo to hop nay
+            self.nogood.append(k)
+            self.NG_CUT.setRecords(self.nogood)
+        self.ZHAT.setRecords(self.zhat)
+
+    def solve(self):
+        self.MODEL.solve(options=self.opts)
+        df = self.Zcap.records
+        zcap = {(int(b), int(c)): round(z) for b, c, z in zip(df.iloc[:, 0], df.iloc[:, 1], df['level'])}
+        return self.MODEL.objective_value, zcap
+
+
+# moi tien trinh con giu cac HourModel da tao
+def _hour_model(hour):
+    state = worker_state('misocp_hour')
+    models = state['models']
+    if hour not in models:
+        workdir = os.path.join(state['workdir'], str(hour))
+        os.makedirs(workdir, exist_ok=True)
+        opt = HourModel(*state['args'], hour=hour, cache_dir=state['cache_dir'], working_directory=workdir,
+                        sub_solver=state['sub_solver'])
+        opt.build()
+        opt.opts.threads = state['threads']
+        opt.opts.listing_file = os.path.join(workdir, 'hour.lst')
+        models[hour] = opt
+    return models[hour]
+
+
+def _evaluate_task(hour, zcap):
+    return _hour_model(hour).evaluate(zcap)
+
+
+def solve_decomposed(xlsx_file=None, json_file=None, cache_dir=None, max_workers=None, max_iter=50, tol=1e-4,
+                     sub_solver='conopt4', output=sys.stdout):
+    master = Master(xlsx_file, json_file, cache_dir, max_iter)
+    master.build()
+    hours = list(master.time)
+    state = {'args': (xlsx_file, json_file), 'cache_dir': cache_dir, 'sub_solver': sub_solver}
+    pool = WorkerPool('misocp_hour', len(hours), state, max_workers)
+    evaluate = lambda zcap: pool.map(_evaluate_task, hours, [zcap] * len(hours))
+
+    # vong lap Benders: bai toan chinh cho can duoi, danh gia Zcap cho can tren
+    log, best = [], {'ub': float('inf'), 'zcap': None}
+    zcap = {(b, c): 0 for b in master.id_bus for c in master.id_cap}
+    lb, t0 = -float('inf'), time.perf_counter()
+    try:
+        for it in range(1, max_iter + 1):
+            results = evaluate(zcap)
+            if all('loss' in res for res in results):
+                ub = master.invest(zcap) + sum(res['loss'] for res in results)
+                if ub < best['ub']:
+                    best = {'ub': ub, 'zcap': dict(zcap), 'hourly': {res['hour']: res['loss'] for res in results}}
+            master.add_cuts(zcap, results)
+            lb, zcap = master.solve()
+
+            gap = (best['ub'] - lb) / max(abs(best['ub']), 1e-9)
+            log.append({'iter': it, 'lb': lb, 'ub': best['ub'], 'gap': gap, 'time': time.perf_counter() - t0})
+            if output:
+                print(f"  iter {it:>3}: LB={lb:.4f} UB={best['ub']:.4f} gap={gap:.2e}", file=output)
+            if gap <= tol:
+                break
+    finally:
+        pool.shutdown()
+
+    installed = sorted(k for k, z in (best['zcap'] or {}).items() if z > 0.5)
+    return {'objective': best['ub'], 'lower_bound': lb, 'installed': installed, 'log': pd.DataFrame(log)}
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+
+    res = solve_decomposed(input_xlsx, input_json)
+    print(f"\nTong chi phi: ${res['objective']:,.2f} (can duoi {res['lower_bound']:,.2f})")
+    print(f"Vi tri dat tu (bus, cap): {res['installed']}")
+
+
+if __name__ == '__main__':
+    main()
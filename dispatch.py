@@ -0,0 +1,284 @@
+import os, sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from gamspy import (
+    Set,
+    Parameter,
+    Variable,
+    Equation,
+    Sum,
+    Model,
+    Problem,
+    Sense,
+)
+
+from misocp2 import MISOCP, MIPSTART_OPTION
+from solver import solution_kind
+
+
+class DispatchModel(MISOCP):
+    # van hanh tu bu dong cat: vi tri / loai tu da lap dat co dinh, chi quyet dinh trang thai dong (1) / cat (0) tung gio
+    # trong cua so `window` gio; TIME = 1..window la gio tuong doi trong cua so nen mo hinh chi tao mot lan,
+    # moi buoc truot chi cap nhat records (du bao phu tai, trang thai ban dau, so lan dong cat da dung)
+    def __init__(self, xlsx_file=None, json_file=None, installed=None, window=24, max_switch=4, switch_cost=0.0,
+                 cache_dir=None, working_directory=None, time_limit=None):
+        self.window = window
+        self.max_switch = max_switch        # so lan dong cat toi da cua moi tu trong mot cua so bat ky
+        self.switch_cost = switch_cost      # chi phi moi lan dong cat ($), tranh dong cat lien tuc khi loi ich nho
+        self.time_limit = time_limit        # gioi han thoi gian giai moi buoc (s)
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        # gioi han cua define_Tighten suy ra tu phu tai luc sinh mo hinh, khong tinh lai khi truot cua so
+        self.tighten = False
+        # vi tri da lap dat: dict {(bus, cap): 1}, duong dan result.xlsx hoac 'greedy'
+        if isinstance(installed, str):
+            if installed == 'greedy':
+                from heuristic import greedy_zcap
+                installed = greedy_zcap(self, candidate=self.cand_list)
+            else:
+                installed = self.load_Zcap(installed)
+        self.installed = sorted((bus, cap) for (bus, cap), z in (installed or {}).items() if z > 0.5)
+        if not self.installed:
+            raise ValueError('Chua co tu bu nao duoc lap dat')
+        self.inst_bus = [bus for bus, cap in self.installed]
+        self.cand_list = self.installed
+        self.set_window(0)
+
+    def cluster_profile(self):
+        # giu nguyen bieu do phu tai theo gio (khong phan cum), cac cua so lay tu day
+        # trong so nam giu nhu bai toan quy hoach de installed='greedy' chon cung vi tri
+        self.prf_full = np.column_stack([self.res_prf, self.com_prf, self.ind_prf])
+        self.w_time = [365 * 24 / len(self.time)] * len(self.time)
+
+    def window_profile(self, start):
+        # du bao mac dinh: bieu do phu tai lap lai theo chu ky, (window, 3) = Residential, Commercial, Industrial
+        idx = [(start + k) % len(self.prf_full) for k in range(self.window)]
+        return self.prf_full[idx]
+
+    def set_window(self, start, prf=None):
+        prf = self.window_profile(start) if prf is None else np.asarray(prf)
+        self.time = list(range(1, self.window + 1))
+        self.res_prf, self.com_prf, self.ind_prf = (prf[:, k].tolist() for k in range(3))
+        self.w_time = [1.0] * self.window
+        if hasattr(self, 'PrfData'):
+            self.PrfData.setRecords(
+                [(t, 'Residential', p) for t, p in zip(self.time, self.res_prf)] +
+                [(t, 'Industrial', p) for t, p in zip(self.time, self.ind_prf)] +
+                [(t, 'Commercial', p) for t, p in zip(self.time, self.com_prf)]
+            )
+            self.define_Load()
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.QINST = Parameter(
+            self.CONTAINER,
+            name='QINST',
+            domain=self.BUS,
+            records=[(bus, self.Q_cap[self.id_cap.index(cap)]) for bus, cap in self.installed],
+            description='Dung luong tu bu da lap dat tai moi bus'
+        )
+        self.S0 = Parameter(
+            self.CONTAINER,
+            name='S0',
+            domain=self.BUS,
+            description='Trang thai tu bu truoc cua so (1 = dong)'
+        )
+        self.SWUSED = Parameter(
+            self.CONTAINER,
+            name='SWUSED',
+            domain=self.BUS,
+            description='So lan dong cat da thuc hien trong (window - 1) gio truoc'
+        )
+        self.SWMAX = Parameter(
+            self.CONTAINER,
+            name='SWMAX',
+            records=self.max_switch,
+            description='So lan dong cat toi da trong mot cua so'
+        )
+        self.SWCOST = Parameter(
+            self.CONTAINER,
+            name='SWCOST',
+            records=self.switch_cost,
+            description='Chi phi moi lan dong cat'
+        )
+
+    def define_Variable(self):
+        super().define_Variable()
+        self.INST = Set(
+            self.CONTAINER,
+            name='INST',
+            domain=[self.BUS],
+            records=self.inst_bus,
+            description='Tap bus da lap dat tu bu'
+        )
+        self.Scap = Variable(
+            self.CONTAINER,
+            name='Scap',
+            domain=[self.BUS, self.TIME],
+            type="binary"
+        )
+        self.SW = Variable(
+            self.CONTAINER,
+            name='SW',
+            domain=[self.BUS, self.TIME],
+            type="positive"
+        )
+
+    # can bang Q: Qcap(BUS) co dinh thay bang QINST * Scap(BUS, TIME)
+    def QcapTime(self):
+        return (self.QINST[self.BUS] * self.Scap[self.BUS, self.TIME]).where[self.INST[self.BUS]]
+
+    def define_Equation(self):
+        super().define_Equation()
+        # SW >= |S(t) - S(t-1)|, gio dau so voi trang thai S0 truoc cua so
+        self.Eqs_SW1 = Equation(
+            self.CONTAINER,
+            name='Eqs_SW1',
+            domain=[self.BUS, self.TIME]
+        )
+        self.Eqs_SW2 = Equation(
+            self.CONTAINER,
+            name='Eqs_SW2',
+            domain=[self.BUS, self.TIME]
+        )
+        prev = self.Scap[self.BUS, self.TIME.lag(1)] + self.S0[self.BUS].where[self.TIME.first]
+        self.Eqs_SW1[self.BUS, self.TIME].where[self.INST[self.BUS]] = (
+            self.SW[self.BUS, self.TIME] >= self.Scap[self.BUS, self.TIME] - prev
+        )
+        self.Eqs_SW2[self.BUS, self.TIME].where[self.INST[self.BUS]] = (
+            self.SW[self.BUS, self.TIME] >= prev - self.Scap[self.BUS, self.TIME]
+        )
+        # so lan dong cat trong cua so + so lan da dung (window - 1) gio truoc <= SWMAX
+        # -> moi khoang window gio lien tiep cua ke hoach da thuc hien deu khong vuot SWMAX
+        self.Eqs_SWN = Equation(
+            self.CONTAINER,
+            name='Eqs_SWN',
+            domain=self.BUS
+        )
+        self.Eqs_SWN[self.BUS].where[self.INST[self.BUS]] = (
+            Sum(self.TIME, self.SW[self.BUS, self.TIME]) + self.SWUSED[self.BUS] <= self.SWMAX
+        )
+
+    def define_Obj(self):
+        # chi phi ton that trong cua so (moi gio la mot gio thuc) + chi phi dong cat
+        self.Eqs_Obj = Equation(
+            self.CONTAINER,
+            name='Eqs_Obj',
+        )
+        self.Eqs_Obj[...] = (
+            self.OBJ ==
+            Sum(
+                (self.BUS, self.NODE, self.TIME),
+                (self.BrnData[self.BUS, self.NODE, 'R'] *
+                self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
+                self.SBASE * self.COSTA
+                ).where[self.BRN[self.BUS, self.NODE]]
+            )
+            + Sum(self.INST[self.BUS], Sum(self.TIME, self.SWCOST * self.SW[self.BUS, self.TIME]))
+        )
+
+    def define_Options(self):
+        super().define_Options()
+        self.opts.listing_file = os.path.join(tempfile.gettempdir(), 'misocp_dispatch.lst')
+        if self.time_limit:
+            self.opts.time_limit = self.time_limit
+        self.solver_options = MIPSTART_OPTION.get(self.solver.lower())
+
+        return True
+
+    def define_Model(self):
+        # bo Eqs20, Eqs9, Eqs10 (Zcap / Qcap cua bai toan quy hoach)
+        skip = {self.Eqs20.name, self.Eqs9.name, self.Eqs10.name}
+        self.MODEL = Model(
+            self.CONTAINER,
+            name='Capacitor_Dispatch',
+            equations=[eq for eq in self.CONTAINER.getEquations() if eq.name not in skip],
+            sense=Sense.MIN,
+            objective=self.OBJ,
+            problem=Problem.MIQCP
+        )
+
+        return True
+
+    def build(self, tighten=None):
+        super().build(tighten)
+        self.set_state({bus: 1 for bus in self.inst_bus}, {bus: 0 for bus in self.inst_bus})
+
+        return True
+
+    def set_state(self, state, used, plan=None):
+        # state: {bus: 0/1} truoc cua so; used: {bus: so lan dong cat}; plan: {bus: [0/1] * window} nghiem ban dau
+        self.S0.setRecords([(bus, 1.0) for bus, s in state.items() if s > 0.5])
+        self.SWUSED.setRecords([(bus, float(n)) for bus, n in used.items() if n > 0])
+        if plan is not None:
+            self.Scap.setRecords(pd.DataFrame(
+                [(bus, t, float(s)) for bus, row in plan.items() for t, s in zip(self.time, row)],
+                columns=['BUS', 'TIME', 'level']
+            ))
+
+    def solve_window(self, output=None):
+        self.MODEL.solve(solver=self.solver, options=self.opts, output=output, solver_options=self.solver_options)
+        df = self.Scap.records
+        plan = {bus: [0] * self.window for bus in self.inst_bus}
+        if df is not None:
+            for bus, t, s in zip(df.iloc[:, 0], df.iloc[:, 1], df['level']):
+                if int(bus) in plan:
+                    plan[int(bus)][int(t) - 1] = int(round(s))
+        return solution_kind(self.MODEL), plan
+
+
+def rolling_dispatch(opt, hours=24, start=0, forecast=None, output=None):
+    # truot cua so tung gio: giai cua so [k, k + window), thuc hien trang thai gio dau, cap nhat du bao va trang thai
+    # forecast(k) -> (window, 3) du bao phu tai cho cua so bat dau o gio k; mac dinh lay tu bieu do phu tai
+    window = opt.window
+    state = {bus: 1 for bus in opt.inst_bus}
+    history = {bus: [] for bus in opt.inst_bus}     # so lan dong cat tung gio da thuc hien
+    plan, log = None, []
+    for k in range(start, start + hours):
+        t0 = time.perf_counter()
+        opt.set_window(k, None if forecast is None else forecast(k))
+        used = {bus: sum(h[-(window - 1):]) if window > 1 else 0 for bus, h in history.items()}
+        # nghiem ban dau: ke hoach cua buoc truoc dich di mot gio
+        warm = None if plan is None else {bus: row[1:] + row[-1:] for bus, row in plan.items()}
+        opt.set_state(state, used, warm)
+        kind, new_plan = opt.solve_window()
+        status = opt.MODEL.status.name
+        # nghiem chua toi uu (het thoi gian) van dung duoc nhung danh dau rieng trong log
+        if kind is not None:
+            plan = new_plan
+        elif warm is not None:
+            # khong tim duoc nghiem trong thoi gian cho phep: giu ke hoach cu
+            plan = warm
+        else:
+            plan = {bus: [state[bus]] * window for bus in opt.inst_bus}
+        latency = time.perf_counter() - t0
+
+        for bus in opt.inst_bus:
+            history[bus].append(int(plan[bus][0] != state[bus]))
+            state[bus] = plan[bus][0]
+        row = {'hour': k, 'status': status, 'optimal': kind == 'optimal', 'latency': latency, 'objective': opt.MODEL.objective_value,
+               'solve_time': opt.MODEL.solve_model_time, 'n_switch': sum(h[-1] for h in history.values())}
+        row.update({f'S{bus}': state[bus] for bus in opt.inst_bus})
+        log.append(row)
+        if output:
+            print(f"  gio {k:>4}: {status:<15}{'' if kind == 'optimal' else '*'} {latency:6.2f}s  " +
+                  " ".join(f"{bus}:{state[bus]}" for bus in opt.inst_bus), file=output)
+    return pd.DataFrame(log)
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+    result_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\result\result.xlsx"
+
+    opt = DispatchModel(input_xlsx, input_json, installed=result_xlsx, window=24, max_switch=4, time_limit=5)
+    opt.build()
+    log = rolling_dispatch(opt, hours=24, output=sys.stdout)
+    print(f"\nDo tre trung binh {log['latency'].mean():.2f}s, lon nhat {log['latency'].max():.2f}s")
+    print(f"Tong so lan dong cat: {int(log['n_switch'].sum())}")
+    print(f"So gio khong co nghiem toi uu (*): {int((~log['optimal']).sum())}")
+
+
+if __name__ == '__main__':
+    main()
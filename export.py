@@ -0,0 +1,175 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# ten sheet / thu muc ket qua -> thuoc tinh bien trong MISOCP
+RESULT_VARS = {
+    'Voltage': 'Usqr',
+    'Pbrn': 'Pbrn',
+    'Qbrn': 'Qbrn',
+    'Qcap': 'Qcap',
+    'Zcap': 'Zcap',
+    'Ibrn_sqr': 'Ibrn_sqr',
+    'Pgen': 'Pgen',
+    'Qgen': 'Qgen',
+    'PD': 'PD',
+    'QD': 'QD',
+}
+EXCEL_MAX_ROWS = 1048575
+
+
+def installed_caps(opt):
+    df = opt.Zcap.records
+    if df is None or df.empty:
+        return df
+    return df[df['level'] > 0.5]
+
+
+class ExcelExport:
+    # result.xlsx: summary_only chi ghi Objective, Zcap, Qcap, Cap_Installed va thong ke tung bien
+    def __init__(self, output_file, summary_only=False):
+        self.output_file = output_file
+        self.summary_only = summary_only
+
+    def write(self, opt):
+        output_file = self.output_file
+        if os.path.exists(output_file):
+            try:
+                os.remove(output_file)
+            except PermissionError:
+                timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+                output_file = os.path.join(os.path.dirname(output_file), f"result_{timestamp}.xlsx")
+                print(f"File result.xlsx dang mo, luu vao: {output_file}")
+
+        summary = []
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            for sheet, attr in RESULT_VARS.items():
+                df = getattr(opt, attr).records
+                if df is None or df.empty:
+                    continue
+                summary.append({
+                    'Variable': sheet, 'Rows': len(df),
+                    'Min': df['level'].min(), 'Max': df['level'].max(), 'Mean': df['level'].mean(),
+                })
+                full = not self.summary_only or sheet in ('Qcap', 'Zcap')
+                if full and len(df) > EXCEL_MAX_ROWS:
+                    print(f"  {sheet}: {len(df)} rows vuot gioi han Excel, chi ghi thong ke")
+                elif full:
+                    df.to_excel(writer, sheet_name=sheet, index=False)
+                    print(f"  {sheet}: {len(df)} rows, {len(df.columns)} cols")
+                if sheet == 'Zcap':
+                    df_installed = installed_caps(opt)
+                    df_installed.to_excel(writer, sheet_name="Cap_Installed", index=False)
+                    print(f"  Zcap: {len(df)} rows, Installed: {len(df_installed)}")
+
+            pd.DataFrame(summary).to_excel(writer, sheet_name="Summary", index=False)
+            obj_val = opt.OBJ.toValue()
+            pd.DataFrame({
+                "Objective": [obj_val],
+                "Description": ["Total Cost ($/year)"]
+            }).to_excel(writer, sheet_name="Objective", index=False)
+            print(f"  Objective: {obj_val:.2f}")
+
+        return output_file
+
+
+class ParquetExport:
+    # out_dir/<bien>/TIME=<t>/part.parquet, ghi tung phan vung; bien khong co TIME ghi mot file
+    # records cua Container duoc doc theo lo chunk dong (khong sao chep / ep kieu ca bang), moi lo la mot row group
+    def __init__(self, out_dir, float32=False, columns=('level', 'marginal'), chunk=1 << 20):
+        self.out_dir = out_dir
+        self.float32 = float32
+        self.columns = list(columns)
+        self.chunk = chunk
+
+    def to_arrow(self, pa, part, keys):
+        dtype = np.float32 if self.float32 else np.float64
+        arrays = {key: pa.array(part[key]) for key in keys}
+        arrays.update({col: pa.array(part[col].to_numpy(dtype)) for col in self.columns})
+        return pa.table(arrays)
+
+    def write_file(self, pa, pq, df, keys, rows, path):
+        # rows: chi so dong cua df thuoc file nay (None = moi dong)
+        n = len(df) if rows is None else len(rows)
+        writer = None
+        try:
+            for k in range(0, n, self.chunk):
+                part = df.iloc[k:k + self.chunk] if rows is None else df.take(rows[k:k + self.chunk])
+                table = self.to_arrow(pa, part, keys)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def write(self, opt):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Can cai pyarrow de xuat ket qua Parquet: pip install pyarrow')
+
+        for name, attr in RESULT_VARS.items():
+            df = getattr(opt, attr).records
+            if df is None or df.empty:
+                continue
+            keys = list(df.columns[:df.columns.get_loc('level')])
+            path = os.path.join(self.out_dir, name)
+            os.makedirs(path, exist_ok=True)
+
+            if 'TIME' not in keys:
+                self.write_file(pa, pq, df, keys, None, os.path.join(path, 'part.parquet'))
+                continue
+            # sap xep chi so dong theo TIME (mot mang int), ghi lan luot tung phan vung
+            keys.remove('TIME')
+            time_col = df['TIME']
+            codes = time_col.cat.codes.to_numpy() if hasattr(time_col, 'cat') else pd.factorize(time_col)[0]
+            labels = time_col.cat.categories if hasattr(time_col, 'cat') else pd.unique(time_col)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(labels)))]
+            for c, t in enumerate(labels):
+                if bounds[c] == bounds[c + 1]:
+                    continue
+                part_dir = os.path.join(path, f'TIME={t}')
+                os.makedirs(part_dir, exist_ok=True)
+                self.write_file(pa, pq, df, keys, order[bounds[c]:bounds[c + 1]], os.path.join(part_dir, 'part.parquet'))
+            print(f"  {name}: {len(df)} rows -> {path}")
+
+        return self.out_dir
+
+
+class GdxExport:
+    # ghi nguyen cac symbol tu Container ra file .gdx (khong qua pandas)
+    def __init__(self, output_file):
+        self.output_file = output_file
+
+    def write(self, opt):
+        names = [getattr(opt, attr).name for attr in RESULT_VARS.values()] + [opt.OBJ.name]
+        opt.CONTAINER.write(self.output_file, symbol_names=names)
+        print(f"  GDX: {len(names)} symbols -> {self.output_file}")
+        return self.output_file
+
+
+def make_exports(out_dir, formats=('xlsx',), float32=False, summary_only=False):
+    exports = []
+    for fmt in formats:
+        if fmt == 'xlsx':
+            exports.append(ExcelExport(os.path.join(out_dir, 'result.xlsx'), summary_only))
+        elif fmt == 'parquet':
+            exports.append(ParquetExport(os.path.join(out_dir, 'parquet'), float32))
+        elif fmt == 'gdx':
+            exports.append(GdxExport(os.path.join(out_dir, 'result.gdx')))
+        else:
+            raise ValueError(f'Dinh dang ket qua khong hop le: {fmt}')
+    return exports
+
+
+def export_result(opt, out_dir, formats=('xlsx',), float32=False, summary_only=False):
+    os.makedirs(out_dir, exist_ok=True)
+    timing = {}
+    for exporter in make_exports(out_dir, formats, float32, summary_only):
+        t0 = time.perf_counter()
+        exporter.write(opt)
+        timing[type(exporter).__name__] = time.perf_counter() - t0
+    return timing
@@ -0,0 +1,136 @@
+import numpy as np
+
+from powerflow import PowerFlow
+
+
+def invest_cost(opt):
+    # chi phi dau tu quy doi hang nam cua tung loai tu, cung don vi voi Eqs_Obj
+    crf = opt.r * (1 + opt.r)**opt.M / ((1 + opt.r)**opt.M - 1)
+    return np.array([cost * q * opt.s_base * crf for cost, q in zip(opt.cost_cap, opt.Q_cap)])
+
+
+def zcap_to_qcap(opt, zcap):
+    pos = {bus: k for k, bus in enumerate(opt.id_bus)}
+    q_cap = dict(zip(opt.id_cap, opt.Q_cap))
+    qcap = np.zeros(len(opt.id_bus))
+    for (bus, cap), z in zcap.items():
+        if z > 0.5:
+            qcap[pos[bus]] += q_cap[cap]
+    return qcap
+
+
+def placement_cost(opt, zcap, pf=None):
+    # danh gia phuong an Zcap bang phan bo cong suat chinh xac (cung don vi voi Eqs_Obj)
+    pf = pf or PowerFlow(opt)
+    res = pf.solve(zcap_to_qcap(opt, zcap))
+    invest = dict(zip(opt.id_cap, invest_cost(opt)))
+    loss_cost = opt.cost_A * opt.s_base * float(res['loss'] @ pf.w_time)
+    invest_total = sum(invest[cap] for (bus, cap), z in zcap.items() if z > 0.5)
+    return {
+        'objective': loss_cost + invest_total,
+        'loss_cost': loss_cost,
+        'invest_cost': invest_total,
+        'u_min': float(np.sqrt(res['Usqr'].min())),
+        'u_max': float(np.sqrt(res['Usqr'].max())),
+    }
+
+
+def volt_violation(opt, Usqr):
+    # vi pham gioi han dien ap lon nhat theo tung phuong an (truc 0 la bus, truc cuoi la gio)
+    viol = np.maximum(opt.u_min**2 - Usqr, Usqr - opt.u_max**2).clip(min=0)
+    return viol.max(axis=(0, -1))
+
+
+def loss_sensitivity(opt, pf, base):
+    # ton that nhanh l ~ R_l (P_l^2 + Q_l^2) / U_l; them q tai b giam Q_l tren duong ve nguon
+    # => dLoss(b, q) ~ sum_{l in path(b)} R_l / U_l * sum_t w_t (q^2 - 2 q Q_l,t)
+    # tra ve uoc luong thay doi chi phi (bus, cap) gom ca chi phi dau tu
+    topo = pf.topo
+    w = pf.w_time
+    q_cap = np.asarray(opt.Q_cap, dtype=float)
+    child = topo.bfs_order[1:]
+    inv_u = np.zeros_like(base['Usqr'])
+    inv_u[child] = 1 / base['Usqr'][topo.parent[child]]
+    A = pf.path_sum(pf.R * ((base['Qbrn'] * inv_u) @ w))
+    B = pf.path_sum(pf.R * (inv_u @ w))
+    price = opt.cost_A * opt.s_base
+    return price * (B[:, None] * q_cap[None]**2 - 2 * A[:, None] * q_cap[None]) + invest_cost(opt)[None]
+
+
+def candidate_mask(opt, candidate):
+    # danh sach (bus, cap) -> mask (bus, cap); None = moi bus tru bus nguon
+    topo = opt.topo
+    mask = np.zeros((len(opt.id_bus), len(opt.id_cap)), dtype=bool)
+    if candidate is None:
+        mask[:] = True
+    else:
+        cpos = {cap: k for k, cap in enumerate(opt.id_cap)}
+        for bus, cap in candidate:
+            mask[topo.pos[bus], cpos[cap]] = True
+    mask[topo.root] = False
+    return mask
+
+
+def sensitivity_candidate(opt, n_bus, pf=None):
+    # loc truoc: giu n_bus bus co do nhay ton that tot nhat, moi bus giu cac loai tu lam giam chi phi (it nhat 1 loai)
+    pf = pf or PowerFlow(opt)
+    approx = loss_sensitivity(opt, pf, pf.solve())
+    approx[pf.topo.root] = np.inf
+    best = approx.min(axis=1)
+    n_bus = min(n_bus, int(np.isfinite(best).sum()))
+    buses = np.argpartition(best, n_bus - 1)[:n_bus]
+    candidate = []
+    for b in sorted(buses, key=lambda b: best[b]):
+        caps = np.flatnonzero(approx[b] < 0)
+        if len(caps) == 0:
+            caps = [int(np.argmin(approx[b]))]
+        candidate += [(opt.id_bus[b], opt.id_cap[c]) for c in caps]
+    return candidate
+
+
+def greedy_zcap(opt, n_eval=8, pf=None, candidate=None):
+    # xep hang bus theo do nhay ton that tu ket qua sweep, danh gia chinh xac n_eval ung vien tot nhat moi buoc
+    pf = pf or PowerFlow(opt)
+    topo = pf.topo
+    w = pf.w_time
+    q_cap = np.asarray(opt.Q_cap, dtype=float)
+    invest = invest_cost(opt)
+    price = opt.cost_A * opt.s_base
+    allowed = candidate_mask(opt, candidate)
+
+    qcap = np.zeros(topo.n_bus)
+    base = pf.solve(qcap)
+    base_cost = price * float(base['loss'] @ w)
+    base_viol = volt_violation(opt, base['Usqr'])
+
+    zcap = {}
+    used = ~allowed.any(axis=1)
+    while len(zcap) < opt.Y and not used.all():
+        approx = loss_sensitivity(opt, pf, base)
+        approx[used] = np.inf
+        approx[~allowed] = np.inf
+
+        # danh gia chinh xac cac ung vien tot nhat trong mot lan sweep theo lo
+        k = min(n_eval, np.isfinite(approx).sum())
+        if k == 0:
+            break
+        flat = np.argpartition(approx.ravel(), k - 1)[:k]
+        bus, cap = np.unravel_index(flat, approx.shape)
+        batch = np.repeat(qcap[:, None], k, axis=1)
+        batch[bus, np.arange(k)] += q_cap[cap]
+        res = pf.solve(batch)
+        delta = price * (res['loss'] @ w) + invest[cap] - base_cost
+        delta[volt_violation(opt, res['Usqr']) > base_viol + 1e-9] = np.inf
+
+        best = int(np.argmin(delta))
+        if delta[best] >= 0:
+            break
+        b, c = bus[best], cap[best]
+        zcap[(opt.id_bus[b], opt.id_cap[c])] = 1
+        used[b] = True
+        qcap[b] += q_cap[c]
+        base = pf.solve(qcap)
+        base_cost += delta[best] - invest[c]
+        base_viol = volt_violation(opt, base['Usqr'])
+
+    return zcap
@@ -14,13 +14,31 @@ from gamspy import (
     Problem,
     Sense,
 )
+from topology import FeederTopology
+from cache import load_xlsx
+from cluster import apply_clustering
+from solver import get_backend
 
 class GetData:
-    def __init__(self, xlsx_file=None, json_file=None):
+    # cac thuoc tinh doc tu file.xlsx duoc luu vao cache
+    XLSX_ATTRS = (
+        'id_bus', 'name_bus', 'id_load', 'pload', 'qload', 'type_load', 'id_slack', 'u_slack',
+        'id_line', 'f_bus', 't_bus', 'R_brn', 'X_brn', 'rateA',
+        'time', 'res_prf', 'com_prf', 'ind_prf',
+        'id_cap', 'type_cap', 'Q_cap', 'cost_cap',
+    )
+
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None):
         self.xlsx_file = xlsx_file or 'ieee33.xlsx'
         self.json_file = json_file or 'config.json'
+        self.cache_dir = cache_dir
+        self.use_cache = True
 
     def get_xlsx(self):
+        # doc tu cache neu file.xlsx va base (config.json) khong doi
+        return load_xlsx(self)
+
+    def read_xlsx(self):
         try:
             ## bus data
             bus_df = pd.read_excel(self.xlsx_file, sheet_name='bus', header=1)
@@ -44,8 +62,9 @@ class GetData:
             line_df = pd.read_excel(self.xlsx_file, sheet_name='line', header=1)
             #
             self.id_line = line_df['ID'].tolist()
-            self.f_bus = line_df['FromBus'].tolist()
-            self.t_bus = line_df['ToBus'].tolist()
+            # dinh huong nhanh tu bus nguon (cha -> con), khong phu thuoc cach danh so bus
+            self.topo = FeederTopology(self.id_bus, line_df['FromBus'].tolist(), line_df['ToBus'].tolist(), self.id_slack)
+            self.f_bus, self.t_bus = self.topo.oriented()
             self.R_brn = [r / self.z_base for r in line_df['R[Ohm]'].tolist()]
             self.X_brn = [x / self.z_base for x in line_df['X[Ohm]'].tolist()]
             self.rateA = [rate / self.i_base for rate in line_df['rateA[kA]'].tolist()]
@@ -77,6 +96,8 @@ class GetData:
 
             # data
             self.typeload = config['data']['type_load']
+            self.rep_days = config['data'].get('rep_days')     # so ngay dai dien (phan cum loadprofile)
+            self.cluster_method = config['data'].get('cluster_method', 'kmeans')
 
             # base data
             self.s_base = config['base']['s_base']
@@ -94,17 +115,24 @@ class GetData:
             self.M = config['economic_parameters']['M']     # tuoi tho tu bu ngang
             self.Y = config['economic_parameters']['Y']     # tong so vi tri dat tu bu ngang
 
+            self.solver = config['solver']
+            self.backend = config.get('backend', 'gams')     # 'gams' (solver o tren), 'scip' / 'highs' cuc bo
+
         #
         except Exception as e:
             print(f'Loi doc file.json: {e}')
 
-    
+    def cluster_profile(self):
+        # trong so gio WTIME giong misocp2 (phan cum neu co rep_days); pload chi gom bus co tai nen khong kiem tra bang sweep
+        return apply_clustering(self)
+
 
 class MISOCP(GetData):
-    def __init__(self, xlsx_file=None, json_file=None):
-        super().__init__(xlsx_file, json_file)
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None):
+        super().__init__(xlsx_file, json_file, cache_dir)
         self.get_json()
         self.get_xlsx()
+        self.cluster_profile()
         self.CONTAINER = Container()
 
     # difine Set 
@@ -186,23 +214,10 @@ class MISOCP(GetData):
             self.CONTAINER,
             name='RATEBRN',
             domain=[self.BUS, self.NODE],
-            records=list(zip(self.f_bus, self.t_bus, self.rateA))
+            records=list(zip(self.f_bus, self.t_bus, self.rateA)),
+            description='Khai bao dong dien dinh muc rateA_ij'
         )
         #
-        self.PLOAD = Parameter(
-            self.CONTAINER,
-            name='PLOAD',
-            domain=[self.LOAD, self.TIME],
-            description='Khai bao gia tri Pload'
-        )
-        #
-        self.QLOAD = Parameter(
-            self.CONTAINER,
-            name='QLOAD',
-            domain=[self.LOAD, self.TIME],
-            description='Khai bao gia tri Qload'
-        )
-        
         prf_map = {
             "Residential": self.res_prf,
             "Commercial": self.com_prf,
@@ -217,12 +232,37 @@ class MISOCP(GetData):
                 if load_type == self.typeload
             ]
 
+        pload_records, qload_records = [], []
         for bus, pload, qload, load_type in buses_to_process:
-            prf_list = prf_map[load_type]  
-            for tdx, time in enumerate(self.time):
-                prf = prf_list[tdx]
-                self.PLOAD[bus, time] = pload * prf
-                self.QLOAD[bus, time] = qload * prf
+            prf_list = prf_map[load_type]
+            for time, prf in zip(self.time, prf_list):
+                pload_records.append((bus, time, pload * prf))
+                qload_records.append((bus, time, qload * prf))
+
+        # PLOAD/QLOAD khai bao tren BUS de dung truc tiep trong eqs (13) - (14)
+        self.PLOAD = Parameter(
+            self.CONTAINER,
+            name='PLOAD',
+            domain=[self.BUS, self.TIME],
+            records=pload_records,
+            description='Khai bao gia tri Pload'
+        )
+        #
+        self.QLOAD = Parameter(
+            self.CONTAINER,
+            name='QLOAD',
+            domain=[self.BUS, self.TIME],
+            records=qload_records,
+            description='Khai bao gia tri Qload'
+        )
+
+        self.WTIME = Parameter(
+            self.CONTAINER,
+            name='WTIME',
+            domain=self.TIME,
+            records=list(zip(self.time, self.w_time)),
+            description='Trong so thoi gian (so ngay trong nam ma moi gio dai dien)'
+        )
 
         # capacitor data
         self.SIZECAP = Parameter(
@@ -291,6 +331,14 @@ class MISOCP(GetData):
             description='Khai bao he so chiet khau'
         )
 
+    # gioi han dien ap theo UMIN/UMAX (bieu thuc GAMS, khong lay gia tri Python), goi lai khi UMIN/UMAX thay doi
+    def define_Bounds(self):
+        self.Usqr.lo[self.BUS, self.TIME] = self.UMIN**2
+        self.Usqr.up[self.BUS, self.TIME] = self.UMAX**2
+        self.Usqr.fx[self.id_slack, self.TIME] = self.u_slack**2
+
+        return True
+
     # define Variable
     def define_Variable(self):
 
@@ -301,9 +349,7 @@ class MISOCP(GetData):
             domain=[self.BUS, self.TIME],
             type="positive"
         )
-        self.Usqr.lo[self.BUS, self.TIME] = self.UMIN.toValue()**2
-        self.Usqr.up[self.BUS, self.TIME] = self.UMAX.toValue()**2
-        self.Usqr.fx[self.id_slack, self.TIME] = self.u_slack**2
+        self.define_Bounds()
 
         #
         self.Ibrn_sqr = Variable(
@@ -312,8 +358,9 @@ class MISOCP(GetData):
             domain=[self.BUS, self.NODE, self.TIME],
             type="positive"
         )
-        for (fbus, tbus, rate) in zip(self.f_bus, self.t_bus, self.rateA):
-            self.Ibrn_sqr.up[fbus, tbus, self.TIME] = rate**2
+        self.Ibrn_sqr.up[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = (
+            self.RATEBRN[self.BUS, self.NODE]**2
+        )
 
         #
         self.Pbrn = Variable(
@@ -369,10 +416,10 @@ class MISOCP(GetData):
         return True
     
     def get_parent(self, parent):
-        return [fbus for (fbus, tbus) in zip(self.f_bus, self.t_bus) if tbus == parent]
+        return self.topo.get_parent(parent)
     
     def get_child(self, child):
-        return [tbus for (fbus, tbus) in zip(self.f_bus, self.t_bus) if fbus == child]
+        return self.topo.get_child(child)
     
     # define equation
     def define_Equation(self):
@@ -390,30 +437,40 @@ class MISOCP(GetData):
             domain=[self.BUS, self.TIME]
         )
 
-        for fbus in self.id_bus:
-            for t in self.time:
-                self.Eqs13[fbus, t] = (
-                    (self.Pgen[fbus, t] if fbus == self.id_slack else 0) +
-                    sum(
-                        (self.Pbrn[parent, fbus, t] - self.RBRN[parent, fbus] * self.Ibrn_sqr[parent, fbus, t]) 
-                        for parent in self.get_parent(fbus)
-                        )
-                    ==
-                    sum(self.Pbrn[fbus, child, t] for child in self.get_child(fbus) if child != fbus) +
-                    (self.PLOAD[fbus, t] if fbus in self.id_load else 0)
-                )
-                #
-                self.Eqs14[fbus, t] = (
-                    (self.Qgen[fbus, t] if fbus == self.id_slack else 0) +
-                    sum(
-                        (self.Qbrn[parent, fbus, t] - self.XBRN[parent, fbus] * self.Ibrn_sqr[parent, fbus, t])
-                        for parent in self.get_parent(fbus)
-                    ) +
-                    self.Qcap[fbus]
-                    ==
-                    sum(self.Qbrn[fbus, child, t] for child in self.get_child(fbus) if child != fbus) +
-                    (self.QLOAD[fbus, t] if fbus in self.id_load else 0)
-                )
+        self.Eqs13[self.BUS, self.TIME] = (
+            Sum(
+                self.SLACK.where[self.SLACK.sameAs(self.BUS)],
+                self.Pgen[self.SLACK, self.TIME]
+            ) +
+            Sum(
+                self.NODE.where[self.BRN[self.NODE, self.BUS]],
+                self.Pbrn[self.NODE, self.BUS, self.TIME] - 
+                self.RBRN[self.NODE, self.BUS] * self.Ibrn_sqr[self.NODE, self.BUS, self.TIME]
+            )
+            ==
+            Sum(
+                self.NODE.where[self.BRN[self.BUS, self.NODE] & ~self.NODE.sameAs(self.BUS)],
+                self.Pbrn[self.BUS, self.NODE, self.TIME]
+            ) + self.PLOAD[self.BUS, self.TIME]
+        )
+        #
+        self.Eqs14[self.BUS, self.TIME] = (
+            Sum(
+                self.SLACK.where[self.SLACK.sameAs(self.BUS)],
+                self.Qgen[self.SLACK, self.TIME]
+            ) +
+            Sum(
+                self.NODE.where[self.BRN[self.NODE, self.BUS]],
+                self.Qbrn[self.NODE, self.BUS, self.TIME] - 
+                self.XBRN[self.NODE, self.BUS] * self.Ibrn_sqr[self.NODE, self.BUS, self.TIME]
+            ) +
+            self.Qcap[self.BUS]
+            ==
+            Sum(
+                self.NODE.where[self.BRN[self.BUS, self.NODE] & ~self.NODE.sameAs(self.BUS)],
+                self.Qbrn[self.BUS, self.NODE, self.TIME]
+            ) + self.QLOAD[self.BUS, self.TIME]
+        )
 
         # eqs (15) - (16)
         self.Eqs15 = Equation(
@@ -457,7 +514,7 @@ class MISOCP(GetData):
             name='Eqs9',
         )
         self.Eqs9[...] = (
-            Sum((self.BUS, self.CAP), self.Zcap[self.BUS, self.CAP]) <= self.YCAP.toValue()
+            Sum((self.BUS, self.CAP), self.Zcap[self.BUS, self.CAP]) <= self.YCAP
         )
         #
         self.Eqs10 = Equation(
@@ -479,22 +536,20 @@ class MISOCP(GetData):
         )
 
         self.Eqs_Obj[...] = (
-            self.OBJ == 365 * sum(
-                # (self.BUS, self.NODE, self.TIME),
-                # self.RBRN[self.BUS, self.NODE] *
-                # self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
-                # self.SBASE.toValue() * self.COSTA.toValue()
-                self.RBRN[fbus, tbus] *
-                self.Ibrn_sqr[fbus, tbus, time] *
-                self.SBASE.toValue() * self.COSTA.toValue()
-                for (fbus, tbus, time) in zip(self.f_bus, self.t_bus, self.time)
+            self.OBJ == Sum(
+                (self.BUS, self.NODE, self.TIME),
+                (self.WTIME[self.TIME] *
+                self.RBRN[self.BUS, self.NODE] *
+                self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
+                self.SBASE * self.COSTA
+                ).where[self.BRN[self.BUS, self.NODE]]
             )
             + Sum(
                 (self.BUS, self.CAP),
-                self.Zcap[self.BUS, self.CAP] * self.SBASE.toValue() *
+                self.Zcap[self.BUS, self.CAP] * self.SBASE *
                 self.COSTCAP[self.CAP] * self.SIZECAP[self.CAP] *
-                self.R.toValue() * (1 + self.R.toValue())**self.MCAP.toValue() / 
-                ((1 + self.R.toValue())**self.MCAP.toValue() - 1)
+                self.R * (1 + self.R)**self.MCAP / 
+                ((1 + self.R)**self.MCAP - 1)
             )
         ) 
         
@@ -506,7 +561,7 @@ class MISOCP(GetData):
         self.opts.equation_listing_limit = 10000000
         self.opts.absolute_optimality_gap = 0.0          # optca
         self.opts.relative_optimality_gap = 0.0          # optcr
-        self.opts.miqcp = "cplex" 
+        self.opts.miqcp = self.solver
         self.opts.listing_file = 'misocp.lst'
 
         return True
@@ -525,9 +580,10 @@ class MISOCP(GetData):
         return True
     
     def Solve(self):
-        self.MODEL.solve(options=self.opts, output=sys.stdout)
+        res = get_backend(self.backend).solve(self, output=sys.stdout)
+        print(f"{res['backend']}: {res['status']}, OBJ = {res['objective']}")
 
-        return True
+        return res
 
 def main():
     input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
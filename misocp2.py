@@ -1,4 +1,8 @@
 import os, sys
+import copy
+import time
+import argparse
+from contextlib import nullcontext
 import pandas as pd
 import json 
 from gamspy import (
@@ -9,20 +13,70 @@ from gamspy import (
     Variable,
     Equation,
     Sum,
+    Smax,
     Options,
     Model,
     Problem,
     Sense
 )
+from topology import FeederTopology
+from cache import load_xlsx, ResultCache
+from cluster import apply_clustering
+from heuristic import greedy_zcap, sensitivity_candidate
+from powerflow import verify_solution, PowerFlow
+from bounds import branch_bounds
+from export import export_result
+from profiler import Profiler, model_stats
+from solver import get_backend, installed_zcap
 PATH_PY = os.path.dirname(__file__)
 PATH_RESULT = os.path.join(PATH_PY, 'result')
 
+# tuy chon solver de dung Zcap.l lam nghiem ban dau (MIP start)
+MIPSTART_OPTION = {
+    'cplex': {'mipstart': 3},       # co dinh bien nguyen, giai bai toan con de hoan thien nghiem
+    'gurobi': {'mipstart': 1},
+    'xpress': {'mipstart': 1},
+    'copt': {'mipstart': 1},
+}
+
+def parse_candidate(value, id_cap):
+    # gia tri o cot Candidate -> danh sach ID tu: cot so co o trong duoc pandas doc thanh float (1.0, nan, 0.0)
+    if isinstance(value, str):
+        value = value.strip()
+        if ',' in value:
+            return [int(float(c)) for c in value.split(',') if c.strip()]
+        value = value or None
+    if value is None or pd.isna(value):
+        return []
+    value = int(float(value))
+    if value == 0:
+        return []
+    if value == 1:
+        return list(id_cap)
+    # mot so khac 0/1 la ID cua mot loai tu
+    return [value]
+
+
 class GetData:
-    def __init__(self, xlsx_file=None, json_file=None):
+    # cac thuoc tinh doc tu file.xlsx duoc luu vao cache
+    XLSX_ATTRS = (
+        'id_bus', 'name_bus', 'pload', 'qload', 'type_load', 'res_load', 'ind_load', 'com_load',
+        'id_slack', 'u_slack', 'id_line', 'f_bus', 't_bus', 'R_brn', 'X_brn', 'rateA',
+        'time', 'res_prf', 'com_prf', 'ind_prf',
+        'id_cap', 'type_cap', 'Q_cap', 'cost_cap', 'cand_sheet',
+    )
+
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None):
         self.xlsx_file = xlsx_file or 'ieee33.xlsx'
         self.json_file = json_file or 'config.json'
+        self.cache_dir = cache_dir
+        self.use_cache = True
 
     def get_xlsx(self):
+        # doc tu cache neu file.xlsx va base (config.json) khong doi
+        return load_xlsx(self)
+
+    def read_xlsx(self):
         try:
             ## bus data
             bus_df = pd.read_excel(self.xlsx_file, sheet_name='bus', header=1)
@@ -48,8 +102,9 @@ class GetData:
             line_df = pd.read_excel(self.xlsx_file, sheet_name='line', header=1)
             #
             self.id_line = line_df['ID'].tolist()
-            self.f_bus = line_df['FromBus'].tolist()
-            self.t_bus = line_df['ToBus'].tolist()
+            # dinh huong nhanh tu bus nguon (cha -> con), khong phu thuoc cach danh so bus
+            self.topo = FeederTopology(self.id_bus, line_df['FromBus'].tolist(), line_df['ToBus'].tolist(), self.id_slack)
+            self.f_bus, self.t_bus = self.topo.oriented()
             self.R_brn = [r / self.z_base for r in line_df['R[Ohm]'].tolist()]
             self.X_brn = [x / self.z_base for x in line_df['X[Ohm]'].tolist()]
             self.rateA = [rate / self.i_base for rate in line_df['rateA[kA]'].tolist()]
@@ -70,6 +125,14 @@ class GetData:
             self.Q_cap = [q / self.s_base / 1000 for q  in capacitor_df['Size[kVAr]'].tolist()]
             self.cost_cap = [cost * 1000 for cost in capacitor_df['Cost[$/kVAr]'].tolist()]
 
+            # cot Candidate (tuy chon) trong sheet bus: 1 = moi loai tu, '1,3' = cac ID tu cho phep, trong/0 = khong dat
+            self.cand_sheet = None
+            if 'Candidate' in bus_df.columns:
+                self.cand_sheet = []
+                for bus, value in zip(self.id_bus, bus_df['Candidate'].tolist()):
+                    caps = parse_candidate(value, self.id_cap)
+                    self.cand_sheet += [(bus, cap) for cap in caps]
+
         #
         except Exception as e:
             print(f'Loi doc file.xlsx: {e}')
@@ -81,6 +144,8 @@ class GetData:
 
             # data
             self.typeload = config['data']['type_load']
+            self.rep_days = config['data'].get('rep_days')     # so ngay dai dien (phan cum loadprofile)
+            self.cluster_method = config['data'].get('cluster_method', 'kmeans')
 
             # base data
             self.s_base = config['base']['s_base']
@@ -97,20 +162,78 @@ class GetData:
             self.r = config['economic_parameters']['r']     # he so chiet khau
             self.M = config['economic_parameters']['M']     # tuoi tho tu bu ngang
             self.Y = config['economic_parameters']['Y']     # tong so vi tri dat tu bu ngang
+            # quy hoach nhieu nam: so nam va toc do tang tai hang nam theo loai tai
+            planning = config.get('planning', {})
+            self.years = planning.get('years', 1)
+            self.growth = planning.get('growth', {})
 
             self.solver = config['solver']
+            self.backend = config.get('backend', 'gams')     # 'gams' (solver o tren), 'scip' / 'highs' cuc bo
+            self.warm_start = config.get('warm_start')     # 'greedy', duong dan result.xlsx hoac null
+            # vi tri ung vien dat tu: null (moi bus), 'sheet', 'sensitivity' hoac danh sach bus / [bus, cap]
+            self.candidate = config.get('candidate')
+            self.n_candidate = config.get('n_candidate', 20)
+            self.tighten = config.get('tighten', False)     # gioi han bien va lat cat tu du lieu luoi
+            self.rate_limit = config.get('rate_limit', False)     # Ibrn_sqr <= rateA^2 (thay doi mo hinh, khong phai thu hep)
+            self.substitute_load = config.get('substitute_load', False)     # bo bien PD/QD va Eqs_PL/Eqs_QL
+            # cache ket qua giai: bo qua GAMS khi du lieu dau vao, tuy chon solver va ma nguon khong doi
+            result_cache = config.get('result_cache', {})
+            self.result_cache = result_cache.get('enabled', False)
+            self.result_cache_dir = result_cache.get('dir')
+            self.result_cache_mb = result_cache.get('max_mb', 1024)
+            # xuat ket qua: 'xlsx', 'parquet', 'gdx'; float32 cho level/marginal; summary_only cho result.xlsx
+            export = config.get('export', {})
+            self.export_format = export.get('format', ['xlsx'])
+            self.export_float32 = export.get('float32', False)
+            self.export_summary_only = export.get('summary_only', False)
         #
         except Exception as e:
             print(f'Loi doc file.json: {e}')
 
+    def cluster_profile(self):
+        # sai so ton that cua phan cum duoc kiem tra bang sweep tren luoi
+        return apply_clustering(self, sweep=True)
+
+    def get_candidate(self):
+        # tap CANDIDATE(BUS, CAP): Zcap chi duoc tao tren cac cap nay (khong gom bus nguon)
+        if self.candidate is None:
+            pairs = [(bus, cap) for bus in self.id_bus for cap in self.id_cap]
+        elif self.candidate == 'sheet':
+            if self.cand_sheet is None:
+                raise ValueError('Sheet bus khong co cot Candidate')
+            pairs = self.cand_sheet
+        elif self.candidate == 'sensitivity':
+            pairs = sensitivity_candidate(self, self.n_candidate)
+        else:
+            pairs = []
+            for item in self.candidate:
+                if isinstance(item, (list, tuple)):
+                    pairs.append(tuple(item))
+                else:
+                    pairs += [(item, cap) for cap in self.id_cap]
+        self.cand_list = sorted({(bus, cap) for bus, cap in pairs if bus != self.id_slack})
+
     
 
 class MISOCP(GetData):
-    def __init__(self, xlsx_file=None, json_file=None):
-        super().__init__(xlsx_file, json_file)
-        self.get_json()
-        self.get_xlsx()
-        self.CONTAINER = Container()
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None, working_directory=None, profiler=None):
+        super().__init__(xlsx_file, json_file, cache_dir)
+        self.prof = profiler
+        with self.Phase('get_json'):
+            self.get_json()
+        with self.Phase('get_xlsx'):
+            self.get_xlsx()
+        with self.Phase('cluster_profile'):
+            self.cluster_profile()
+        with self.Phase('get_candidate'):
+            self.get_candidate()
+        self.CONTAINER = Container(working_directory=working_directory)
+
+    # do thoi gian / bo nho cua mot buoc neu co profiler
+    def Phase(self, name):
+        if self.prof is None:
+            return nullcontext({})
+        return self.prof.phase(name, getattr(self, 'CONTAINER', None))
 
     # difine Set 
     def define_Set(self):
@@ -196,6 +319,14 @@ class MISOCP(GetData):
             name='CAP_attr',
             records=['Qc', 'Cost']
         )
+        #
+        self.CANDIDATE = Set(
+            self.CONTAINER,
+            name='CANDIDATE',
+            domain=[self.BUS, self.CAP],
+            records=self.cand_list,
+            description='Tap vi tri va loai tu ung vien'
+        )
 
     # define Parameter
     def define_Parameter(self):
@@ -240,6 +371,14 @@ class MISOCP(GetData):
             description='Thong so tai theo thoi gian'
         )
         #
+        self.LoadData = Parameter(
+            self.CONTAINER,
+            name='LoadData',
+            domain=[self.BUS, self.TIME, self.BUS_attr],
+            description='Tai cua bus theo thoi gian (PL, QL nhan bieu do phu tai theo loai tai)'
+        )
+        self.define_Load()
+        #
         self.CapData = Parameter(
             self.CONTAINER,
             name='CapData',
@@ -251,6 +390,14 @@ class MISOCP(GetData):
             ],
             description='Thong so cap (Qc, Cost)'
         )
+        #
+        self.WTIME = Parameter(
+            self.CONTAINER,
+            name='WTIME',
+            domain=self.TIME,
+            records=list(zip(self.time, self.w_time)),
+            description='Trong so thoi gian (so ngay trong nam ma moi gio dai dien)'
+        )
         # 
         self.YCAP = Parameter(
             self.CONTAINER,
@@ -302,6 +449,37 @@ class MISOCP(GetData):
             description='Khai bao he so chiet khau'
         )
 
+    # LoadData = BusData * PrfData theo loai tai cua bus, goi lai khi BusData / PrfData thay doi
+    # mo hinh dong bang (Freeze) chi nhan LoadData lam tham so thay doi: tich BusData * PrfData khong con la bien
+    def define_Load(self):
+        prf = {'Residential': self.RES_LOAD, 'Industrial': self.IND_LOAD, 'Commercial': self.COM_LOAD}
+        types = list(prf) if self.typeload == 'All' else [self.typeload]
+        self.LoadData[self.BUS, self.TIME, self.BUS_attr] = 0
+        for prf_type in types:
+            self.LoadData[self.BUS, self.TIME, self.BUS_attr].where[prf[prf_type][self.BUS]] = (
+                self.BusData[self.BUS, self.BUS_attr] * self.PrfData[self.TIME, prf_type]
+            )
+
+        return True
+
+    # tai trong phuong trinh can bang: bien PD/QD hoac tham so LoadData khi substitute_load
+    def Load(self, attr):
+        if self.substitute_load:
+            return self.LoadData[self.BUS, self.TIME, attr]
+        return {'PL': self.PD, 'QL': self.QD}[attr][self.BUS, self.TIME]
+
+    # Q bu tai bus trong can bang Q (Eqs141) theo gio: Qcap(BUS); lop con thay bang tu dong cat / Qcap theo nam
+    def QcapTime(self):
+        return self.Qcap[self.BUS]
+
+    # gan level PD/QD tu LoadData sau khi giai mo hinh da bo Eqs_PL/Eqs_QL (de xuat ket qua nhu truoc)
+    def set_Load(self):
+        if self.substitute_load:
+            self.PD.l[self.BUS, self.TIME] = self.LoadData[self.BUS, self.TIME, 'PL']
+            self.QD.l[self.BUS, self.TIME] = self.LoadData[self.BUS, self.TIME, 'QL']
+
+        return True
+
     def define_Variable(self):
         self.Usqr = Variable(
             self.CONTAINER,
@@ -309,9 +487,7 @@ class MISOCP(GetData):
             domain=[self.BUS, self.TIME],
             type="positive"
         )
-        self.Usqr.lo[self.BUS, self.TIME] = self.UMIN.toValue()**2
-        self.Usqr.up[self.BUS, self.TIME] = self.UMAX.toValue()**2
-        self.Usqr.fx[self.id_slack, self.TIME] = self.u_slack**2
+        self.define_Bounds()
         #
         self.Ibrn_sqr = Variable(
             self.CONTAINER,
@@ -319,7 +495,9 @@ class MISOCP(GetData):
             domain=[self.BUS, self.NODE, self.TIME],
             type="positive"
         )
-        # self.Ibrn_sqr.up[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = self.BrnData[self.BUS, self.NODE, 'RATE']**2
+        # gioi han dong dien theo rateA: tuy chon rate_limit, mo hinh goc khong dung
+        if self.rate_limit:
+            self.Ibrn_sqr.up[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = self.BrnData[self.BUS, self.NODE, 'RATE']**2
         self.Pbrn = Variable(
             self.CONTAINER, 
             name='Pbrn',
@@ -340,6 +518,8 @@ class MISOCP(GetData):
             domain=[self.BUS],
             type="free"
         )
+        # Eqs20 chi sinh tren bus ung vien -> Qcap = 0 o cac bus con lai
+        self.Qcap.fx[self.BUS].where[~Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = 0
         #
         self.Zcap = Variable(
             self.CONTAINER,
@@ -380,63 +560,32 @@ class MISOCP(GetData):
             type="free"
         )
 
+    # gioi han dien ap, goi lai khi UMIN/UMAX thay doi
+    def define_Bounds(self):
+        self.Usqr.lo[self.BUS, self.TIME] = self.UMIN**2
+        self.Usqr.up[self.BUS, self.TIME] = self.UMAX**2
+        self.Usqr.fx[self.id_slack, self.TIME] = self.u_slack**2
+
+        return True
+
     # define equation
     # def define_Equation(self):
     def define_Equation(self):
-        self.Eqs_PL = Equation(
-            self.CONTAINER, 
-            name='Eqs_PL',
-            domain=[self.BUS, self.TIME]
-        )
-        self.Eqs_QL = Equation(
-            self.CONTAINER,
-            name='Eqs_QL',
-            domain=[self.BUS, self.TIME]
-        )
-
-        if self.typeload == 'All':
-            self.Eqs_PL[self.BUS, self.TIME] = (
-                self.PD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Residential']).where[self.RES_LOAD[self.BUS]]
-                + (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Industrial']).where[self.IND_LOAD[self.BUS]]
-                + (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Commercial']).where[self.COM_LOAD[self.BUS]]
-            )
-            self.Eqs_QL[self.BUS, self.TIME] = (
-                self.QD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Residential']).where[self.RES_LOAD[self.BUS]]
-                + (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Industrial']).where[self.IND_LOAD[self.BUS]]
-                + (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Commercial']).where[self.COM_LOAD[self.BUS]]
-            )
-        
-        elif self.typeload == 'Residential':
-            self.Eqs_PL[self.BUS, self.TIME] = (
-                self.PD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Residential']).where[self.RES_LOAD[self.BUS]]
-            )
-            self.Eqs_QL[self.BUS, self.TIME] = (
-                self.QD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Residential']).where[self.RES_LOAD[self.BUS]]
-            )
-        
-        elif self.typeload == 'Industrial':
-            self.Eqs_PL[self.BUS, self.TIME] = (
-                self.PD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Industrial']).where[self.IND_LOAD[self.BUS]]
-            )
-            self.Eqs_QL[self.BUS, self.TIME] = (
-                self.QD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Industrial']).where[self.IND_LOAD[self.BUS]]
-            )
-        
-        elif self.typeload == 'Commercial':
-            self.Eqs_PL[self.BUS, self.TIME] = (
-                self.PD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'PL'] * self.PrfData[self.TIME, 'Commercial']).where[self.COM_LOAD[self.BUS]]
+        # substitute_load: bo Eqs_PL/Eqs_QL, tai LoadData dua thang vao Eqs131/Eqs141 (PD/QD tinh lai sau khi giai)
+        if not self.substitute_load:
+            self.Eqs_PL = Equation(
+                self.CONTAINER, 
+                name='Eqs_PL',
+                domain=[self.BUS, self.TIME]
             )
-            self.Eqs_QL[self.BUS, self.TIME] = (
-                self.QD[self.BUS, self.TIME] ==
-                (self.BusData[self.BUS, 'QL'] * self.PrfData[self.TIME, 'Commercial']).where[self.COM_LOAD[self.BUS]]
+            self.Eqs_QL = Equation(
+                self.CONTAINER,
+                name='Eqs_QL',
+                domain=[self.BUS, self.TIME]
             )
+
+            self.Eqs_PL[self.BUS, self.TIME] = self.PD[self.BUS, self.TIME] == self.LoadData[self.BUS, self.TIME, 'PL']
+            self.Eqs_QL[self.BUS, self.TIME] = self.QD[self.BUS, self.TIME] == self.LoadData[self.BUS, self.TIME, 'QL']
         
         # eqs (13) - (14)
         self.Eqs131 = Equation(
@@ -463,14 +612,14 @@ class MISOCP(GetData):
 
         self.Eqs131[self.BUS, self.TIME].where[~self.SLACK[self.BUS]] = (
             Sum(
-                self.NODE.where[self.BRN[self.NODE, self.BUS] & (self.NODE.ord < self.BUS.ord)],
+                self.NODE.where[self.BRN[self.NODE, self.BUS]],
                 self.Pbrn[self.NODE, self.BUS, self.TIME] - 
                 self.BrnData[self.NODE, self.BUS, 'R'] * self.Ibrn_sqr[self.NODE, self.BUS, self.TIME]
             ) == 
             Sum(
-                self.NODE.where[self.BRN[self.BUS, self.NODE] & (self.BUS.ord < self.NODE.ord)],
+                self.NODE.where[self.BRN[self.BUS, self.NODE]],
                 self.Pbrn[self.BUS, self.NODE, self.TIME]
-            ) + self.PD[self.BUS, self.TIME]
+            ) + self.Load('PL')
         )
         
         self.Eqs132[self.SLACK, self.TIME] = (
@@ -482,14 +631,14 @@ class MISOCP(GetData):
         #
         self.Eqs141[self.BUS, self.TIME].where[~self.SLACK[self.BUS]] = (
             Sum(
-                self.NODE.where[self.BRN[self.NODE, self.BUS] & (self.NODE.ord < self.BUS.ord)],
+                self.NODE.where[self.BRN[self.NODE, self.BUS]],
                 self.Qbrn[self.NODE, self.BUS, self.TIME] - 
                 self.BrnData[self.NODE, self.BUS, 'X'] * self.Ibrn_sqr[self.NODE, self.BUS, self.TIME]
             ) == 
             Sum(
-                self.NODE.where[self.BRN[self.BUS, self.NODE] & (self.BUS.ord < self.NODE.ord)],
+                self.NODE.where[self.BRN[self.BUS, self.NODE]],
                 self.Qbrn[self.BUS, self.NODE, self.TIME]
-            ) + self.PD[self.BUS, self.TIME] - self.Qcap[self.BUS]
+            ) + self.Load('QL') - self.QcapTime()
         )
         #
         self.Eqs142[self.SLACK, self.TIME] = (
@@ -531,8 +680,11 @@ class MISOCP(GetData):
             name='Eqs20',
             domain=self.BUS
         )
-        self.Eqs20[self.BUS] = (
-            self.Qcap[self.BUS] == Sum(self.CAP, self.CapData[self.CAP, 'Qc'] * self.Zcap[self.BUS, self.CAP])
+        self.Eqs20[self.BUS].where[Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = (
+            self.Qcap[self.BUS] == Sum(
+                self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]],
+                self.CapData[self.CAP, 'Qc'] * self.Zcap[self.BUS, self.CAP]
+            )
         )
 
         # eqs (9) - (10)
@@ -541,7 +693,7 @@ class MISOCP(GetData):
             name='Eqs9',
         )
         self.Eqs9[...] = (
-            Sum((self.BUS, self.CAP), self.Zcap[self.BUS, self.CAP]) <= self.YCAP.toValue()
+            Sum(self.CANDIDATE[self.BUS, self.CAP], self.Zcap[self.BUS, self.CAP]) <= self.YCAP
         )
         #
         self.Eqs10 = Equation(
@@ -549,8 +701,8 @@ class MISOCP(GetData):
             name='Eqs10',
             domain=self.BUS
         )
-        self.Eqs10[self.BUS] = (
-            Sum(self.CAP, self.Zcap[self.BUS, self.CAP]) <= 1
+        self.Eqs10[self.BUS].where[Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = (
+            Sum(self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]], self.Zcap[self.BUS, self.CAP]) <= 1
         )
     # define OBJ
     def define_Obj(self):
@@ -561,23 +713,78 @@ class MISOCP(GetData):
 
         self.Eqs_Obj[...] = (
             self.OBJ == 
-            365 * Sum(
+            Sum(
                 (self.BUS, self.NODE, self.TIME),
-                (self.BrnData[self.BUS, self.NODE, 'R'] * 
+                (self.WTIME[self.TIME] *
+                self.BrnData[self.BUS, self.NODE, 'R'] * 
                 self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
-                self.SBASE.toValue() * self.COSTA.toValue()
-                ).where[self.BRN[self.BUS, self.NODE] & (self.BUS.ord < self.NODE.ord)]
+                self.SBASE * self.COSTA
+                ).where[self.BRN[self.BUS, self.NODE]]
             )
             + Sum(
-                (self.BUS, self.CAP),
+                self.CANDIDATE[self.BUS, self.CAP],
                 self.Zcap[self.BUS, self.CAP] * 
                 self.CapData[self.CAP, 'Cost'] *
                 self.CapData[self.CAP, 'Qc'] * 
-                self.SBASE.toValue() *
-                self.R.toValue() * (1 + self.R.toValue())**self.MCAP.toValue() / 
-                ((1 + self.R.toValue())**self.MCAP.toValue() - 1)
+                self.SBASE *
+                self.R * (1 + self.R)**self.MCAP / 
+                ((1 + self.R)**self.MCAP - 1)
+            )
+        )
+    # thu hep gioi han duoi Pbrn, Qbrn, Ibrn_sqr, gioi han Qcap va them lat cat tuyen tinh cua Eqs16, goi truoc define_Model
+    # goi lai khi tai / bieu do phu tai / Y thay doi (gioi han suy ra tu tong tai phia sau)
+    def define_Tighten(self):
+        pf = PowerFlow(self)
+        bnd = branch_bounds(self, pf, self.cand_list)
+
+        child = self.topo.bfs_order[1:]
+        f_bus = [self.id_bus[b] for b in self.topo.parent[child]]
+        t_bus = [self.id_bus[b] for b in child]
+        records = [
+            (f, t, tm, attr, value)
+            for attr, arr in bnd.items()
+            for f, t, row in zip(f_bus, t_bus, arr[child])
+            for tm, value in zip(self.time, row)
+        ]
+        if not hasattr(self, 'BND'):
+            self.BND_attr = Set(
+                self.CONTAINER,
+                name='BND_attr',
+                records=list(bnd)
+            )
+            self.BND = Parameter(
+                self.CONTAINER,
+                name='BND',
+                domain=[self.BUS, self.NODE, self.TIME, self.BND_attr],
+                description='Gioi han duoi cua nhanh tu tong tai phia sau (Plo, Qlo, Ilo) va diem tiep tuyen (P0, Q0)'
             )
+            # lat cat tiep tuyen: I2 * Umax^2 >= I2 * U >= P^2 + Q^2 >= 2 P0 P + 2 Q0 Q - P0^2 - Q0^2
+            self.Eqs16_cut = Equation(
+                self.CONTAINER,
+                name='Eqs16_cut',
+                domain=[self.BUS, self.NODE, self.TIME]
+            )
+            self.Eqs16_cut[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = (
+                self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] * self.UMAX**2
+                >=
+                2 * self.BND[self.BUS, self.NODE, self.TIME, 'P0'] * self.Pbrn[self.BUS, self.NODE, self.TIME] +
+                2 * self.BND[self.BUS, self.NODE, self.TIME, 'Q0'] * self.Qbrn[self.BUS, self.NODE, self.TIME] -
+                self.BND[self.BUS, self.NODE, self.TIME, 'P0']**2 - self.BND[self.BUS, self.NODE, self.TIME, 'Q0']**2
+            )
+        self.BND.setRecords(records)
+
+        self.Pbrn.lo[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = self.BND[self.BUS, self.NODE, self.TIME, 'Plo']
+        self.Qbrn.lo[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = self.BND[self.BUS, self.NODE, self.TIME, 'Qlo']
+        self.Ibrn_sqr.lo[self.BUS, self.NODE, self.TIME].where[self.BRN[self.BUS, self.NODE]] = self.BND[self.BUS, self.NODE, self.TIME, 'Ilo']
+        #
+        self.Qcap.lo[self.BUS] = 0
+        self.Qcap.up[self.BUS] = 0
+        self.Qcap.up[self.BUS].where[Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = Smax(
+            self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]], self.CapData[self.CAP, 'Qc']
         )
+
+        return True
+
     # define Options
     def define_Options(self):
         self.opts = Options()
@@ -586,6 +793,7 @@ class MISOCP(GetData):
         self.opts.relative_optimality_gap = 0.0          # optcr
         self.opts.miqcp = self.solver
         self.opts.listing_file = os.path.join(PATH_RESULT, 'misocp2.lst')
+        self.solver_options = None
 
         return True
     
@@ -601,114 +809,205 @@ class MISOCP(GetData):
         )
 
         return True
+
+    # sinh toan bo mo hinh theo thu tu cac buoc (moi buoc do qua Phase); tighten=None -> theo config.json
+    def build(self, tighten=None):
+        tighten = self.tighten if tighten is None else tighten
+        phases = ['define_Set', 'define_Parameter', 'define_Variable', 'define_Equation', 'define_Obj']
+        phases += ['define_Tighten'] if tighten else []
+        for phase in phases + ['define_Options', 'define_Model']:
+            with self.Phase(phase):
+                getattr(self, phase)()
+
+        return True
     
-    def Solve(self):
-        self.MODEL.solve(options=self.opts, output=sys.stdout)
-        self.MODEL.toGams(os.path.join(PATH_RESULT,'misocp2.gms'))
+    # doc Zcap da lap dat tu file result.xlsx cua lan giai truoc
+    def load_Zcap(self, result_file):
+        df = pd.read_excel(result_file, sheet_name='Zcap')
+        df = df[df['level'] > 0.5]
+        return {(int(bus), int(cap)): 1 for bus, cap in zip(df.iloc[:, 0], df.iloc[:, 1])}
+
+    # nghiem ban dau cho Zcap/Qcap: dict {(bus, cap): 1}, duong dan result.xlsx hoac 'greedy'
+    def set_WarmStart(self, zcap):
+        if isinstance(zcap, str):
+            zcap = greedy_zcap(self, candidate=self.cand_list) if zcap == 'greedy' else self.load_Zcap(zcap)
+        candidate = set(self.cand_list)
+        installed = [(bus, cap) for (bus, cap), z in zcap.items() if z > 0.5 and (bus, cap) in candidate]
+
+        self.Zcap.setRecords(pd.DataFrame(
+            [(bus, cap, 1.0) for bus, cap in installed], columns=['BUS', 'CAP', 'level']
+        ))
+        # gan level qua phep gan de giu gioi han Qcap cua define_Tighten
+        self.Qcap.l[self.BUS] = Sum(
+            self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]],
+            self.CapData[self.CAP, 'Qc'] * self.Zcap.l[self.BUS, self.CAP]
+        )
+        self.solver_options = MIPSTART_OPTION.get(self.solver.lower())
+        self.warm_zcap = installed
+
+        return True
+
+    # dong bang mo hinh da sinh: cac lan giai sau chi cap nhat LoadData trong mo hinh, khong sinh lai phuong trinh
+    def Freeze(self):
+        self.MODEL.freeze(modifiables=[self.LoadData], options=self.opts)
+        self.frozen = True
+
+        return True
+
+    def Unfreeze(self):
+        if getattr(self, 'frozen', False):
+            self.MODEL.unfreeze()
+            self.frozen = False
 
         return True
 
+    # cap nhat tai khong doc lai file.xlsx: df cot ID, Pload[kW], Qload[kVAr] nhu sheet bus (chi cac bus thay doi)
+    def update_loads(self, df):
+        index = {bus: k for k, bus in enumerate(self.id_bus)}
+        unknown = sorted(set(df['ID']) - set(index))
+        if unknown:
+            raise KeyError(f'Bus khong co trong luoi: {unknown}')
+        for bus, p, q in zip(df['ID'], df['Pload[kW]'], df['Qload[kVAr]']):
+            self.pload[index[bus]] = p / self.s_base / 1000
+            self.qload[index[bus]] = q / self.s_base / 1000
+        self.BusData.setRecords(
+            [(f, 'PL', p) for f, p in zip(self.id_bus, self.pload)] +
+            [(f, 'QL', q) for f, q in zip(self.id_bus, self.qload)]
+        )
+
+        return self.update_Load()
+
+    # cap nhat bieu do phu tai: df cot Time, Residential, Commercial, Industrial nhu sheet loadprofile
+    def update_profile(self, df):
+        # phan cum tren ban sao, kiem tra xong moi gan vao mo hinh (loi khong lam hong du lieu dang co)
+        new = copy.copy(self)
+        new.time = df['Time'].tolist()
+        new.res_prf = df['Residential'].tolist()
+        new.com_prf = df['Commercial'].tolist()
+        new.ind_prf = df['Industrial'].tolist()
+        new.cluster_profile()
+        if new.time != self.time:
+            raise ValueError('Tap TIME cua bieu do phu tai moi khac mo hinh da tao, can tao lai mo hinh')
+        w_old = self.w_time
+        for name in ('res_prf', 'com_prf', 'ind_prf', 'w_time', 'cluster_error'):
+            if hasattr(new, name):
+                setattr(self, name, getattr(new, name))
+        self.PrfData.setRecords(
+            [(t, 'Residential', prf) for t, prf in zip(self.time, self.res_prf)] +
+            [(t, 'Industrial', prf) for t, prf in zip(self.time, self.ind_prf)] +
+            [(t, 'Commercial', prf) for t, prf in zip(self.time, self.com_prf)]
+        )
+        if self.w_time != w_old:
+            # trong so gio (phan cum) la he so cua ham muc tieu -> sinh lai mo hinh
+            self.WTIME.setRecords(list(zip(self.time, self.w_time)))
+            self.Unfreeze()
+
+        return self.update_Load()
+
+    def update_Load(self):
+        self.define_Load()
+        # gioi han cua define_Tighten suy ra tu tai -> tinh lai, gioi han bien khong thay doi duoc trong mo hinh dong bang
+        if self.tighten:
+            self.Unfreeze()
+            self.define_Tighten()
+
+        return True
+
+    # du lieu xac dinh nghiem: du lieu luoi da quy doi / phan cum, tham so, tap ung vien, tuy chon solver
+    def cache_inputs(self):
+        inputs = {name: getattr(self, name) for name in self.XLSX_ATTRS}
+        for name in ('w_time', 'typeload', 'u_min', 'u_max', 'cost_A', 'r', 'M', 'Y', 'cand_list', 'tighten', 'rate_limit',
+                     'substitute_load', 'solver', 'backend', 'solver_options', 'years', 'growth'):
+            inputs[name] = getattr(self, name, None)
+        inputs['options'] = self.opts.model_dump(exclude={'listing_file'}, exclude_none=True)
+        inputs['model'] = type(self).__name__
+        return inputs
+
+    # ket qua lan giai (ke ca khi lay tu cache) o self.status, self.objective_value, self.num_nodes_used va gia tri tra ve
+    def Solve(self, refresh=False):
+        cache = key = None
+        if self.result_cache:
+            cache = ResultCache(self.result_cache_dir or os.path.join(PATH_RESULT, '.result_cache'), self.result_cache_mb)
+            key = cache.key(self.cache_inputs())
+
+        with self.Phase('Solve') as row:
+            hit = None if cache is None or refresh else cache.load(key, self.CONTAINER)
+            if hit is not None:
+                row.update({'cache': 'hit', 'status': hit['status'], 'objective_value': hit['objective']})
+                print(f"Ket qua lay tu cache {key}: {hit['status']}, OBJ = {hit['objective']:.4f}")
+                status, objective, nodes = hit['status'], hit['objective'], hit.get('nodes')
+            elif self.backend in (None, 'gams'):
+                self.MODEL.solve(solver=self.solver, options=self.opts, output=sys.stdout, solver_options=self.solver_options)
+                row.update(model_stats(self.MODEL))
+                status, objective, nodes = row['status'], row['objective_value'], row['num_nodes_used']
+            else:
+                res = get_backend(self.backend).solve(self, output=sys.stdout)
+                row.update({key: value for key, value in res.items() if key != 'zcap'})
+                status, objective, nodes = res['status'], res['objective'], res.get('nodes')
+            if hit is None:
+                self.set_Load()
+                row['cache'] = None if cache is None else 'miss'
+        self.status, self.objective_value, self.num_nodes_used = status, objective, nodes
+        self.MODEL.toGams(os.path.join(PATH_RESULT,'misocp2.gms'))
+
+        # chi luu nghiem toi uu (nghiem dung giua chung do gioi han thoi gian se duoc giai lai)
+        if hit is None and cache is not None and objective is not None and str(status).lower().startswith('optimal'):
+            try:
+                qcap = self.Qcap.records
+                cache.save(key, {
+                    'status': status,
+                    'objective': objective,
+                    'nodes': nodes,
+                    'zcap': sorted(installed_zcap(self)),
+                    'qcap': {} if qcap is None else {str(b): q for b, q in zip(qcap.iloc[:, 0], qcap['level']) if q > 1e-9},
+                    'xlsx_file': os.path.abspath(self.xlsx_file),
+                    'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                }, self.CONTAINER, [var.name for var in self.CONTAINER.getVariables()])
+            except Exception as e:
+                print(f'Loi ghi cache ket qua: {e}')
+
+        return {'status': status, 'objective': objective, 'nodes': nodes, 'cache': row.get('cache')}
+
+    # kiem tra do chat cua noi long SOCP bang phan bo cong suat chinh xac
+    def Verify(self):
+        try:
+            check = verify_solution(self)
+        except Exception as e:
+            print(f'Loi kiem tra nghiem: {e}')
+            return False
+        print(f"  Noi long {'chat' if check['tight'] else 'KHONG chat'}: cone gap {check['cone_gap_max']:.2e}, "
+              f"sai so dien ap {check['volt_error_max']:.2e}, ton that {check['loss_model']:.4f} / {check['loss_exact']:.4f}")
+        return check['tight']
+
 
 def main():
-    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
-    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
-
-    opt = MISOCP(input_xlsx, input_json)
-    opt.define_Set()
-    opt.define_Parameter()
-    opt.define_Variable()
-    opt.define_Equation()
-    opt.define_Obj()
-    opt.define_Options()
-    opt.define_Model()
-    opt.Solve()
+    parser = argparse.ArgumentParser(description='Capacitor Place MISOCP')
+    parser.add_argument('--xlsx', default=r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx")
+    parser.add_argument('--json', default=r"D:\OAEM Lab\CodePy\Capacitor Place\config.json")
+    parser.add_argument('--refresh', action='store_true', help='Bo qua cache ket qua, giai lai va ghi de')
+    args = parser.parse_args()
+    input_xlsx, input_json = args.xlsx, args.json
+
+    prof = Profiler(xlsx_file=input_xlsx, json_file=input_json)
+    opt = MISOCP(input_xlsx, input_json, profiler=prof)
+    opt.build()
+    if opt.warm_start:
+        with opt.Phase('set_WarmStart'):
+            opt.set_WarmStart(opt.warm_start)
+    opt.Solve(refresh=args.refresh)
+    with opt.Phase('Verify'):
+        opt.Verify()
 
     print("\n=== Xuất kết quả ===")
-    
-    # Xử lý file đang mở
-    output_file = os.path.join(PATH_RESULT, "result.xlsx")
-    if os.path.exists(output_file):
-        try:
-            os.remove(output_file)
-        except PermissionError:
-            timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-            output_file = f"result_{timestamp}.xlsx"
-            print(f"File result.xlsx đang mở, lưu vào: {output_file}")
-    
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # Voltage - Lấy tất cả cột
-        df = opt.Usqr.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Voltage", index=False)
-            print(f"  Voltage: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Active Power
-        df = opt.Pbrn.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Pbrn", index=False)
-            print(f"  Pbrn: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Reactive Power
-        df = opt.Qbrn.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Qbrn", index=False)
-            print(f"  Qbrn: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Capacitor Q
-        df = opt.Qcap.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Qcap", index=False)
-            print(f"  Qcap: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Capacitor binary
-        df = opt.Zcap.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Zcap", index=False)
-            # Lọc những vị trí có tụ (cột 'level' > 0.5)
-            df_installed = df[df.iloc[:, 2] > 0.5]  # Cột thứ 3 là 'level'
-            df_installed.to_excel(writer, sheet_name="Cap_Installed", index=False)
-            print(f"  Zcap: {len(df)} rows, Installed: {len(df_installed)}")
-        
-        # Current squared
-        df = opt.Ibrn_sqr.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Ibrn_sqr", index=False)
-            print(f"  Ibrn_sqr: {len(df)} rows, {len(df.columns)} cols")
-        
-        # P Generation
-        df = opt.Pgen.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Pgen", index=False)
-            print(f"  Pgen: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Q Generation
-        df = opt.Qgen.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Qgen", index=False)
-            print(f"  Qgen: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Load P
-        df = opt.PD.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="PD", index=False)
-            print(f"  PD: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Load Q
-        df = opt.QD.records
-        if not df.empty:
-            df.to_excel(writer, sheet_name="QD", index=False)
-            print(f"  QD: {len(df)} rows, {len(df.columns)} cols")
-        
-        # Objective
-        obj_val = opt.OBJ.toValue()
-        pd.DataFrame({
-            "Objective": [obj_val],
-            "Description": ["Total Cost ($/year)"]
-        }).to_excel(writer, sheet_name="Objective", index=False)
-        print(f"  Objective: {obj_val:.2f}")
-    
-    print(f"\nKết quả đã lưu: {output_file}")
-    print(f"Tổng chi phí: ${obj_val:,.2f}")
+    with opt.Phase('export'):
+        export_result(opt, PATH_RESULT, opt.export_format, opt.export_float32, opt.export_summary_only)
+    obj_val = opt.OBJ.toValue()
+
+    prof.meta.update({'n_bus': len(opt.id_bus), 'n_time': len(opt.time), 'n_cap': len(opt.id_cap), 'solver': opt.solver})
+    prof.save(os.path.join(PATH_RESULT, 'profile.json'))
+    prof.summary()
+    print(f"\nKết quả đã lưu: {PATH_RESULT}")
+    print(f"Tổng chi phí: ${obj_val:,.2f} ({opt.status})")
 
 
 
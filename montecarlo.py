@@ -0,0 +1,125 @@
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from misocp2 import MISOCP
+from powerflow import PowerFlow
+from heuristic import zcap_to_qcap, invest_cost, greedy_zcap
+
+LOAD_TYPES = ('Residential', 'Commercial', 'Industrial')
+
+
+def sample_factors(rng, type_load, n_sample, n_time, sigma_system=0.1, sigma_bus=0.05, sigma_time=0.02):
+    # he so nhan tai (bus, mau, gio) = 1 + nhieu chung theo loai tai + nhieu rieng tung bus + nhieu theo gio cua mau
+    # Q nhan cung he so voi P (giu he so cong suat), cat duoi 0
+    kind = np.array([LOAD_TYPES.index(t) if t in LOAD_TYPES else 0 for t in type_load])
+    system = rng.standard_normal((len(LOAD_TYPES), n_sample))[kind]
+    bus = rng.standard_normal((len(type_load), n_sample))
+    hour = rng.standard_normal((n_sample, n_time))
+    factor = 1 + (sigma_system * system + sigma_bus * bus)[..., None] + sigma_time * hour[None]
+    return np.clip(factor, 0, None)
+
+
+def monte_carlo(opt, zcap, n_sample=10000, sigma_system=0.1, sigma_bus=0.05, sigma_time=0.02, seed=0, chunk=None,
+                tol=1e-6, pf=None, output=sys.stdout):
+    # danh gia mot phuong an Zcap tren n_sample kich ban tai: sweep theo lo (bus, mau, gio) tren NumPy
+    # tol tren Usqr: 1e-6 du cho thong ke (sai so nho hon nhieu so voi do phan tan giua cac kich ban), it vong sweep hon
+    pf = pf or PowerFlow(opt)
+    rng = np.random.default_rng(seed)
+    n_bus, n_time = pf.P.shape
+    chunk = chunk or max(1, int(2**22 // (n_bus * n_time)))
+    qcap = zcap_to_qcap(opt, zcap)
+    invest = dict(zip(opt.id_cap, invest_cost(opt)))
+    invest_total = sum(invest[cap] for (bus, cap), z in zcap.items() if z > 0.5)
+    u_lo, u_hi = opt.u_min**2, opt.u_max**2
+
+    # cost: chi phi ton that + dau tu cua tung mau; mau co sweep khong hoi tu (U nan / chua dat tol) bi loai khoi thong ke
+    out = {'cost': [], 'u_min': [], 'u_max': [], 'violation': [], 'converged': []}
+    bus_viol = np.zeros(n_bus)
+    hour_viol = np.zeros(n_time)
+    t0 = time.perf_counter()
+    for k in range(0, n_sample, chunk):
+        m = min(chunk, n_sample - k)
+        factor = sample_factors(rng, opt.type_load, m, n_time, sigma_system, sigma_bus, sigma_time)
+        P = pf.P[:, None, :] * factor
+        Q = pf.Q[:, None, :] * factor - qcap[:, None, None]
+        res = pf.solve(P=P, Q=Q, tol=tol)
+        U = res['Usqr']
+        ok = (np.isfinite(U) & (res['step'] < tol)).all(axis=(0, 2))
+        # vi pham (bus, mau, gio) cua cac mau hoi tu -> theo mau, theo bus, theo gio
+        viol = ((U < u_lo - 1e-9) | (U > u_hi + 1e-9)) & ok[None, :, None]
+        out['cost'].append(opt.cost_A * opt.s_base * (res['loss'] @ pf.w_time) + invest_total)
+        out['u_min'].append(np.sqrt(U.min(axis=(0, 2))))
+        out['u_max'].append(np.sqrt(U.max(axis=(0, 2))))
+        out['violation'].append(viol.any(axis=(0, 2)))
+        out['converged'].append(ok)
+        bus_viol += viol.any(axis=2).sum(axis=1)
+        hour_viol += viol.any(axis=0).sum(axis=0)
+    elapsed = time.perf_counter() - t0
+
+    samples = pd.DataFrame({key: np.concatenate(val) for key, val in out.items()})
+    valid = samples[samples['converged']]
+    n_valid = len(valid)
+    cost = valid['cost'].to_numpy()
+    var95 = np.quantile(cost, 0.95) if n_valid else np.nan
+    summary = {
+        'n_sample': n_sample,
+        'n_bus': n_bus,
+        'n_time': n_time,
+        'time': elapsed,
+        'samples_per_s': n_sample / elapsed,
+        'converged': n_valid == n_sample,
+        'n_diverged': n_sample - n_valid,
+        'invest_cost': invest_total,
+        'cost_mean': cost.mean() if n_valid else np.nan,
+        'cost_std': cost.std() if n_valid else np.nan,
+        'cost_p05': np.quantile(cost, 0.05) if n_valid else np.nan,
+        'cost_p50': np.quantile(cost, 0.5) if n_valid else np.nan,
+        'cost_p95': var95,
+        'cost_cvar95': cost[cost >= var95].mean() if n_valid else np.nan,
+        'violation_prob': valid['violation'].mean() if n_valid else np.nan,
+        'u_min_p05': np.quantile(valid['u_min'], 0.05) if n_valid else np.nan,
+        'u_max_p95': np.quantile(valid['u_max'], 0.95) if n_valid else np.nan,
+    }
+    by_bus = pd.DataFrame({'ID': opt.id_bus, 'violation_prob': bus_viol / max(n_valid, 1)})
+    by_hour = pd.DataFrame({'Time': opt.time, 'violation_prob': hour_viol / max(n_valid, 1)})
+    if output:
+        print(f"{n_sample} kich ban x {n_time} gio, {n_bus} bus: {elapsed:.2f} s ({n_sample / elapsed:,.0f} kich ban/s)", file=output)
+        print(f"  Chi phi: trung binh {summary['cost_mean']:,.2f}, P5 {summary['cost_p05']:,.2f}, "
+              f"P95 {summary['cost_p95']:,.2f}, CVaR95 {summary['cost_cvar95']:,.2f}", file=output)
+        print(f"  Xac suat vi pham dien ap: {summary['violation_prob']:.2%}", file=output)
+        if summary['n_diverged']:
+            print(f"  {summary['n_diverged']} kich ban sweep khong hoi tu (khong tinh vao thong ke)", file=output)
+    return {'summary': summary, 'samples': samples, 'by_bus': by_bus, 'by_hour': by_hour}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo phan bo cong suat cho mot phuong an dat tu')
+    parser.add_argument('--xlsx', default=r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx")
+    parser.add_argument('--json', default=r"D:\OAEM Lab\CodePy\Capacitor Place\config.json")
+    parser.add_argument('--zcap', default='greedy', help="'greedy' hoac duong dan result.xlsx")
+    parser.add_argument('--n', type=int, default=10000)
+    parser.add_argument('--sigma-system', type=float, default=0.1)
+    parser.add_argument('--sigma-bus', type=float, default=0.05)
+    parser.add_argument('--sigma-time', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='File xlsx luu phan bo chi phi va xac suat vi pham')
+    args = parser.parse_args()
+
+    opt = MISOCP(args.xlsx, args.json)
+    zcap = greedy_zcap(opt, candidate=opt.cand_list) if args.zcap == 'greedy' else opt.load_Zcap(args.zcap)
+    print(f"Vi tri dat tu (bus, cap): {sorted(k for k, z in zcap.items() if z > 0.5)}")
+    res = monte_carlo(opt, zcap, args.n, args.sigma_system, args.sigma_bus, args.sigma_time, args.seed)
+    if args.out:
+        with pd.ExcelWriter(args.out) as writer:
+            pd.DataFrame([res['summary']]).to_excel(writer, sheet_name='summary', index=False)
+            res['samples'].to_excel(writer, sheet_name='samples', index=False)
+            res['by_bus'].to_excel(writer, sheet_name='by_bus', index=False)
+            res['by_hour'].to_excel(writer, sheet_name='by_hour', index=False)
+        print(f"Ket qua da luu: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
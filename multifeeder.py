@@ -0,0 +1,343 @@
+import os, sys
+import time
+import pandas as pd
+from gamspy import (
+    Set,
+    Domain,
+    Parameter,
+    Equation,
+    Sum,
+    Model,
+    Problem,
+    Sense,
+)
+
+from misocp2 import GetData, MISOCP
+from scenario import WorkerPool, worker_state
+from heuristic import placement_cost
+
+
+def feeder_spec(feeder, k):
+    # 'luoi.xlsx' hoac {'xlsx': ..., 'name': ..., 'group': ...}; group: tram / nhom dung chung ngan sach tu bu
+    if isinstance(feeder, str):
+        feeder = {'xlsx': feeder}
+    name = feeder.get('name') or f'F{k + 1}'
+    return {'xlsx': feeder['xlsx'], 'name': name, 'group': feeder.get('group', 'all')}
+
+
+class FleetModel(MISOCP):
+    # nhieu xuat tuyen trong mot Container: bus danh so lai thanh id toan cuc, tap FEEDER va anh xa BF(FEEDER, BUS)
+    # Eqs9 tach theo tung xuat tuyen (Y trong config.json), budget: tong so tu bu toi da cua moi nhom xuat tuyen
+    def __init__(self, feeders, json_file=None, budget=None, cache_dir=None, working_directory=None, profiler=None):
+        self.feeders = [feeder_spec(feeder, k) for k, feeder in enumerate(feeders)]
+        self.budget = budget
+        super().__init__(self.feeders[0]['xlsx'], json_file, cache_dir, working_directory, profiler)
+        if self.tighten:
+            print('FleetModel khong ho tro tighten (gioi han tinh theo tung xuat tuyen), bo qua')
+            self.tighten = False
+
+    def get_xlsx(self):
+        # doc tung xuat tuyen (co cache), sau do ghep: bus cua xuat tuyen k cong them offset
+        self.readers = []
+        for spec in self.feeders:
+            reader = GetData(spec['xlsx'], self.json_file, self.cache_dir)
+            reader.get_json()
+            reader.get_xlsx()
+            reader.cluster_profile()
+            reader.get_candidate()
+            self.readers.append(reader)
+
+        first = self.readers[0]
+        for spec, reader in zip(self.feeders, self.readers):
+            if reader.time != first.time or reader.w_time != first.w_time:
+                raise ValueError(f"Xuat tuyen {spec['name']} co tap TIME / trong so khac {self.feeders[0]['name']}")
+            if reader.id_cap != first.id_cap or reader.Q_cap != first.Q_cap or reader.cost_cap != first.cost_cap:
+                raise ValueError(f"Xuat tuyen {spec['name']} co danh muc tu bu khac {self.feeders[0]['name']}")
+
+        for name in ('time', 'w_time', 'res_prf', 'com_prf', 'ind_prf', 'id_cap', 'type_cap', 'Q_cap', 'cost_cap'):
+            setattr(self, name, list(getattr(first, name)))
+        for name in ('id_bus', 'name_bus', 'pload', 'qload', 'type_load', 'res_load', 'ind_load', 'com_load',
+                     'f_bus', 't_bus', 'R_brn', 'X_brn', 'rateA', 'cand_list'):
+            setattr(self, name, [])
+        self.slack_list, self.u_slack_list, self.feeder_bus = [], [], []
+        self.bus_map = {}       # id toan cuc -> (ten xuat tuyen, id bus trong file.xlsx)
+        offset = 0
+        for spec, reader in zip(self.feeders, self.readers):
+            g = {bus: offset + bus for bus in reader.id_bus}
+            self.bus_map.update({g[bus]: (spec['name'], bus) for bus in reader.id_bus})
+            self.id_bus += [g[bus] for bus in reader.id_bus]
+            self.name_bus += [f"{spec['name']}/{name}" for name in reader.name_bus]
+            self.pload += reader.pload
+            self.qload += reader.qload
+            self.type_load += reader.type_load
+            self.res_load += [g[bus] for bus in reader.res_load]
+            self.ind_load += [g[bus] for bus in reader.ind_load]
+            self.com_load += [g[bus] for bus in reader.com_load]
+            self.f_bus += [g[bus] for bus in reader.f_bus]
+            self.t_bus += [g[bus] for bus in reader.t_bus]
+            self.R_brn += reader.R_brn
+            self.X_brn += reader.X_brn
+            self.rateA += reader.rateA
+            self.cand_list += [(g[bus], cap) for bus, cap in reader.cand_list]
+            self.slack_list.append(g[reader.id_slack])
+            self.u_slack_list.append(reader.u_slack)
+            self.feeder_bus += [(spec['name'], g[bus]) for bus in reader.id_bus]
+            offset += max(reader.id_bus) + 1
+        self.id_line = list(range(1, len(self.f_bus) + 1))
+        # cac ham dung mot bus nguon (Verify, sweep) khong ap dung cho ca nhom xuat tuyen
+        self.id_slack, self.u_slack = self.slack_list[0], self.u_slack_list[0]
+        self.cand_sheet = None
+        self.topo = None
+
+    # cac ham dung PowerFlow (sweep tren mot cay co mot bus nguon) khong ap dung cho ca nhom xuat tuyen (topo = None)
+    def Verify(self):
+        raise ValueError('FleetModel khong ho tro Verify (PowerFlow can mot xuat tuyen), kiem tra tung xuat tuyen bang MISOCP')
+
+    def set_WarmStart(self, zcap):
+        if isinstance(zcap, str) and zcap == 'greedy':
+            raise ValueError("FleetModel khong ho tro warm_start 'greedy' (PowerFlow can mot xuat tuyen)")
+        return super().set_WarmStart(zcap)
+
+    def define_Tighten(self):
+        raise ValueError('FleetModel khong ho tro tighten (gioi han tinh bang PowerFlow theo tung xuat tuyen)')
+
+    def cluster_profile(self):
+        # da phan cum theo tung xuat tuyen trong get_xlsx
+        pass
+
+    def get_candidate(self):
+        # da ghep tu tap ung vien cua tung xuat tuyen trong get_xlsx
+        pass
+
+    def define_Set(self):
+        super().define_Set()
+        self.SLACK.setRecords(self.slack_list)
+        self.FEEDER = Set(
+            self.CONTAINER,
+            name='FEEDER',
+            records=[spec['name'] for spec in self.feeders],
+            description='Tap xuat tuyen'
+        )
+        self.BF = Set(
+            self.CONTAINER,
+            name='BF',
+            domain=[self.FEEDER, self.BUS],
+            records=self.feeder_bus,
+            description='Bus thuoc xuat tuyen'
+        )
+        self.GROUP = Set(
+            self.CONTAINER,
+            name='GROUP',
+            records=sorted({spec['group'] for spec in self.feeders}),
+            description='Nhom xuat tuyen dung chung ngan sach tu bu'
+        )
+        self.FG = Set(
+            self.CONTAINER,
+            name='FG',
+            domain=[self.GROUP, self.FEEDER],
+            records=[(spec['group'], spec['name']) for spec in self.feeders],
+            description='Xuat tuyen thuoc nhom'
+        )
+
+    def define_Parameter(self):
+        # bieu do phu tai rieng cua tung xuat tuyen, can truoc define_Load
+        self.FPrfData = Parameter(
+            self.CONTAINER,
+            name='FPrfData',
+            domain=[self.FEEDER, self.TIME, self.PRF_attr],
+            records=[
+                (spec['name'], t, prf_type, prf)
+                for spec, reader in zip(self.feeders, self.readers)
+                for prf_type, attr in (('Residential', 'res_prf'), ('Industrial', 'ind_prf'), ('Commercial', 'com_prf'))
+                for t, prf in zip(reader.time, getattr(reader, attr))
+            ],
+            description='Thong so tai theo thoi gian cua tung xuat tuyen'
+        )
+        self.USLACK = Parameter(
+            self.CONTAINER,
+            name='USLACK',
+            domain=self.BUS,
+            records=list(zip(self.slack_list, self.u_slack_list)),
+            description='Dien ap dat tai bus nguon cua tung xuat tuyen'
+        )
+        super().define_Parameter()
+        self.BUDGET = Parameter(
+            self.CONTAINER,
+            name='BUDGET',
+            domain=self.GROUP,
+            records=self.budget_records(),
+            description='Tong so tu bu toi da cua nhom xuat tuyen'
+        )
+        # nhom co ngan sach (ke ca ngan sach 0)
+        self.BGROUP = Set(
+            self.CONTAINER,
+            name='BGROUP',
+            domain=[self.GROUP],
+            records=[group for group, _ in self.budget_records()],
+            description='Nhom xuat tuyen co ngan sach chung'
+        )
+
+    def budget_records(self):
+        # budget: None (khong rang buoc chung), so nguyen (moi nhom) hoac {group: so tu bu}
+        groups = sorted({spec['group'] for spec in self.feeders})
+        if self.budget is None:
+            return []
+        if isinstance(self.budget, dict):
+            return [(group, n) for group, n in self.budget.items() if group in groups]
+        return [(group, self.budget) for group in groups]
+
+    def define_Load(self):
+        prf = {'Residential': self.RES_LOAD, 'Industrial': self.IND_LOAD, 'Commercial': self.COM_LOAD}
+        types = list(prf) if self.typeload == 'All' else [self.typeload]
+        self.LoadData[self.BUS, self.TIME, self.BUS_attr] = 0
+        for prf_type in types:
+            self.LoadData[self.BUS, self.TIME, self.BUS_attr].where[prf[prf_type][self.BUS]] = Sum(
+                self.FEEDER.where[self.BF[self.FEEDER, self.BUS]],
+                self.BusData[self.BUS, self.BUS_attr] * self.FPrfData[self.FEEDER, self.TIME, prf_type]
+            )
+
+        return True
+
+    def define_Bounds(self):
+        self.Usqr.lo[self.BUS, self.TIME] = self.UMIN**2
+        self.Usqr.up[self.BUS, self.TIME] = self.UMAX**2
+        self.Usqr.fx[self.SLACK, self.TIME] = self.USLACK[self.SLACK]**2
+
+        return True
+
+    def define_Equation(self):
+        super().define_Equation()
+        # Eqs9 theo tung xuat tuyen thay cho tong toan bo
+        self.Eqs9_F = Equation(
+            self.CONTAINER,
+            name='Eqs9_F',
+            domain=self.FEEDER
+        )
+        self.Eqs9_F[self.FEEDER] = (
+            Sum(
+                Domain(self.BUS, self.CAP).where[self.CANDIDATE[self.BUS, self.CAP] & self.BF[self.FEEDER, self.BUS]],
+                self.Zcap[self.BUS, self.CAP]
+            ) <= self.YCAP
+        )
+        # ngan sach chung cua nhom: rang buoc duy nhat lien ket cac xuat tuyen
+        self.Eqs_Budget = Equation(
+            self.CONTAINER,
+            name='Eqs_Budget',
+            domain=self.GROUP
+        )
+        self.Eqs_Budget[self.GROUP].where[self.BGROUP[self.GROUP]] = (
+            Sum(
+                Domain(self.FEEDER, self.BUS, self.CAP).where[
+                    self.FG[self.GROUP, self.FEEDER] & self.BF[self.FEEDER, self.BUS] & self.CANDIDATE[self.BUS, self.CAP]
+                ],
+                self.Zcap[self.BUS, self.CAP]
+            ) <= self.BUDGET[self.GROUP]
+        )
+
+    def define_Model(self):
+        self.MODEL = Model(
+            self.CONTAINER,
+            name='Capacitor_Place_Fleet',
+            equations=[eq for eq in self.CONTAINER.getEquations() if eq.name != self.Eqs9.name],
+            sense=Sense.MIN,
+            objective=self.OBJ,
+            problem=Problem.MIQCP
+        )
+
+        return True
+
+    def feeder_results(self):
+        # ket qua tung xuat tuyen theo id bus trong file.xlsx, chi phi danh gia lai bang sweep cua xuat tuyen
+        df = self.Zcap.records
+        installed = {spec['name']: {} for spec in self.feeders}
+        if df is not None:
+            for bus, cap, z in zip(df.iloc[:, 0], df.iloc[:, 1], df['level']):
+                if z > 0.5:
+                    name, local = self.bus_map[int(bus)]
+                    installed[name][(local, int(cap))] = 1
+        rows = []
+        for spec, reader in zip(self.feeders, self.readers):
+            zcap = installed[spec['name']]
+            cost = placement_cost(reader, zcap)
+            rows.append({
+                'feeder': spec['name'], 'group': spec['group'], 'n_bus': len(reader.id_bus),
+                'n_cap': len(zcap), 'installed': ' '.join(f'{bus}:{cap}' for bus, cap in sorted(zcap)),
+                'objective': cost['objective'], 'loss_cost': cost['loss_cost'], 'invest_cost': cost['invest_cost'],
+                'u_min': cost['u_min'], 'u_max': cost['u_max'],
+            })
+        return pd.DataFrame(rows)
+
+
+def find_blocks(feeders, budget=None, pack=1):
+    # xuat tuyen chi lien ket qua ngan sach chung cua nhom -> moi nhom co budget la mot khoi,
+    # xuat tuyen khong co budget doc lap, gop `pack` xuat tuyen doc lap vao mot mo hinh (giam chi phi khoi dong GAMS)
+    specs = [feeder_spec(feeder, k) for k, feeder in enumerate(feeders)]
+    coupled = set()
+    if isinstance(budget, dict):
+        coupled = set(budget)
+    elif budget is not None:
+        coupled = {spec['group'] for spec in specs}
+    blocks, single = [], []
+    for group in sorted({spec['group'] for spec in specs} & coupled):
+        blocks.append([spec for spec in specs if spec['group'] == group])
+    for spec in specs:
+        if spec['group'] not in coupled:
+            single.append(spec)
+    blocks += [single[k:k + pack] for k in range(0, len(single), pack)]
+    return blocks
+
+
+def solve_block(block, json_file=None, budget=None, cache_dir=None, working_directory=None, output=None):
+    t0 = time.perf_counter()
+    opt = FleetModel(block, json_file, budget, cache_dir, working_directory)
+    opt.build()
+    if working_directory:
+        opt.opts.listing_file = os.path.join(working_directory, 'fleet.lst')
+    build_time = time.perf_counter() - t0
+    opt.MODEL.solve(solver=opt.solver, options=opt.opts, output=output)
+    df = opt.feeder_results()
+    df['block'] = '+'.join(spec['name'] for spec in block)
+    df['status'] = opt.MODEL.status.name
+    df['block_objective'] = opt.MODEL.objective_value
+    df['build_time'] = build_time
+    df['solve_time'] = opt.MODEL.solve_model_time
+    df['block_time'] = time.perf_counter() - t0
+    return df
+
+
+# moi tien trinh con co thu muc lam viec rieng
+def _solve_task(block):
+    state = worker_state('misocp_fleet')
+    state['n'] += 1
+    workdir = os.path.join(state['workdir'], str(state['n']))
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        return solve_block(block, *state['args'], working_directory=workdir)
+    except Exception as e:
+        return pd.DataFrame([{'feeder': spec['name'], 'group': spec['group'], 'status': f'Error: {e}'} for spec in block])
+
+
+def solve_fleet(feeders, json_file=None, budget=None, cache_dir=None, max_workers=None, pack=1, output=sys.stdout):
+    blocks = find_blocks(feeders, budget, pack)
+    with WorkerPool('misocp_fleet', len(blocks), {'args': (json_file, budget, cache_dir)}, max_workers) as pool:
+        if output:
+            print(f"{sum(len(block) for block in blocks)} xuat tuyen -> {len(blocks)} khoi, {pool.max_workers} tien trinh",
+                  file=output)
+        results = pool.map(_solve_task, blocks)
+    return pd.concat(results, ignore_index=True)
+
+
+def main():
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+    feeders = [
+        {'xlsx': r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx", 'name': 'F1', 'group': 'TBA1'},
+        {'xlsx': r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx", 'name': 'F2', 'group': 'TBA1'},
+    ]
+
+    df = solve_fleet(feeders, input_json, budget={'TBA1': 4})
+    print(df.to_string(index=False))
+    print(f"\nTong chi phi: ${df['objective'].sum():,.2f}")
+
+
+if __name__ == '__main__':
+    main()
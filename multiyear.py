@@ -0,0 +1,284 @@
+import os, sys
+import copy
+import time
+import pandas as pd
+from gamspy import (
+    Set,
+    Parameter,
+    Variable,
+    Equation,
+    Sum,
+)
+
+from misocp2 import MISOCP
+from scenario import WorkerPool, init_worker, worker_state
+from powerflow import PRF_ATTR
+from heuristic import placement_cost
+from solver import installed_zcap, solution_kind
+
+
+def grow_profile(opt, year):
+    # bieu do phu tai nam thu year (nam 1 = du lieu goc): prf * (1 + growth)^(year - 1) theo tung loai tai
+    for name, attr in PRF_ATTR.items():
+        rate = (1 + opt.growth.get(name, 0.0))**(year - 1)
+        setattr(opt, attr, [prf * rate for prf in getattr(opt, attr)])
+    return opt
+
+
+def discount(opt, year):
+    # quy ve hien tai chi phi cua nam thu year
+    return 1 / (1 + opt.r)**(year - 1)
+
+
+def plan_cost(opt, plan):
+    # plan: {year: {(bus, cap): 1}} -> tong chi phi quy ve hien tai, moi nam danh gia bang sweep chinh xac
+    # (ton that nam + chi phi dau tu quy doi hang nam cua cac tu dang van hanh, cung don vi voi MultiYearModel)
+    rows = []
+    for year, zcap in sorted(plan.items()):
+        cost = placement_cost(grow_profile(copy.copy(opt), year), zcap)
+        rows.append({'year': year, 'discount': discount(opt, year), **cost})
+    df = pd.DataFrame(rows)
+    return float((df['discount'] * df['objective']).sum()), df
+
+
+class MultiYearModel(MISOCP):
+    # mo hinh day du nhieu nam: TIME = (nam, gio), Zcap theo nam chi tang dan (tu da lap khong thao ra)
+    # kich thuoc tang tuyen tinh theo so nam -> dung cho luoi nho / kiem tra solve_rolling
+    def __init__(self, xlsx_file=None, json_file=None, years=None, cache_dir=None, working_directory=None):
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        self.years = years or self.years
+        self.year_list = list(range(1, self.years + 1))
+        # gioi han cua define_Tighten suy ra cho mot nam voi Zcap co dinh, khong dung cho Zcap theo nam
+        self.tighten = False
+
+        base = copy.copy(self)
+        hours, w_time = list(self.time), list(self.w_time)
+        self.time, self.w_time, self.year_time = [], [], []
+        self.res_prf, self.com_prf, self.ind_prf = [], [], []
+        for year in self.year_list:
+            grown = grow_profile(copy.copy(base), year)
+            self.time += [f'{year}_{t}' for t in hours]
+            self.w_time += w_time
+            self.year_time += [(year, f'{year}_{t}') for t in hours]
+            self.res_prf += grown.res_prf
+            self.com_prf += grown.com_prf
+            self.ind_prf += grown.ind_prf
+
+    def define_Set(self):
+        super().define_Set()
+        self.YEAR = Set(
+            self.CONTAINER,
+            name='YEAR',
+            records=self.year_list,
+            description='Tap nam quy hoach'
+        )
+        self.YT = Set(
+            self.CONTAINER,
+            name='YT',
+            domain=[self.YEAR, self.TIME],
+            records=self.year_time,
+            description='Gio thuoc nam'
+        )
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.DFY = Parameter(
+            self.CONTAINER,
+            name='DFY',
+            domain=self.YEAR,
+            records=[(year, discount(self, year)) for year in self.year_list],
+            description='He so quy ve hien tai theo nam'
+        )
+
+    def define_Variable(self):
+        super().define_Variable()
+        self.ZcapY = Variable(
+            self.CONTAINER,
+            name='ZcapY',
+            domain=[self.BUS, self.CAP, self.YEAR],
+            type="binary"
+        )
+        self.QcapY = Variable(
+            self.CONTAINER,
+            name='QcapY',
+            domain=[self.BUS, self.YEAR],
+            type="free"
+        )
+        self.QcapY.fx[self.BUS, self.YEAR].where[~Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = 0
+
+    # can bang Q: Qcap(BUS) thay bang QcapY cua nam chua gio dang xet
+    def QcapTime(self):
+        return Sum(self.YEAR.where[self.YT[self.YEAR, self.TIME]], self.QcapY[self.BUS, self.YEAR])
+
+    def define_Equation(self):
+        super().define_Equation()
+        self.Eqs20_Y = Equation(
+            self.CONTAINER,
+            name='Eqs20_Y',
+            domain=[self.BUS, self.YEAR]
+        )
+        self.Eqs20_Y[self.BUS, self.YEAR].where[Sum(self.CAP, self.CANDIDATE[self.BUS, self.CAP])] = (
+            self.QcapY[self.BUS, self.YEAR] == Sum(
+                self.CAP.where[self.CANDIDATE[self.BUS, self.CAP]],
+                self.CapData[self.CAP, 'Qc'] * self.ZcapY[self.BUS, self.CAP, self.YEAR]
+            )
+        )
+        # dau tu theo giai doan: tu da lap giu nguyen cac nam sau
+        self.Eqs_Stage = Equation(
+            self.CONTAINER,
+            name='Eqs_Stage',
+            domain=[self.BUS, self.CAP, self.YEAR]
+        )
+        self.Eqs_Stage[self.BUS, self.CAP, self.YEAR].where[self.CANDIDATE[self.BUS, self.CAP] & ~self.YEAR.first] = (
+            self.ZcapY[self.BUS, self.CAP, self.YEAR] >= self.ZcapY[self.BUS, self.CAP, self.YEAR.lag(1)]
+        )
+        # Zcap = trang thai nam cuoi -> Eqs9, Eqs10 (va do tang dan) gioi han moi nam
+        self.Eqs_Final = Equation(
+            self.CONTAINER,
+            name='Eqs_Final',
+            domain=[self.BUS, self.CAP]
+        )
+        self.Eqs_Final[self.BUS, self.CAP].where[self.CANDIDATE[self.BUS, self.CAP]] = (
+            self.Zcap[self.BUS, self.CAP] == self.ZcapY[self.BUS, self.CAP, str(self.year_list[-1])]
+        )
+
+    def define_Obj(self):
+        # tong quy ve hien tai: ton that nam + chi phi dau tu quy doi hang nam cua cac tu dang van hanh
+        self.Eqs_Obj = Equation(
+            self.CONTAINER,
+            name='Eqs_Obj',
+        )
+        self.Eqs_Obj[...] = (
+            self.OBJ ==
+            Sum(
+                (self.YEAR, self.BUS, self.NODE, self.TIME),
+                (self.DFY[self.YEAR] *
+                self.WTIME[self.TIME] *
+                self.BrnData[self.BUS, self.NODE, 'R'] *
+                self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] *
+                self.SBASE * self.COSTA
+                ).where[self.BRN[self.BUS, self.NODE] & self.YT[self.YEAR, self.TIME]]
+            )
+            + Sum(
+                (self.YEAR, self.CANDIDATE[self.BUS, self.CAP]),
+                self.DFY[self.YEAR] *
+                self.ZcapY[self.BUS, self.CAP, self.YEAR] *
+                self.CapData[self.CAP, 'Cost'] *
+                self.CapData[self.CAP, 'Qc'] *
+                self.SBASE *
+                self.R * (1 + self.R)**self.MCAP /
+                ((1 + self.R)**self.MCAP - 1)
+            )
+        )
+
+    def stages(self):
+        # {year: {(bus, cap): 1}} tu nghiem ZcapY
+        plan = {year: {} for year in self.year_list}
+        df = self.ZcapY.records
+        if df is not None:
+            for b, c, y, z in zip(df.iloc[:, 0], df.iloc[:, 1], df.iloc[:, 2], df['level']):
+                if z > 0.5:
+                    plan[int(y)][(int(b), int(c))] = 1
+        return plan
+
+
+class YearModel(MISOCP):
+    # bai toan mot nam cua phan ra theo nam: tai tang truong den nam year, cac tu da lap (nam truoc) giu nguyen
+    def __init__(self, xlsx_file=None, json_file=None, year=1, cache_dir=None, working_directory=None):
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        self.year = year
+        # gioi han cua define_Tighten khong tinh den tu da lap (ZMIN gan sau khi sinh mo hinh) -> tat nhu MultiYearModel
+        self.tighten = False
+        grow_profile(self, year)
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.ZMIN = Parameter(
+            self.CONTAINER,
+            name='ZMIN',
+            domain=[self.BUS, self.CAP],
+            description='Tu da lap tu cac nam truoc'
+        )
+
+    def set_installed(self, installed):
+        self.ZMIN.setRecords([(bus, cap, 1) for bus, cap in installed])
+        self.Zcap.lo[self.BUS, self.CAP] = self.ZMIN[self.BUS, self.CAP]
+
+        return True
+
+
+# moi tien trinh con giai cac YearModel trong thu muc rieng
+def _solve_year(year, installed=()):
+    state = worker_state('misocp_year')
+    state['n'] += 1
+    workdir = os.path.join(state['workdir'], str(state['n']))
+    os.makedirs(workdir, exist_ok=True)
+    t0 = time.perf_counter()
+    try:
+        opt = YearModel(*state['args'], year=year, cache_dir=state['cache_dir'], working_directory=workdir)
+        opt.build()
+        opt.opts.threads = state['threads']
+        opt.opts.listing_file = os.path.join(workdir, 'year.lst')
+        opt.set_installed(installed)
+        opt.MODEL.solve(solver=opt.solver, options=opt.opts, solver_options=opt.solver_options)
+        status, kind = opt.MODEL.status.name, solution_kind(opt.MODEL)
+        if kind is None:
+            return {'year': year, 'status': status, 'installed': sorted(installed), 'solve_time': time.perf_counter() - t0}
+        return {'year': year, 'status': status, 'optimal': kind == 'optimal', 'objective': opt.MODEL.objective_value,
+                'installed': sorted(installed_zcap(opt)), 'solve_time': time.perf_counter() - t0}
+    except Exception as e:
+        return {'year': year, 'status': f'Error: {e}', 'installed': sorted(installed), 'solve_time': time.perf_counter() - t0}
+
+
+def solve_rolling(xlsx_file=None, json_file=None, years=None, cache_dir=None, max_workers=None, output=sys.stdout):
+    # phan ra theo nam: (1) giai doc lap tung nam song song, (2) noi chuoi tien theo nam:
+    # giu nghiem nam y neu chua du cac tu da lap truoc do, nguoc lai giai lai nam y voi cac tu nay co dinh
+    # nghiem thien can (khong tinh truoc tang truong cac nam sau), chi phi danh gia lai bang sweep cho ca chuoi
+    base = MISOCP(xlsx_file, json_file, cache_dir)
+    year_list = list(range(1, (years or base.years) + 1))
+    state = {'args': (xlsx_file, json_file), 'cache_dir': cache_dir}
+
+    t0 = time.perf_counter()
+    with WorkerPool('misocp_year', len(year_list), state, max_workers) as pool:
+        independent = pool.map(_solve_year, year_list)
+    parallel_time = time.perf_counter() - t0
+    if output:
+        print(f"{len(year_list)} nam doc lap, {pool.max_workers} tien trinh: {parallel_time:.2f} s", file=output)
+
+    # noi chuoi o tien trinh chinh (tuan tu, solver dung moi nhan)
+    init_worker('misocp_year', state, os.cpu_count() or 1)
+    rows, plan, installed = [], {}, set()
+    for res in independent:
+        resolved = False
+        if 'objective' not in res or not installed <= set(map(tuple, res['installed'])):
+            res = _solve_year(res['year'], sorted(installed))
+            resolved = True
+        if 'objective' not in res:
+            raise RuntimeError(f"Nam {res['year']} khong giai duoc: {res['status']}")
+        current = set(map(tuple, res['installed']))
+        rows.append({'year': res['year'], 'status': res['status'], 'optimal': res['optimal'], 'objective': res['objective'],
+                     'n_cap': len(current), 'new': sorted(current - installed), 'resolved': resolved,
+                     'solve_time': res['solve_time']})
+        if output:
+            print(f"  nam {res['year']:>2}: lap them {rows[-1]['new']}{' (giai lai)' if resolved else ''}"
+                  f"{'' if res['optimal'] else ' (nghiem chua toi uu: ' + res['status'] + ')'}", file=output)
+        installed = current
+        plan[res['year']] = {key: 1 for key in installed}
+
+    total, yearly = plan_cost(base, plan)
+    log = pd.DataFrame(rows).merge(yearly[['year', 'discount', 'loss_cost', 'invest_cost']], on='year')
+    return {'objective': total, 'plan': plan, 'log': log, 'parallel_time': parallel_time,
+            'wall_time': time.perf_counter() - t0}
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+
+    res = solve_rolling(input_xlsx, input_json)
+    print(res['log'].to_string(index=False))
+    print(f"\nTong chi phi quy ve hien tai: ${res['objective']:,.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import os, sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from gamspy import (
+    Set,
+    Parameter,
+    Equation,
+    Model,
+    Problem,
+    Sense,
+)
+
+from misocp2 import MISOCP
+from powerflow import PowerFlow, model_levels
+from heuristic import placement_cost
+from solver import get_backend, installed_zcap, solution_kind
+
+
+class OAModel(MISOCP):
+    # xap xi ngoai (outer approximation) cua Eqs16: bo cone, giai MILP voi cac lat cat tiep tuyen,
+    # them lat cat tai cac nhanh-gio bi vi pham roi giai lai cho den khi vi pham <= tol
+    # cone xoay I*U >= P^2 + Q^2 <=> ||(2P, 2Q, I - U)|| <= I + U, lat cat tai diem (P*, Q*, I*, U*), n* = ||(2P*, 2Q*, I* - U*)||:
+    #   (4P* P + 4Q* Q + (I* - U*) (I - U)) / n* <= I + U
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None, working_directory=None, max_iter=50, tol=1e-6,
+                 backend=None):
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        self.max_iter = max_iter
+        self.tol = tol
+        self.oa_backend = backend
+        self.n_cut = 0
+        self.cut_records = []
+
+    def define_Set(self):
+        super().define_Set()
+        self.ITER = Set(
+            self.CONTAINER,
+            name='ITER',
+            records=list(range(0, self.max_iter + 1)),
+            description='Tap vong lap'
+        )
+        self.OA_attr = Set(
+            self.CONTAINER,
+            name='OA_attr',
+            records=['P', 'Q', 'I', 'U']
+        )
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.OACUT = Parameter(
+            self.CONTAINER,
+            name='OACUT',
+            domain=[self.BUS, self.NODE, self.TIME, self.ITER, self.OA_attr],
+            description='He so lat cat tiep tuyen cua Eqs16 (P, Q, I, U)'
+        )
+
+    def define_Equation(self):
+        super().define_Equation()
+        # cP P + cQ Q + cI I + cU U <= 0, U la dien ap bus dau nhanh nhu Eqs16
+        self.Eqs16_OA = Equation(
+            self.CONTAINER,
+            name='Eqs16_OA',
+            domain=[self.BUS, self.NODE, self.TIME, self.ITER]
+        )
+        self.Eqs16_OA[self.BUS, self.NODE, self.TIME, self.ITER].where[self.OACUT[self.BUS, self.NODE, self.TIME, self.ITER, 'I']] = (
+            self.OACUT[self.BUS, self.NODE, self.TIME, self.ITER, 'P'] * self.Pbrn[self.BUS, self.NODE, self.TIME] +
+            self.OACUT[self.BUS, self.NODE, self.TIME, self.ITER, 'Q'] * self.Qbrn[self.BUS, self.NODE, self.TIME] +
+            self.OACUT[self.BUS, self.NODE, self.TIME, self.ITER, 'I'] * self.Ibrn_sqr[self.BUS, self.NODE, self.TIME] +
+            self.OACUT[self.BUS, self.NODE, self.TIME, self.ITER, 'U'] * self.Usqr[self.BUS, self.TIME]
+            <= 0
+        )
+
+    def define_Options(self):
+        super().define_Options()
+        self.opts.mip = self.solver
+        self.opts.listing_file = os.path.join(tempfile.gettempdir(), 'misocp_oa.lst')
+
+        return True
+
+    def define_Model(self):
+        # bai toan MILP: moi phuong trinh tru Eqs16
+        self.MODEL = Model(
+            self.CONTAINER,
+            name='Capacitor_Place_OA',
+            equations=[eq for eq in self.CONTAINER.getEquations() if eq.name != self.Eqs16.name],
+            sense=Sense.MIN,
+            objective=self.OBJ,
+            problem=Problem.MIP
+        )
+
+        return True
+
+    def add_cuts(self, P, Q, I, U, mask):
+        # P, Q, I, U: mang (bus, time) theo nhanh cha -> bus; mask: cac nhanh-gio can them lat cat
+        k = self.n_cut
+        if k > self.max_iter:
+            raise RuntimeError(f'Vuot qua so vong lap toi da ({self.max_iter})')
+        child = self.topo.bfs_order[1:]
+        parent = self.topo.parent
+        n = np.sqrt(4 * P**2 + 4 * Q**2 + (I - U)**2)
+        n = np.where(n > 0, n, 1)
+        coef = {'P': 4 * P / n, 'Q': 4 * Q / n, 'I': (I - U) / n - 1, 'U': -(I - U) / n - 1}
+        for b in child:
+            f_bus, t_bus = self.id_bus[parent[b]], self.id_bus[b]
+            for j in np.flatnonzero(mask[b]):
+                self.cut_records += [(f_bus, t_bus, self.time[j], k, attr, coef[attr][b, j]) for attr in coef]
+        self.OACUT.setRecords(self.cut_records)
+        self.n_cut = k + 1
+        return int(mask[child].sum())
+
+    def violation(self):
+        # P^2 + Q^2 - I*U cua nghiem hien tai (chuan hoa theo U), mang (bus, time)
+        lv = model_levels(self)
+        child = self.topo.bfs_order[1:]
+        U = np.zeros_like(lv['Usqr'])
+        U[child] = lv['Usqr'][self.topo.parent[child]]
+        viol = np.zeros_like(U)
+        viol[child] = (lv['Pbrn'][child]**2 + lv['Qbrn'][child]**2) / U[child] - lv['Ibrn_sqr'][child]
+        return viol, lv['Pbrn'], lv['Qbrn'], lv['Ibrn_sqr'], U
+
+    def solve_mip(self, output=None):
+        # tra ve status, kieu nghiem ('optimal' / 'incumbent' / None), muc tieu cua nghiem va can duoi tot nhat cua MILP
+        if self.oa_backend is None:
+            self.MODEL.solve(solver=self.solver, options=self.opts, output=output)
+            return (self.MODEL.status.name, solution_kind(self.MODEL), self.MODEL.objective_value,
+                    self.MODEL.objective_estimation)
+        res = get_backend(self.oa_backend).solve(self, output=output)
+        kind = None if res['objective'] is None else 'optimal' if str(res['status']).lower() == 'optimal' else 'incumbent'
+        return res['status'], kind, res['objective'], res['bound']
+
+
+def solve_oa(opt, output=sys.stdout):
+    # vong lap OA: can duoi = MILP (noi long cua MIQCP), can tren = chi phi chinh xac (sweep) cua Zcap tim duoc
+    pf = PowerFlow(opt)
+    t0 = time.perf_counter()
+    # lat cat ban dau tai dong cong suat khi chua dat tu
+    base = pf.solve()
+    U0 = np.zeros_like(base['Usqr'])
+    child = opt.topo.bfs_order[1:]
+    U0[child] = base['Usqr'][opt.topo.parent[child]]
+    mask = np.zeros(base['Usqr'].shape, dtype=bool)
+    mask[child] = True
+    opt.add_cuts(base['Pbrn'], base['Qbrn'], base['Ibrn_sqr'], U0, mask)
+
+    log, best, lb = [], {'ub': np.inf, 'zcap': None}, -np.inf
+    for it in range(1, opt.max_iter + 1):
+        status, kind, _, bound = opt.solve_mip()
+        if kind is None:
+            raise RuntimeError(f'MILP khong co nghiem: {status}')
+        # can duoi = can duoi tot nhat cua MILP (khong phai muc tieu cua nghiem khi MILP dung truoc toi uu);
+        # lat cat chi them vao nen can duoi cac vong lap truoc van dung
+        if bound is not None and np.isfinite(bound):
+            lb = max(lb, bound)
+        zcap = installed_zcap(opt)
+        cost = placement_cost(opt, zcap, pf)
+        if cost['u_min'] >= opt.u_min - 1e-6 and cost['u_max'] <= opt.u_max + 1e-6 and cost['objective'] < best['ub']:
+            best = {'ub': cost['objective'], 'zcap': zcap}
+        viol, P, Q, I, U = opt.violation()
+        max_viol = float(viol.max())
+        gap = (best['ub'] - lb) / max(abs(best['ub']), 1e-9)
+        log.append({'iter': it, 'status': status, 'optimal': kind == 'optimal', 'lb': lb, 'ub': best['ub'], 'gap': gap,
+                    'max_viol': max_viol, 'n_cut': len(opt.cut_records) // 4, 'time': time.perf_counter() - t0})
+        if output:
+            print(f"  iter {it:>3}: LB={lb:.4f} UB={best['ub']:.4f} gap={gap:.2e} vi pham={max_viol:.2e} "
+                  f"lat cat={log[-1]['n_cut']}{'' if kind == 'optimal' else ' (MILP chua toi uu: ' + status + ')'}", file=output)
+        # dung khi nghiem MILP thoa cone (toi uu cua MIQCP) hoac can duoi cham can tren
+        if max_viol <= opt.tol or gap <= opt.tol:
+            break
+        opt.add_cuts(P, Q, I, U, viol > opt.tol)
+
+    installed = sorted(k for k, z in (best['zcap'] or {}).items() if z > 0.5)
+    return {'objective': best['ub'], 'lower_bound': log[-1]['lb'], 'installed': installed, 'log': pd.DataFrame(log)}
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+
+    opt = OAModel(input_xlsx, input_json)
+    opt.build()
+    res = solve_oa(opt)
+    print(f"\nTong chi phi: ${res['objective']:,.2f} (can duoi {res['lower_bound']:,.2f})")
+    print(f"Vi tri dat tu (bus, cap): {res['installed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import numpy as np
+
+PRF_ATTR = {
+    'Residential': 'res_prf',
+    'Commercial': 'com_prf',
+    'Industrial': 'ind_prf',
+}
+
+
+def profile_load(opt, prf):
+    # P, Q tai (bus, time) theo p.u. cho bieu do phu tai prf (time, loai tai theo thu tu PRF_ATTR), giong Eqs_PL/Eqs_QL
+    prf = np.asarray(prf, dtype=float).reshape(-1, len(PRF_ATTR))
+    prf = dict(zip(PRF_ATTR, prf.T))
+    n_time = len(prf['Residential'])
+    P = np.zeros((len(opt.id_bus), n_time))
+    Q = np.zeros((len(opt.id_bus), n_time))
+    for k, (p, q, load_type) in enumerate(zip(opt.pload, opt.qload, opt.type_load)):
+        if load_type in prf and opt.typeload in ('All', load_type):
+            P[k] = p * prf[load_type]
+            Q[k] = q * prf[load_type]
+    return P, Q
+
+
+def load_matrix(opt):
+    # P, Q tai (bus, time) voi loadprofile va type_load dang chon; opt.fixed_load = (P, Q) (vd. tai theo kich ban) uu tien hon
+    if getattr(opt, 'fixed_load', None) is not None:
+        return opt.fixed_load
+    return profile_load(opt, np.column_stack([getattr(opt, attr) for attr in PRF_ATTR.values()]))
+
+
+class PowerFlow:
+    # backward/forward sweep (DistFlow chinh xac cho luoi hinh tia), tinh dong thoi moi gio va moi phuong an tu bu
+    def __init__(self, opt):
+        self.topo = topo = opt.topo
+        self.id_bus = opt.id_bus
+        self.u_slack = opt.u_slack
+        self.w_time = np.asarray(getattr(opt, 'w_time', [365] * len(opt.time)), dtype=float)
+        self.P, self.Q = load_matrix(opt)
+
+        # R, X cua nhanh cha -> bus (0 tai bus nguon)
+        child = topo.bfs_order[1:]
+        self.R = np.zeros(topo.n_bus)
+        self.X = np.zeros(topo.n_bus)
+        self.R[child] = np.asarray(opt.R_brn)[topo.parent_line[child]]
+        self.X[child] = np.asarray(opt.X_brn)[topo.parent_line[child]]
+
+        # cac bus cung muc va cung cha nam lien tiep trong bfs_order -> cong don bang reduceat
+        self.levels = []
+        for level in topo.levels[1:]:
+            parent = topo.parent[level]
+            starts = np.flatnonzero(np.r_[True, parent[1:] != parent[:-1]])
+            self.levels.append((level, parent, parent[starts], starts))
+
+    def subtree_sum(self, x):
+        acc = x.copy()
+        for level, _, parents, starts in reversed(self.levels):
+            acc[parents] += np.add.reduceat(acc[level], starts, axis=0)
+        return acc
+
+    # tong tren duong tu bus ve nguon (gia tri cua nhanh cha -> bus)
+    def path_sum(self, x):
+        acc = x.copy()
+        for level, parent, _, _ in self.levels:
+            acc[level] += acc[parent]
+        return acc
+
+    def solve(self, qcap=None, P=None, Q=None, tol=1e-10, max_iter=100):
+        # qcap: (bus,) hoac (bus, phuong an); P, Q: (bus, time) hoac (bus, ..., time)
+        P = self.P if P is None else np.asarray(P, dtype=float)
+        Q = self.Q if Q is None else np.asarray(Q, dtype=float)
+        if qcap is not None:
+            qcap = np.asarray(qcap, dtype=float)
+            Q = Q[:, None, :] - qcap[..., None] if qcap.ndim == 2 else Q - qcap[:, None]
+            P = np.broadcast_to(P[:, None, :] if qcap.ndim == 2 else P, Q.shape)
+
+        shape = (-1,) + (1,) * (Q.ndim - 1)
+        R, X = self.R.reshape(shape), self.X.reshape(shape)
+        Z2 = R**2 + X**2
+        U = np.full(Q.shape, self.u_slack**2)
+        I2 = np.zeros(Q.shape)
+
+        # bu qua muc co the lam sweep phan ky -> bao qua 'converged', khong canh bao tran so
+        with np.errstate(over='ignore', invalid='ignore'):
+            for it in range(1, max_iter + 1):
+                # backward: dong cong suat dau nhanh = tong tai + ton that phia sau
+                Pf = self.subtree_sum(P + R * I2)
+                Qf = self.subtree_sum(Q + X * I2)
+                # forward: dien ap binh phuong theo DistFlow
+                U_old = U.copy()
+                for level, parent, _, _ in self.levels:
+                    I2[level] = (Pf[level]**2 + Qf[level]**2) / U[parent]
+                    U[level] = (U[parent] - 2 * (R[level] * Pf[level] + X[level] * Qf[level]) + Z2[level] * I2[level])
+                # phan tu phan ky (nan / inf) khong chan cac phan tu con lai hoi tu; step: buoc cuoi theo phan tu
+                step = np.abs(U - U_old)
+                finite = np.isfinite(step)
+                delta = np.max(step, where=finite, initial=0.0) if finite.any() else np.inf
+                if delta < tol or not finite.any():
+                    break
+
+        root = self.topo.root
+        return {
+            'Usqr': U,
+            'Ibrn_sqr': I2,
+            'Pbrn': Pf,
+            'Qbrn': Qf,
+            'Pgen': Pf[root],
+            'Qgen': Qf[root],
+            'loss': (R * I2).sum(axis=0),
+            'iterations': it,
+            'step': step,
+            'converged': bool(delta < tol and finite.all()),
+        }
+
+    def evaluate(self, qcap, chunk=None):
+        # danh gia nhieu phuong an tu bu (bus, phuong an), chia lo de gioi han bo nho bus x lo x gio
+        qcap = np.asarray(qcap, dtype=float)
+        chunk = chunk or max(1, int(2**22 // (self.topo.n_bus * len(self.w_time))))
+        out = {'loss': [], 'energy_loss': [], 'u_min': [], 'u_max': [], 'converged': True}
+        for k in range(0, qcap.shape[1], chunk):
+            res = self.solve(qcap[:, k:k + chunk])
+            out['loss'].append(res['loss'])
+            out['energy_loss'].append(res['loss'] @ self.w_time)
+            out['u_min'].append(np.sqrt(res['Usqr'].min(axis=(0, 2))))
+            out['u_max'].append(np.sqrt(res['Usqr'].max(axis=(0, 2))))
+            out['converged'] &= res['converged']
+        return {key: np.concatenate(val) if isinstance(val, list) else val for key, val in out.items()}
+
+
+def model_levels(opt):
+    # doc level Usqr, Ibrn_sqr, Pbrn, Qbrn, Qcap cua mo hinh da giai ve mang (bus, time) theo nhanh cha -> bus
+    topo = opt.topo
+    pos = {str(bus): k for k, bus in enumerate(opt.id_bus)}
+    tpos = {str(t): k for k, t in enumerate(opt.time)}
+    shape = (len(opt.id_bus), len(opt.time))
+
+    def by_bus(var, branch):
+        arr = np.zeros(shape)
+        df = var.records
+        if df is None or df.empty:
+            return arr
+        bus = df.iloc[:, 1 if branch else 0].astype(str).map(pos).to_numpy()
+        t = df.iloc[:, df.columns.get_loc('level') - 1].astype(str).map(tpos).to_numpy()
+        arr[bus, t] = df['level'].to_numpy()
+        return arr
+
+    qcap = np.zeros(shape[0])
+    df = opt.Qcap.records
+    if df is not None and not df.empty:
+        qcap[df.iloc[:, 0].astype(str).map(pos).to_numpy()] = df['level'].to_numpy()
+    levels = {
+        'qcap': qcap,
+        'Usqr': by_bus(opt.Usqr, False),
+        'Ibrn_sqr': by_bus(opt.Ibrn_sqr, True),
+        'Pbrn': by_bus(opt.Pbrn, True),
+        'Qbrn': by_bus(opt.Qbrn, True),
+    }
+    levels['Ibrn_sqr'][topo.root] = 0
+    return levels
+
+
+def verify_solution(opt, pf=None):
+    # so sanh nghiem noi long SOCP (Eqs16: I2*U >= P2 + Q2) voi phan bo cong suat chinh xac tai cung Qcap
+    pf = pf or PowerFlow(opt)
+    topo = pf.topo
+    lv = model_levels(opt)
+    res = pf.solve(lv['qcap'])
+
+    child = topo.bfs_order[1:]
+    u_from = lv['Usqr'][topo.parent[child]]
+    # do ho cua cone: I2 - (P2 + Q2)/U, = 0 khi noi long chat
+    cone_gap = lv['Ibrn_sqr'][child] - (lv['Pbrn'][child]**2 + lv['Qbrn'][child]**2) / u_from
+    loss_model = (pf.R[:, None] * lv['Ibrn_sqr']).sum(axis=0)
+    return {
+        'tight': bool(np.abs(cone_gap).max() < 1e-5),
+        'cone_gap_max': float(np.abs(cone_gap).max()),
+        'volt_error_max': float(np.abs(np.sqrt(lv['Usqr']) - np.sqrt(res['Usqr'])).max()),
+        'loss_model': float(loss_model @ pf.w_time),
+        'loss_exact': float(res['loss'] @ pf.w_time),
+        'loss_error': float(np.abs(loss_model - res['loss']).max()),
+        'converged': res['converged'],
+    }
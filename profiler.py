@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PATH_PY = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_mb():
+    # bo nho dang dung cua tien trinh (MB), None neu khong doc duoc
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    # dinh bo nho tu khi tien trinh bat dau (MB)
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2**20
+    return None
+
+
+def code_version():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PATH_PY, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def container_counts(container):
+    # so symbol va so records da khai bao trong Container
+    counts = {}
+    for kind, symbols in (('sets', container.getSets()), ('parameters', container.getParameters()),
+                          ('variables', container.getVariables()), ('equations', container.getEquations())):
+        counts[f'n_{kind}'] = len(symbols)
+        if kind in ('sets', 'parameters'):
+            counts[f'n_{kind}_records'] = sum(len(s.records) for s in symbols if s.records is not None)
+    return counts
+
+
+def model_stats(model):
+    # thong ke do GAMS/solver bao cao sau lan giai
+    stats = {}
+    for name in ('num_equations', 'num_variables', 'num_discrete_variables', 'num_nonzeros', 'num_nonlinear_zeros',
+                 'num_nodes_used', 'num_iterations', 'model_generation_time', 'solve_model_time',
+                 'total_solve_time', 'objective_value', 'objective_estimation'):
+        try:
+            stats[name] = getattr(model, name)
+        except Exception:
+            stats[name] = None
+    stats['status'] = getattr(model.status, 'name', None)
+    obj, bound = stats.get('objective_value'), stats.get('objective_estimation')
+    if obj is not None and bound is not None:
+        stats['gap'] = abs(obj - bound) / max(abs(obj), 1e-10)
+    return stats
+
+
+class Profiler:
+    # ghi thoi gian, bo nho va so doi tuong cua tung buoc, xuat JSON de so sanh giua cac phien ban / kich thuoc luoi
+    def __init__(self, **meta):
+        self.meta = {
+            'code_version': code_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            **meta,
+        }
+        self.phases = []
+        self.t_start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, container=None):
+        rss0 = rss_mb()
+        t0 = time.perf_counter()
+        row = {'phase': name}
+        try:
+            yield row
+        finally:
+            row['wall_time'] = time.perf_counter() - t0
+            row['rss_mb'] = rss_mb()
+            row['rss_delta_mb'] = None if rss0 is None or row['rss_mb'] is None else row['rss_mb'] - rss0
+            row['peak_rss_mb'] = peak_rss_mb()
+            if container is not None:
+                row.update(container_counts(container))
+            self.phases.append(row)
+
+    def report(self):
+        return {
+            'meta': self.meta,
+            'total_time': time.perf_counter() - self.t_start,
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': self.phases,
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        return path
+
+    def summary(self):
+        for row in self.phases:
+            mem = '' if row['peak_rss_mb'] is None else f", peak {row['peak_rss_mb']:.0f} MB"
+            print(f"  {row['phase']:<18} {row['wall_time']:8.3f}s{mem}")
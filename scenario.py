@@ -0,0 +1,236 @@
+import os
+import time
+import shutil
+import tempfile
+from multiprocessing import util
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from misocp2 import MISOCP, PATH_RESULT
+
+# tham so kich ban -> (ten Parameter, thuoc tinh trong GetData)
+SCALAR_PARAMS = {
+    'Y': ('YCAP', 'Y'),
+    'c_delta_a': ('COSTA', 'cost_A'),
+    'r': ('R', 'r'),
+    'M': ('MCAP', 'M'),
+    'volt_lower': ('UMIN', 'u_min'),
+    'volt_upper': ('UMAX', 'u_max'),
+}
+PROFILES = {
+    'Residential': 'res_prf',
+    'Commercial': 'com_prf',
+    'Industrial': 'ind_prf',
+}
+
+
+class ScenarioRunner:
+    # tao cau truc mo hinh mot lan, moi kich ban chi cap nhat records cua Parameter va giai lai
+    def __init__(self, xlsx_file=None, json_file=None, cache_dir=None, opt=None, type_load=None, working_directory=None):
+        self.opt = opt or MISOCP(xlsx_file, json_file, cache_dir, working_directory)
+        if opt is None:
+            # type_load quyet dinh cach tinh LoadData nen phai dat truoc khi tao tham so
+            self.opt.typeload = type_load or self.opt.typeload
+            self.opt.build()
+
+        self.base = {key: getattr(self.opt, attr) for key, (_, attr) in SCALAR_PARAMS.items()}
+        self.base.update({key: list(getattr(self.opt, attr)) for key, attr in PROFILES.items()})
+
+    def apply(self, scenario):
+        unknown = set(scenario) - set(self.base) - {'name'}
+        if unknown:
+            raise KeyError(f'Tham so kich ban khong hop le: {sorted(unknown)}')
+        values = {**self.base, **scenario}
+
+        for key, (param, _) in SCALAR_PARAMS.items():
+            getattr(self.opt, param).setRecords(values[key])
+        self.opt.PrfData.setRecords([
+            (t, prf_type, prf)
+            for prf_type in PROFILES
+            for t, prf in zip(self.opt.time, values[prf_type])
+        ])
+        self.opt.define_Load()
+        # gioi han Usqr duoc gan luc khai bao nen can gan lai theo UMIN/UMAX moi
+        self.opt.define_Bounds()
+        # gioi han cua define_Tighten suy ra tu bieu do phu tai va Y -> tinh lai theo tham so kich ban
+        if getattr(self.opt, 'tighten', False):
+            for key, (_, attr) in SCALAR_PARAMS.items():
+                setattr(self.opt, attr, values[key])
+            for key, attr in PROFILES.items():
+                setattr(self.opt, attr, values[key])
+            self.opt.define_Tighten()
+
+        return values
+
+    def solve(self, scenario, output=None):
+        if scenario.get('type_load', self.opt.typeload) != self.opt.typeload:
+            raise ValueError(f"Kich ban type_load={scenario['type_load']} khac mo hinh da tao ({self.opt.typeload})")
+        scenario = {k: v for k, v in scenario.items() if k != 'type_load'}
+        values = self.apply(scenario)
+        t0 = time.perf_counter()
+        self.opt.MODEL.solve(options=self.opt.opts, output=output)
+        solve_time = time.perf_counter() - t0
+
+        return self.summary(scenario.get('name'), values, solve_time)
+
+    def summary(self, name, values, solve_time):
+        row = {'scenario': name, 'type_load': self.opt.typeload}
+        row.update({key: values[key] for key in SCALAR_PARAMS})
+        row['status'] = self.opt.MODEL.status.name
+        row['objective'] = self.opt.MODEL.objective_value
+        row['solve_time'] = solve_time
+
+        zcap = self.opt.Zcap.records
+        if zcap is None or zcap.empty:
+            installed = []
+        else:
+            installed = zcap[zcap['level'] > 0.5]
+            installed = list(zip(installed.iloc[:, 0], installed.iloc[:, 1]))
+        q_cap = dict(zip(self.opt.id_cap, self.opt.Q_cap))
+        row['n_cap'] = len(installed)
+        row['qcap_kvar'] = sum(q_cap[int(cap)] for _, cap in installed) * self.opt.s_base * 1000
+        row['installed'] = ' '.join(f'{bus}:{cap}' for bus, cap in installed)
+
+        return row
+
+    def run(self, scenarios, output=None):
+        rows = []
+        for k, scenario in enumerate(scenarios):
+            scenario = {'name': f'S{k + 1}', **scenario}
+            try:
+                rows.append(self.solve(scenario, output))
+            except Exception as e:
+                print(f"Loi giai kich ban {scenario['name']}: {e}")
+                rows.append({'scenario': scenario['name'], 'status': f'Error: {e}'})
+            print(f"  {scenario['name']}: {rows[-1].get('status')} {rows[-1].get('objective', '')}")
+
+        return pd.DataFrame(rows)
+
+
+# trang thai cua tung tien trinh theo khoa (loai tac vu): tham so, so luong solver, thu muc lam viec rieng va cac mo hinh
+# da tao (tao mot lan, dung lai cho cac tac vu sau); khi chay tuan tu la trang thai cua tien trinh chinh
+_WORKER = {}
+
+
+def worker_dir(prefix):
+    # thu muc lam viec tam cua mot tien trinh, xoa khi tien trinh ket thuc
+    # Finalize chay ca trong tien trinh con cua ProcessPoolExecutor (atexit thi khong) va trong tien trinh chinh
+    workdir = tempfile.mkdtemp(prefix=f'{prefix}_{os.getpid()}_')
+    util.Finalize(None, shutil.rmtree, args=(workdir,), kwargs={'ignore_errors': True}, exitpriority=0)
+    return workdir
+
+
+def init_worker(key, state, threads):
+    _WORKER[key] = {**state, 'threads': threads, 'workdir': worker_dir(key), 'models': {}, 'n': 0}
+
+
+def worker_state(key):
+    return _WORKER[key]
+
+
+class WorkerPool:
+    # chia tac vu cho max_workers tien trinh (mac dinh so nhan, khong qua so tac vu), moi tien trinh threads luong solver
+    # de tong so luong bang so nhan; max_workers == 1 -> chay trong tien trinh chinh
+    # pinned: moi tien trinh la mot ProcessPoolExecutor(1) rieng, tac vu thu k cua moi lan map luon chay o tien trinh
+    # k % max_workers (mo hinh da tao cua tac vu do khong phai tao lai o tien trinh khac)
+    def __init__(self, key, n_task, state, max_workers=None, threads=None, pinned=False):
+        self.max_workers = max_workers or max(1, min(n_task, os.cpu_count() or 1))
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.max_workers)
+        initargs = (key, state, self.threads)
+        if self.max_workers == 1:
+            init_worker(*initargs)
+            self.pools = []
+        else:
+            n_pool, size = (self.max_workers, 1) if pinned else (1, self.max_workers)
+            self.pools = [ProcessPoolExecutor(max_workers=size, initializer=init_worker, initargs=initargs)
+                          for _ in range(n_pool)]
+
+    def submit_all(self, fn, iterables):
+        return [self.pools[k % len(self.pools)].submit(fn, *args) for k, args in enumerate(zip(*iterables))]
+
+    def map(self, fn, *iterables):
+        if not self.pools:
+            return list(map(fn, *iterables))
+        return [future.result() for future in self.submit_all(fn, iterables)]
+
+    def imap_unordered(self, fn, *iterables):
+        # ket qua theo thu tu giai xong
+        if not self.pools:
+            yield from map(fn, *iterables)
+            return
+        for future in as_completed(self.submit_all(fn, iterables)):
+            yield future.result()
+
+    def shutdown(self):
+        for pool in self.pools:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def _worker_runner(type_load):
+    state = worker_state('misocp')
+    runners = state['models']
+    if type_load not in runners:
+        workdir = os.path.join(state['workdir'], str(type_load))
+        os.makedirs(workdir, exist_ok=True)
+        runner = ScenarioRunner(*state['args'], type_load=type_load, working_directory=workdir)
+        runner.opt.opts.threads = state['threads']
+        runner.opt.opts.listing_file = os.path.join(workdir, 'misocp2.lst')
+        runners[type_load] = runner
+    return runners[type_load]
+
+
+def _solve_task(scenario):
+    t0 = time.perf_counter()
+    try:
+        row = _worker_runner(scenario.get('type_load')).solve(scenario)
+    except Exception as e:
+        row = {'scenario': scenario['name'], 'type_load': scenario.get('type_load'), 'status': f'Error: {e}'}
+    row['worker'] = os.getpid()
+    row['task_time'] = time.perf_counter() - t0
+    return row
+
+
+def iter_parallel(scenarios, xlsx_file=None, json_file=None, cache_dir=None, max_workers=None, threads=None):
+    # tra ve ket qua tung kich ban ngay khi tien trinh con giai xong
+    scenarios = [{'name': f'S{k + 1}', **scenario} for k, scenario in enumerate(scenarios)]
+    if not scenarios:
+        return
+    state = {'args': (xlsx_file, json_file, cache_dir)}
+    with WorkerPool('misocp', len(scenarios), state, max_workers, threads) as pool:
+        yield from pool.imap_unordered(_solve_task, scenarios)
+
+
+def run_parallel(scenarios, xlsx_file=None, json_file=None, cache_dir=None, max_workers=None, threads=None):
+    rows = []
+    for row in iter_parallel(scenarios, xlsx_file, json_file, cache_dir, max_workers, threads):
+        rows.append(row)
+        print(f"  [{len(rows)}/{len(scenarios)}] {row['scenario']}: {row.get('status')} {row.get('objective', '')}")
+
+    order = {scenario.get('name', f'S{k + 1}'): k for k, scenario in enumerate(scenarios)}
+    return pd.DataFrame(rows).sort_values('scenario', key=lambda col: col.map(order)).reset_index(drop=True)
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+
+    scenarios = [
+        {'name': f'{type_load}/Y={y}', 'type_load': type_load, 'Y': y}
+        for type_load in ('Residential', 'Commercial', 'Industrial', 'All')
+        for y in (2, 5, 10)
+    ]
+    scenarios += [{'name': f'All/cA={c}', 'type_load': 'All', 'c_delta_a': c} for c in (8, 16)]
+
+    df = run_parallel(scenarios, input_xlsx, input_json)
+    print(df.to_string(index=False))
+    df.to_csv(os.path.join(PATH_RESULT, 'scenarios.csv'), index=False)
+
+
+if __name__ == '__main__':
+    main()
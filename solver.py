@@ -0,0 +1,238 @@
+import os
+import re
+import time
+import tempfile
+import pandas as pd
+from gamspy import FileFormat, Problem, ModelStatus
+
+try:
+    import pyscipopt
+except ImportError:
+    pyscipopt = None
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# dinh dang xuat mo hinh qua GAMS CONVERT
+EXPORT_FORMAT = {
+    'lp': FileFormat.CPLEXLP,
+    'mps': FileFormat.CPLEXMPS,
+    'osil': FileFormat.OSiL,
+    'nl': FileFormat.AMPLNL,
+    'gms': FileFormat.GAMS,
+}
+LINEAR_PROBLEMS = (Problem.LP, Problem.MIP, Problem.RMIP)
+# trang thai GAMS co nghiem: toi uu, hoac nghiem kha thi chua chung minh toi uu (dung do gioi han thoi gian / gap)
+OPTIMAL_STATUS = (ModelStatus.OptimalGlobal, ModelStatus.OptimalLocal)
+INCUMBENT_STATUS = (ModelStatus.Integer, ModelStatus.Feasible)
+
+
+def export_model(model, out_dir, formats=('lp',)):
+    # ghi mo hinh (da sinh tu Container) ra file cho solver ngoai GAMS, kem dict.txt de anh xa ten cot -> bien GAMSPy
+    os.makedirs(out_dir, exist_ok=True)
+    model.convert(out_dir, [EXPORT_FORMAT[fmt] for fmt in formats] + [FileFormat.GAMSDict])
+    return {fmt: os.path.join(out_dir, EXPORT_FORMAT[fmt].value) for fmt in formats}
+
+
+def read_dict(dict_file):
+    # dong '  b292  Zcap(2,1)' trong phan Variables -> {'b292': ('Zcap', ('2', '1'))}
+    mapping = {}
+    section = None
+    with open(dict_file) as f:
+        for line in f:
+            if line.startswith('Variables'):
+                section = 'var'
+                continue
+            if line.startswith('Equations'):
+                section = None
+                continue
+            m = re.match(r'\s+(\w+)\s+(\w+)(?:\((.*)\))?\s*$', line)
+            if section == 'var' and m:
+                keys = tuple(k.strip().strip("'") for k in m.group(3).split(',')) if m.group(3) else ()
+                mapping[m.group(1)] = (m.group(2), keys)
+    return mapping
+
+
+def load_levels(opt, values, mapping, objective=None):
+    # gan level tu nghiem cua solver ngoai vao cac Variable cua Container (de Verify / export dung nhu khi giai bang GAMS)
+    rows = {}
+    for col, value in values.items():
+        if col in mapping:
+            name, keys = mapping[col]
+            rows.setdefault(name, []).append(keys + (value,))
+    for name, records in rows.items():
+        var = opt.CONTAINER[name]
+        columns = [d if isinstance(d, str) else d.name for d in var.domain] + ['level']
+        old = var.records
+        var.setRecords(pd.DataFrame(records, columns=columns) if var.dimension else records[0][-1])
+        # giu lo/up/scale da gan truoc do (mo hinh con duoc giai lai, vd. vong lap xap xi ngoai)
+        if var.dimension and old is not None and not old.empty:
+            df = var.records
+            keys = list(df.columns[:var.dimension])
+            bounds = ['lower', 'upper', 'scale']
+            merged = df.astype({key: str for key in keys}).merge(
+                old[keys + bounds].astype({key: str for key in keys}), on=keys, how='left', suffixes=('', '_old'))
+            for col in bounds:
+                merged[col] = merged[f'{col}_old'].fillna(merged[col])
+            var.setRecords(merged[list(df.columns)])
+    # CONVERT co the thay bien muc tieu vao ham muc tieu
+    if objective is not None:
+        opt.OBJ.setRecords(objective)
+
+
+def solution_kind(model):
+    # 'optimal', 'incumbent' (co nghiem nhung chua toi uu) hoac None (khong co nghiem)
+    if model.status in OPTIMAL_STATUS:
+        return 'optimal'
+    if model.status in INCUMBENT_STATUS:
+        return 'incumbent'
+    return None
+
+
+def installed_zcap(opt):
+    df = opt.Zcap.records
+    if df is None or df.empty:
+        return {}
+    return {(int(b), int(c)): 1 for b, c, z in zip(df.iloc[:, 0], df.iloc[:, 1], df['level']) if z > 0.5}
+
+
+class GamsBackend:
+    # giai qua GAMSPy voi bat ky solver GAMS nao (cplex, gurobi, scip, shot, sbb, ...); solver=None -> opt.solver
+    def __init__(self, solver=None, solver_options=None):
+        self.name = 'gams' if solver is None else f'gams:{solver}'
+        self.solver = solver
+        self.solver_options = solver_options
+
+    def supports(self, problem):
+        return True
+
+    def solve(self, opt, output=None):
+        solver = self.solver or opt.solver
+        # Options.<loai bai toan> (vd. miqcp) uu tien hon tham so solver -> ghi de tren ban sao
+        opts = opt.opts.model_copy()
+        field = str(getattr(opt.MODEL.problem, 'value', opt.MODEL.problem)).lower()
+        if hasattr(opts, field):
+            setattr(opts, field, solver)
+        solver_options = self.solver_options
+        if solver_options is None and solver.lower() == str(getattr(opt, 'solver', '')).lower():
+            solver_options = getattr(opt, 'solver_options', None)
+        t0 = time.perf_counter()
+        opt.MODEL.solve(solver=solver, options=opts, output=output, solver_options=solver_options)
+        return {
+            'backend': self.name,
+            'status': opt.MODEL.status.name,
+            'objective': opt.MODEL.objective_value,
+            'solve_time': opt.MODEL.solve_model_time,
+            'wall_time': time.perf_counter() - t0,
+            'nodes': opt.MODEL.num_nodes_used,
+            'bound': opt.MODEL.objective_estimation,
+            'zcap': installed_zcap(opt),
+        }
+
+
+class ScipBackend:
+    # xuat CPLEX LP (co rang buoc bac hai) qua CONVERT, giai bang SCIP cuc bo (pyscipopt), khong can license GAMS solver
+    def __init__(self, gap=0.0, time_limit=None, threads=None):
+        self.name = 'scip'
+        self.gap = gap
+        self.time_limit = time_limit
+        self.threads = threads
+
+    def supports(self, problem):
+        return True
+
+    def solve(self, opt, output=None):
+        if pyscipopt is None:
+            raise ImportError('Can cai pyscipopt de giai bang SCIP cuc bo: pip install pyscipopt')
+        t0 = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            files = export_model(opt.MODEL, tmp, ('lp',))
+            mapping = read_dict(os.path.join(tmp, 'dict.txt'))
+            m = pyscipopt.Model()
+            if output is None:
+                m.hideOutput()
+            m.readProblem(files['lp'])
+        m.setParam('limits/gap', self.gap)
+        if self.time_limit:
+            m.setParam('limits/time', self.time_limit)
+        if self.threads:
+            m.setParam('parallel/maxnthreads', self.threads)
+        t1 = time.perf_counter()
+        m.optimize()
+        solve_time = time.perf_counter() - t1
+
+        status = m.getStatus()
+        if m.getNSols() > 0:
+            sol = m.getBestSol()
+            load_levels(opt, {v.name: sol[v] for v in m.getVars()}, mapping, m.getObjVal())
+        return {
+            'backend': self.name,
+            'status': status,
+            'objective': m.getObjVal() if m.getNSols() > 0 else None,
+            'solve_time': solve_time,
+            'wall_time': time.perf_counter() - t0,
+            'nodes': m.getNNodes(),
+            'bound': m.getDualbound(),
+            'zcap': installed_zcap(opt) if m.getNSols() > 0 else {},
+        }
+
+
+class HighsBackend:
+    # xuat MPS, giai bang HiGHS cuc bo; HiGHS khong ho tro rang buoc bac hai nen chi dung cho mo hinh tuyen tinh (LP/MIP)
+    def __init__(self, gap=0.0, time_limit=None, threads=None):
+        self.name = 'highs'
+        self.gap = gap
+        self.time_limit = time_limit
+        self.threads = threads
+
+    def supports(self, problem):
+        return problem in LINEAR_PROBLEMS
+
+    def solve(self, opt, output=None):
+        if highspy is None:
+            raise ImportError('Can cai highspy de giai bang HiGHS cuc bo: pip install highspy')
+        if not self.supports(opt.MODEL.problem):
+            raise ValueError(f'HiGHS chi giai mo hinh tuyen tinh, mo hinh hien tai la {opt.MODEL.problem}')
+        t0 = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            files = export_model(opt.MODEL, tmp, ('mps',))
+            mapping = read_dict(os.path.join(tmp, 'dict.txt'))
+            h = highspy.Highs()
+            h.setOptionValue('output_flag', output is not None)
+            h.readModel(files['mps'])
+        h.setOptionValue('mip_rel_gap', self.gap)
+        if self.time_limit:
+            h.setOptionValue('time_limit', float(self.time_limit))
+        if self.threads:
+            h.setOptionValue('threads', self.threads)
+        t1 = time.perf_counter()
+        h.run()
+        solve_time = time.perf_counter() - t1
+
+        info = h.getInfo()
+        has_sol = info.primal_solution_status == 2
+        if has_sol:
+            names = [h.getColName(k)[1] for k in range(h.getNumCol())]
+            load_levels(opt, dict(zip(names, h.getSolution().col_value)), mapping, info.objective_function_value)
+        return {
+            'backend': self.name,
+            'status': h.modelStatusToString(h.getModelStatus()),
+            'objective': info.objective_function_value if has_sol else None,
+            'solve_time': solve_time,
+            'wall_time': time.perf_counter() - t0,
+            'nodes': info.mip_node_count,
+            'bound': info.mip_dual_bound if opt.MODEL.problem == Problem.MIP else info.objective_function_value,
+            'zcap': installed_zcap(opt) if has_sol else {},
+        }
+
+
+def get_backend(spec, **kwargs):
+    # 'gams' (solver trong config.json) / 'gams:<solver>' / '<solver GAMS>' -> GAMSPy; 'scip', 'highs' -> solver cuc bo qua file xuat
+    if spec == 'scip':
+        return ScipBackend(**kwargs)
+    if spec == 'highs':
+        return HighsBackend(**kwargs)
+    if spec in (None, 'gams'):
+        return GamsBackend(**kwargs)
+    return GamsBackend(spec.split(':', 1)[1] if spec.startswith('gams:') else spec, **kwargs)
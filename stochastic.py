@@ -0,0 +1,269 @@
+import os, sys
+import time
+import numpy as np
+import pandas as pd
+from gamspy import (
+    Parameter,
+    Variable,
+    Equation,
+    Sum,
+    Model,
+    Problem,
+    Sense,
+)
+
+from misocp2 import MISOCP
+from scenario import WorkerPool, worker_state
+from powerflow import PowerFlow, load_matrix
+from heuristic import zcap_to_qcap, invest_cost
+from montecarlo import sample_factors
+from solver import installed_zcap, solution_kind
+
+
+def scenario_loads(opt, n_scenario, seed=0, sigma=(0.1, 0.05, 0.02)):
+    # P, Q (bus, kich ban, gio) theo cung mo hinh nhieu cua montecarlo; kich ban dong xac suat
+    P, Q = load_matrix(opt)
+    rng = np.random.default_rng(seed)
+    factor = sample_factors(rng, opt.type_load, n_scenario, P.shape[1], *sigma)
+    return P[:, None, :] * factor, Q[:, None, :] * factor, np.full(n_scenario, 1 / n_scenario)
+
+
+def expected_cost(opt, zcap, P, Q, prob, pf=None):
+    # chi phi ky vong chinh xac (sweep theo lo moi kich ban) cua mot Zcap, cung don vi voi Eqs_Obj
+    pf = pf or PowerFlow(opt)
+    qcap = zcap_to_qcap(opt, zcap)
+    res = pf.solve(P=P, Q=Q - qcap[:, None, None], tol=1e-8)
+    invest = dict(zip(opt.id_cap, invest_cost(opt)))
+    invest_total = sum(invest[cap] for (bus, cap), z in zcap.items() if z > 0.5)
+    cost = opt.cost_A * opt.s_base * (res['loss'] @ pf.w_time) + invest_total
+    U = res['Usqr']
+    feasible = (U.min(axis=(0, 2)) >= opt.u_min**2 - 1e-6) & (U.max(axis=(0, 2)) <= opt.u_max**2 + 1e-6)
+    return {'objective': float(prob @ cost), 'feasible': bool(feasible.all()), 'violation_prob': float(prob @ ~feasible)}
+
+
+class ScenarioModel(MISOCP):
+    # mo hinh hai giai doan: Zcap/Qcap (giai doan 1) chung, dong cong suat (giai doan 2) theo tung kich ban
+    # TIME = (kich ban, gio), WTIME nhan xac suat kich ban -> Eqs_Obj la chi phi ky vong
+    # scenarios=None: dang mo rong (moi kich ban); mot kich ban + ph=True: bai toan con cua progressive hedging
+    def __init__(self, xlsx_file=None, json_file=None, n_scenario=10, scenarios=None, seed=0, sigma=(0.1, 0.05, 0.02),
+                 ph=False, cache_dir=None, working_directory=None):
+        super().__init__(xlsx_file, json_file, cache_dir, working_directory)
+        # gioi han cua define_Tighten suy ra tu loadprofile goc, khong dung cho tai theo kich ban
+        self.tighten = False
+        self.ph = ph
+        P, Q, prob = scenario_loads(self, n_scenario, seed, sigma)
+        self.scenarios = list(range(1, n_scenario + 1)) if scenarios is None else list(scenarios)
+        idx = [s - 1 for s in self.scenarios]
+        self.prob = prob[idx] / prob[idx].sum()
+
+        hours, w_time = list(self.time), list(self.w_time)
+        self.time = [f'{s}_{t}' for s in self.scenarios for t in hours]
+        self.w_time = [p * w for p in self.prob for w in w_time]
+        # loadprofile lap lai theo kich ban de PrfData cung kich thuoc TIME; tai thuc cua kich ban o fixed_load
+        # (load_matrix / PowerFlow cua warm_start 'greedy', Verify dung fixed_load)
+        for attr in ('res_prf', 'com_prf', 'ind_prf'):
+            setattr(self, attr, getattr(self, attr) * len(self.scenarios))
+        self.scen_P = P[:, idx, :].reshape(len(self.id_bus), -1)
+        self.scen_Q = Q[:, idx, :].reshape(len(self.id_bus), -1)
+        self.fixed_load = (self.scen_P, self.scen_Q)
+
+    def define_Parameter(self):
+        super().define_Parameter()
+        self.PHW = Parameter(
+            self.CONTAINER,
+            name='PHW',
+            domain=[self.BUS, self.CAP],
+            description='Nhan tu progressive hedging cua kich ban'
+        )
+        self.ZBAR = Parameter(
+            self.CONTAINER,
+            name='ZBAR',
+            domain=[self.BUS, self.CAP],
+            description='Trung binh Zcap cac kich ban'
+        )
+        self.RHO = Parameter(
+            self.CONTAINER,
+            name='RHO',
+            domain=self.CAP,
+            description='He so phat progressive hedging theo loai tu'
+        )
+
+    # LoadData lay truc tiep tu tai theo kich ban (khong con la BusData * PrfData)
+    def define_Load(self):
+        n_time = len(self.time)
+        df = pd.concat([
+            pd.DataFrame({
+                'BUS': np.repeat(self.id_bus, n_time),
+                'TIME': np.tile(self.time, len(self.id_bus)),
+                'BUS_attr': attr,
+                'value': arr.ravel(),
+            })
+            for attr, arr in (('PL', self.scen_P), ('QL', self.scen_Q))
+        ])
+        self.LoadData.setRecords(df[df['value'] != 0])
+
+        return True
+
+    def define_Obj(self):
+        super().define_Obj()
+        if not self.ph:
+            return
+        # OBJ giu chi phi kich ban; OBJ_PH = OBJ + W Z + rho/2 ||Z - Zbar||^2, voi Z nhi phan: Z^2 = Z -> tuyen tinh
+        self.OBJ_PH = Variable(
+            self.CONTAINER,
+            name='OBJ_PH',
+            type="free"
+        )
+        self.Eqs_PH = Equation(
+            self.CONTAINER,
+            name='Eqs_PH',
+        )
+        self.Eqs_PH[...] = (
+            self.OBJ_PH == self.OBJ + Sum(
+                self.CANDIDATE[self.BUS, self.CAP],
+                (self.PHW[self.BUS, self.CAP] + self.RHO[self.CAP] / 2 * (1 - 2 * self.ZBAR[self.BUS, self.CAP])) *
+                self.Zcap[self.BUS, self.CAP]
+            )
+        )
+
+    def define_Model(self):
+        if not self.ph:
+            return super().define_Model()
+        self.MODEL = Model(
+            self.CONTAINER,
+            name='Capacitor_Place_PH',
+            equations=self.CONTAINER.getEquations(),
+            sense=Sense.MIN,
+            objective=self.OBJ_PH,
+            problem=Problem.MIQCP
+        )
+
+        return True
+
+    def set_ph(self, w, zbar, rho):
+        # w, zbar: {(bus, cap): gia tri}; rho: {cap: gia tri}
+        self.PHW.setRecords([(b, c, v) for (b, c), v in w.items() if v != 0])
+        self.ZBAR.setRecords([(b, c, v) for (b, c), v in zbar.items() if v != 0])
+        self.RHO.setRecords([(c, v) for c, v in rho.items() if v != 0])
+
+        return True
+
+
+# moi tien trinh con giu cac ScenarioModel cua tap kich ban co dinh cua no (tao mot lan, cac vong PH chi cap nhat
+# PHW / ZBAR / RHO); WorkerPool pinned nen kich ban khong chuyen sang tien trinh khac
+def _scenario_model(s):
+    state = worker_state('misocp_scen')
+    models = state['models']
+    if s not in models:
+        workdir = os.path.join(state['workdir'], str(s))
+        os.makedirs(workdir, exist_ok=True)
+        opt = ScenarioModel(*state['args'], scenarios=[s], ph=True, working_directory=workdir, **state['kwargs'])
+        opt.build()
+        opt.opts.threads = state['threads']
+        opt.opts.listing_file = os.path.join(workdir, 'scenario.lst')
+        models[s] = opt
+    return models[s]
+
+
+def _solve_scenario(s, w, zbar, rho):
+    t0 = time.perf_counter()
+    opt = _scenario_model(s)
+    opt.set_ph(w, zbar, rho)
+    opt.MODEL.solve(solver=opt.solver, options=opt.opts, solver_options=opt.solver_options)
+    status, kind = opt.MODEL.status.name, solution_kind(opt.MODEL)
+    if kind is None:
+        return {'scenario': s, 'status': status, 'solve_time': time.perf_counter() - t0}
+    # bound: can duoi tot nhat cua solver (bang muc tieu khi toi uu), dung cho can duoi wait-and-see
+    return {'scenario': s, 'status': status, 'optimal': kind == 'optimal', 'cost': opt.OBJ.toValue(),
+            'bound': opt.MODEL.objective_estimation if kind == 'incumbent' else opt.MODEL.objective_value,
+            'installed': sorted(installed_zcap(opt)), 'solve_time': time.perf_counter() - t0}
+
+
+def solve_ph(xlsx_file=None, json_file=None, n_scenario=10, seed=0, sigma=(0.1, 0.05, 0.02), rho=1.0, max_iter=30,
+             tol=1e-3, gap_tol=1e-4, patience=5, cache_dir=None, max_workers=None, output=sys.stdout):
+    # progressive hedging: moi vong giai song song cac bai toan con theo kich ban, cap nhat Zbar va W_s += rho (Z_s - Zbar)
+    # can duoi: vong 0 (wait-and-see, bo rang buoc khong du doan); can tren: chi phi ky vong chinh xac (sweep)
+    # tot nhat trong cac Zcap da gap va Zbar lam tron
+    # dung khi: dong thuan (do lech <= tol), gap <= gap_tol, hoac PH lap vong voi Zcap nhi phan
+    # (patience vong khong co phuong an moi va can tren khong giam)
+    base = MISOCP(xlsx_file, json_file, cache_dir)
+    P, Q, prob = scenario_loads(base, n_scenario, seed, sigma)
+    pf = PowerFlow(base)
+    scenarios = list(range(1, n_scenario + 1))
+    keys = list(base.cand_list)
+    # rho theo chi phi dau tu tung loai tu (cung thang do voi muc tieu)
+    rho_cap = {c: rho * v for c, v in zip(base.id_cap, invest_cost(base))}
+    state = {'args': (xlsx_file, json_file),
+             'kwargs': {'n_scenario': n_scenario, 'seed': seed, 'sigma': sigma, 'cache_dir': cache_dir}}
+    # kich ban s luon giai o tien trinh (s - 1) % max_workers
+    pool = WorkerPool('misocp_scen', n_scenario, state, max_workers, pinned=True)
+
+    W = {s: {} for s in scenarios}
+    zbar, evaluated = {}, {}
+    best = {'ub': np.inf, 'zcap': None}
+    log, lb, t0 = [], None, time.perf_counter()
+    stall, stop = 0, 'max_iter'
+    try:
+        for it in range(max_iter + 1):
+            t1 = time.perf_counter()
+            results = pool.map(_solve_scenario, scenarios, [W[s] for s in scenarios], [zbar] * n_scenario,
+                               [rho_cap if it > 0 else {}] * n_scenario)
+            solve_time = time.perf_counter() - t1
+            failed = [res for res in results if 'cost' not in res]
+            if failed:
+                raise RuntimeError(f"Kich ban {failed[0]['scenario']} khong giai duoc: {failed[0]['status']}")
+            Z = {res['scenario']: {tuple(k) for k in res['installed']} for res in results}
+            if it == 0:
+                lb = float(sum(p * res['bound'] for p, res in zip(prob, results)))
+
+            zbar = {k: float(sum(p for p, s in zip(prob, scenarios) if k in Z[s])) for k in keys}
+            consensus = float(sum(p * sum(abs((k in Z[s]) - zbar[k]) for k in keys) for p, s in zip(prob, scenarios)))
+            for s in scenarios:
+                for k in keys:
+                    W[s][k] = W[s].get(k, 0.0) + rho_cap[k[1]] * ((k in Z[s]) - zbar[k])
+
+            # danh gia chinh xac cac Zcap moi (kich ban va Zbar lam tron)
+            stall += 1
+            for cand in list(Z.values()) + [{k for k, v in zbar.items() if v >= 0.5}]:
+                cand = frozenset(cand)
+                if cand not in evaluated:
+                    stall = 0
+                    evaluated[cand] = expected_cost(base, {k: 1 for k in cand}, P, Q, prob, pf)
+                    if evaluated[cand]['feasible'] and evaluated[cand]['objective'] < best['ub']:
+                        best = {'ub': evaluated[cand]['objective'], 'zcap': sorted(cand)}
+
+            gap = (best['ub'] - lb) / max(abs(best['ub']), 1e-9)
+            log.append({'iter': it, 'lb': lb, 'ub': best['ub'], 'gap': gap, 'consensus': consensus,
+                        'n_distinct': len({frozenset(z) for z in Z.values()}),
+                        'n_incumbent': sum(not res['optimal'] for res in results), 'solve_time': solve_time,
+                        'time': time.perf_counter() - t0})
+            if output:
+                print(f"  iter {it:>3}: LB={lb:.4f} UB={best['ub']:.4f} gap={gap:.2e} do lech={consensus:.3e} "
+                      f"phuong an={log[-1]['n_distinct']}", file=output)
+            if consensus <= tol:
+                stop = 'consensus'
+            elif gap <= gap_tol:
+                stop = 'gap'
+            elif stall >= patience:
+                stop = 'stall'
+            else:
+                continue
+            break
+    finally:
+        pool.shutdown()
+
+    return {'objective': best['ub'], 'lower_bound': lb, 'installed': best['zcap'], 'log': pd.DataFrame(log),
+            'stop': stop, 'wall_time': time.perf_counter() - t0}
+
+
+def main():
+    input_xlsx = r"D:\OAEM Lab\CodePy\Capacitor Place\ieee33.xlsx"
+    input_json = r"D:\OAEM Lab\CodePy\Capacitor Place\config.json"
+
+    res = solve_ph(input_xlsx, input_json)
+    print(f"\nChi phi ky vong: ${res['objective']:,.2f} (can duoi {res['lower_bound']:,.2f})")
+    print(f"Vi tri dat tu (bus, cap): {res['installed']}")
+
+
+if __name__ == '__main__':
+    main()
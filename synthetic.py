@@ -0,0 +1,147 @@
+import os
+import numpy as np
+import pandas as pd
+
+PATH_PY = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_XLSX = os.path.join(PATH_PY, 'ieee33.xlsx')
+
+SHEET_TAG = {
+    'bus': '##BusData',
+    'line': '##LineData',
+    'loadprofile': '##LoadProfile',
+    'capacitor': '##CapacitorData',
+}
+
+
+def write_sheet(writer, sheet, df):
+    # giu dung dinh dang sheet cua ieee33.xlsx: dong 0 la tag, dong 1 la header
+    pd.DataFrame([[SHEET_TAG[sheet]]]).to_excel(writer, sheet_name=sheet, header=False, index=False)
+    df.to_excel(writer, sheet_name=sheet, startrow=1, index=False)
+
+
+def read_template(template=TEMPLATE_XLSX):
+    return {sheet: pd.read_excel(template, sheet_name=sheet, header=1) for sheet in SHEET_TAG}
+
+
+def replicated_grid(tpl, n_bus):
+    # nhan ban li (khong tinh bus nguon) cua luoi mau, moi ban sao noi vao bus nguon
+    bus_df, line_df = tpl['bus'], tpl['line']
+    slack = int(bus_df.loc[bus_df['Code'] == 3, 'ID'].iloc[0])
+    base_bus = bus_df[bus_df['ID'] != slack]
+    n_base = len(base_bus)
+
+    bus_rows = [bus_df[bus_df['ID'] == slack]]
+    line_rows = []
+    offset = 0
+    while 1 + offset < n_bus:
+        mapping = {slack: slack}
+        for k, bus in enumerate(base_bus['ID']):
+            mapping[bus] = slack + 1 + offset + k
+        rep = base_bus.copy()
+        rep['ID'] = rep['ID'].map(mapping)
+        rep['Name'] = [f'Bus {i}' for i in rep['ID']]
+        bus_rows.append(rep)
+        #
+        rep = line_df.copy()
+        rep['FromBus'] = rep['FromBus'].map(mapping)
+        rep['ToBus'] = rep['ToBus'].map(mapping)
+        line_rows.append(rep)
+        offset += n_base
+
+    bus_out = pd.concat(bus_rows, ignore_index=True).head(n_bus)
+    line_out = pd.concat(line_rows, ignore_index=True)
+    line_out = line_out[line_out['ToBus'].isin(bus_out['ID'])].reset_index(drop=True)
+    line_out['ID'] = range(1, len(line_out) + 1)
+    return bus_out, line_out
+
+
+def random_grid(tpl, n_bus, seed=0, branch_size=None, p_extend=0.5):
+    # cay ngau nhien: moi nhanh chinh tu bus nguon co ~branch_size bus (mac dinh bang luoi mau) de dien ap khong sup qua muc
+    # bus moi noi tiep bus vua tao voi xac suat p_extend (nhanh dai), con lai noi vao bus bat ky trong cung nhanh
+    rng = np.random.default_rng(seed)
+    bus_df, line_df = tpl['bus'], tpl['line']
+    slack_row = bus_df[bus_df['Code'] == 3]
+    slack = int(slack_row['ID'].iloc[0])
+    load_rows = bus_df[bus_df['ID'] != slack].reset_index(drop=True)
+    branch_size = branch_size or len(load_rows)
+
+    parent = {}
+    members = []
+    for bus in range(slack + 1, slack + n_bus):
+        if not members or len(members) >= branch_size:
+            members = []
+            parent[bus] = slack
+        elif rng.random() < p_extend:
+            parent[bus] = members[-1]
+        else:
+            parent[bus] = members[rng.integers(len(members))]
+        members.append(bus)
+
+    buses = list(parent)
+    loads = load_rows.iloc[rng.integers(len(load_rows), size=len(buses))].reset_index(drop=True)
+    loads['ID'] = buses
+    loads['Name'] = [f'Bus {i}' for i in buses]
+    bus_out = pd.concat([slack_row, loads], ignore_index=True)
+
+    lines = line_df.iloc[rng.integers(len(line_df), size=len(buses))].reset_index(drop=True)
+    # nhanh noi vao bus nguon dung thong so duong truc cua luoi mau
+    trunk = line_df[(line_df['FromBus'] == slack) | (line_df['ToBus'] == slack)].iloc[0]
+    root = np.array([parent[b] == slack for b in buses])
+    for col in ('Type', 'R[Ohm]', 'X[Ohm]', 'Length[m]', 'rateA[kA]'):
+        lines.loc[root, col] = trunk[col]
+    lines['ID'] = range(1, len(buses) + 1)
+    lines['FromBus'] = [parent[b] for b in buses]
+    lines['ToBus'] = buses
+    return bus_out, lines
+
+
+def make_profile(tpl, hours=None, noise=0.0, seed=0):
+    # cat/lap lai bieu do phu tai mau theo so gio, noise: bien dong ngau nhien giua cac ngay (ti le)
+    prf_df = tpl['loadprofile']
+    if hours is None:
+        return prf_df
+    rng = np.random.default_rng(seed)
+    prf_df = prf_df.iloc[[k % len(prf_df) for k in range(hours)]].reset_index(drop=True)
+    prf_df['Time'] = range(1, hours + 1)
+    if noise:
+        n_day = -(-hours // 24)
+        for col in ('Residential', 'Commercial', 'Industrial'):
+            scale = np.repeat(1 + noise * rng.standard_normal(n_day), 24)[:hours]
+            prf_df[col] = (prf_df[col] * scale).clip(lower=0)
+    return prf_df
+
+
+def make_catalog(tpl, n_cap=None, step=None):
+    # danh muc tu bu: mac dinh lay tu luoi mau; step (kVAr) tao n_cap loai step, 2*step, ... gia noi suy theo luoi mau
+    cap_df = tpl['capacitor']
+    if step is None:
+        return cap_df.head(n_cap)
+    n_cap = n_cap or len(cap_df)
+    size = step * np.arange(1, n_cap + 1)
+    cost = np.interp(size, cap_df['Size[kVAr]'], cap_df['Cost[$/kVAr]'])
+    return pd.DataFrame({
+        'ID': range(1, n_cap + 1),
+        'Type': [f'Cap{int(s)}' for s in size],
+        'Size[kVAr]': size,
+        'Cost[$/kVAr]': cost,
+    })
+
+
+def make_feeder(xlsx_file, n_bus, hours=None, n_cap=None, template=TEMPLATE_XLSX, kind='replicated', seed=0,
+                noise=0.0, cap_step=None):
+    # ghi luoi tong hop theo dung dinh dang 4 sheet ma GetData.read_xlsx doc
+    tpl = read_template(template)
+    if kind == 'replicated':
+        bus_out, line_out = replicated_grid(tpl, n_bus)
+    elif kind == 'random':
+        bus_out, line_out = random_grid(tpl, n_bus, seed)
+    else:
+        raise ValueError(f'Kieu luoi khong hop le: {kind}')
+
+    with pd.ExcelWriter(xlsx_file, engine='openpyxl') as writer:
+        write_sheet(writer, 'bus', bus_out)
+        write_sheet(writer, 'line', line_out)
+        write_sheet(writer, 'loadprofile', make_profile(tpl, hours, noise, seed))
+        write_sheet(writer, 'capacitor', make_catalog(tpl, n_cap, cap_step))
+
+    return xlsx_file
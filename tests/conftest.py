@@ -0,0 +1,4 @@
+import os, sys
+
+# cac module nam o thu muc goc (khong dong goi) -> them vao sys.path cho pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
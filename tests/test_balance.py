@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from misocp2 import MISOCP
+
+PATH_PY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOURS = 2
+N_CAP = 3
+
+
+def levels(var):
+    # {(khoa, ...): level} theo ten phan tu (chuoi)
+    df = var.records
+    keys = df.iloc[:, :len(var.domain)].astype(str).itertuples(index=False, name=None)
+    return dict(zip(keys, df['level']))
+
+
+def test_reactive_balance_uses_qd(tmp_path):
+    # IEEE-33 cat con HOURS gio, N_CAP loai tu (vua license demo)
+    # Eqs141: Q vao - X*I2 = Q ra + QD - Qcap tai moi bus khong phai nguon
+    opt = MISOCP(os.path.join(PATH_PY, 'ieee33.xlsx'), os.path.join(PATH_PY, 'config.json'),
+                 cache_dir=str(tmp_path), working_directory=str(tmp_path))
+    for name in ('time', 'res_prf', 'com_prf', 'ind_prf', 'w_time'):
+        setattr(opt, name, getattr(opt, name)[:HOURS])
+    for name in ('id_cap', 'type_cap', 'Q_cap', 'cost_cap'):
+        setattr(opt, name, getattr(opt, name)[:N_CAP])
+    if hasattr(opt, 'get_candidate'):
+        opt.get_candidate()
+    opt.build()
+    opt.opts.listing_file = str(tmp_path / 'balance.lst')
+    opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+    assert opt.MODEL.status.name in ('OptimalGlobal', 'OptimalLocal')
+
+    qbrn, ibrn = levels(opt.Qbrn), levels(opt.Ibrn_sqr)
+    pd_, qd, qcap = levels(opt.PD), levels(opt.QD), levels(opt.Qcap)
+    x = {frozenset((str(f), str(t))): v for f, t, v in zip(opt.f_bus, opt.t_bus, opt.X_brn)}
+    residual = {'QD': [], 'PD': []}
+    for bus in map(str, opt.id_bus):
+        if bus == str(opt.id_slack):
+            continue
+        for t in map(str, opt.time):
+            q_in = sum(q - x[frozenset((f, b))] * ibrn[f, b, tt] for (f, b, tt), q in qbrn.items() if b == bus and tt == t)
+            q_out = sum(q for (f, b, tt), q in qbrn.items() if f == bus and tt == t)
+            for name, load in (('QD', qd), ('PD', pd_)):
+                residual[name].append(q_in - q_out - load.get((bus, t), 0.0) + qcap.get((bus,), 0.0))
+    assert np.abs(residual['QD']).max() < 1e-6
+    # can bang viet voi PD thi khong dong -> kiem tra phan biet duoc loi PD / QD
+    assert np.abs(residual['PD']).max() > 1e-3
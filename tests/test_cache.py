@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from misocp2 import GetData
+from cache import XlsxCache, load_xlsx
+
+CONFIG = os.path.join(PATH_PY, 'config.json')
+
+
+def read(xlsx_file, cache_dir, json_file=CONFIG):
+    # (lay tu cache?, du lieu) cua mot lan doc GetData
+    data = GetData(xlsx_file, json_file, cache_dir)
+    data.get_json()
+    return load_xlsx(data), data
+
+
+def test_cache_hit_returns_same_data(tmp_path):
+    xlsx_file = make_feeder(str(tmp_path / 'feeder.xlsx'), 33, hours=2)
+    hit, first = read(xlsx_file, str(tmp_path / 'cache'))
+    assert not hit
+    hit, second = read(xlsx_file, str(tmp_path / 'cache'))
+    assert hit
+    for name in GetData.XLSX_ATTRS:
+        np.testing.assert_equal(getattr(second, name), getattr(first, name), err_msg=name)
+    assert second.topo.parent.tolist() == first.topo.parent.tolist()
+
+
+def test_mtime_only_change_keeps_cache(tmp_path):
+    # khoa theo noi dung file: chi doi mtime (vd. mo roi luu lai khong sua) van dung cache
+    xlsx_file = make_feeder(str(tmp_path / 'feeder.xlsx'), 33, hours=2)
+    read(xlsx_file, str(tmp_path / 'cache'))
+    later = time.time() + 60
+    os.utime(xlsx_file, (later, later))
+    hit, _ = read(xlsx_file, str(tmp_path / 'cache'))
+    assert hit
+
+
+def test_content_change_invalidates_cache(tmp_path):
+    xlsx_file = str(tmp_path / 'feeder.xlsx')
+    make_feeder(xlsx_file, 33, hours=2)
+    _, old = read(xlsx_file, str(tmp_path / 'cache'))
+    make_feeder(xlsx_file, 33, hours=3)
+    hit, new = read(xlsx_file, str(tmp_path / 'cache'))
+    assert not hit
+    assert len(old.time) == 2 and len(new.time) == 3
+
+
+def test_base_change_invalidates_cache(tmp_path):
+    # du lieu luu da quy doi p.u. -> doi s_base / u_base trong config.json phai doc lai file.xlsx
+    xlsx_file = make_feeder(str(tmp_path / 'feeder.xlsx'), 33, hours=2)
+    _, old = read(xlsx_file, str(tmp_path / 'cache'))
+    with open(CONFIG, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['base']['s_base'] = 10
+    json_file = tmp_path / 'config.json'
+    json_file.write_text(json.dumps(config))
+    hit, new = read(xlsx_file, str(tmp_path / 'cache'), str(json_file))
+    assert not hit
+    assert new.pload[1] == pytest.approx(old.pload[1] / 10)
+
+
+def test_corrupt_cache_is_ignored(tmp_path):
+    xlsx_file = make_feeder(str(tmp_path / 'feeder.xlsx'), 33, hours=2)
+    _, data = read(xlsx_file, str(tmp_path / 'cache'))
+    cache = XlsxCache(xlsx_file, {'s_base': data.s_base, 'u_base': data.u_base}, GetData.XLSX_ATTRS,
+                      str(tmp_path / 'cache'))
+    with open(os.path.join(cache.path, 'meta.json'), 'w') as f:
+        f.write('{')
+    hit, again = read(xlsx_file, str(tmp_path / 'cache'))
+    assert not hit
+    assert again.pload == data.pload
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from misocp2 import parse_candidate
+
+ID_CAP = [1, 2, 3]
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, []),
+    (np.nan, []),
+    ('', []),
+    (0, []),
+    (0.0, []),
+    (1, ID_CAP),
+    (1.0, ID_CAP),
+    ('1', ID_CAP),
+    (2.0, [2]),
+    (np.int64(3), [3]),
+    ('2, 3', [2, 3]),
+    ('1,2,', [1, 2]),
+])
+def test_parse_candidate(value, expected):
+    assert parse_candidate(value, ID_CAP) == expected
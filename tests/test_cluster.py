@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from cluster import representative_periods, apply_clustering
+
+
+def year_profile(n_day, seed=0):
+    # bieu do phu tai gio (so gio, 3 loai tai): dang ngay co nhieu + muc tai thay doi theo ngay
+    rng = np.random.default_rng(seed)
+    hour = np.arange(24)
+    shape = np.column_stack([0.6 + 0.3 * np.sin((hour - 6) * np.pi / 12 + k) for k in range(3)])
+    level = 0.8 + 0.4 * rng.random((n_day, 1, 3))
+    return (shape[None] * level + 0.02 * rng.standard_normal((n_day, 24, 3))).reshape(-1, 3)
+
+
+@pytest.mark.parametrize('n_day', [365, 30])
+@pytest.mark.parametrize('method', ['kmeans', 'kmedoids'])
+def test_weights_sum_to_horizon(n_day, method):
+    # tong trong so = 8760 gio/nam, ke ca khi du lieu ngan hon mot nam
+    rep = representative_periods(year_profile(n_day), 4, method=method)
+    assert len(rep['weight']) == len(rep['profile'])
+    assert rep['weight'].sum() == pytest.approx(365 * 24)
+    # moi ngay dai dien co trong so = so ngay trong cum (quy doi ve nam)
+    days = np.bincount(rep['labels']) * 365 / n_day
+    assert rep['weight'][::24] == pytest.approx(days)
+
+
+@pytest.mark.parametrize('rep_days', [0, 3])
+def test_apply_clustering_keeps_horizon(rep_days):
+    prf = year_profile(60)
+    opt = SimpleNamespace(time=list(range(1, len(prf) + 1)), res_prf=prf[:, 0].tolist(), com_prf=prf[:, 1].tolist(),
+                          ind_prf=prf[:, 2].tolist(), rep_days=rep_days, cluster_method='kmeans')
+    apply_clustering(opt)
+    assert len(opt.w_time) == len(opt.time) == len(opt.res_prf)
+    assert sum(opt.w_time) == pytest.approx(365 * 24)
+    assert len(opt.time) == (rep_days or 60) * 24
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from misocp2 import MISOCP
+from export import RESULT_VARS, ParquetExport, export_result
+from solver import OPTIMAL_STATUS
+
+
+@pytest.fixture(scope='module')
+def solved(tmp_path_factory):
+    # IEEE-33 cat con 2 gio, 3 loai tu: vua license demo
+    tmp = str(tmp_path_factory.mktemp('export'))
+    xlsx_file = make_feeder(os.path.join(tmp, 'ieee33_2h.xlsx'), 33, hours=2, n_cap=3)
+    opt = MISOCP(xlsx_file, os.path.join(PATH_PY, 'config.json'), cache_dir=tmp, working_directory=tmp)
+    opt.build()
+    opt.opts.listing_file = os.path.join(tmp, 'export.lst')
+    opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+    assert opt.MODEL.status in OPTIMAL_STATUS
+    return opt, tmp
+
+
+def records(opt, attr):
+    # records cua bien, khoa doi ve str de so sanh voi file doc lai
+    df = getattr(opt, attr).records
+    keys = list(df.columns[:df.columns.get_loc('level')])
+    df = df.astype({key: str for key in keys})
+    return df.sort_values(keys).reset_index(drop=True), keys
+
+
+def test_xlsx_round_trip(solved):
+    opt, tmp = solved
+    out_dir = os.path.join(tmp, 'xlsx')
+    export_result(opt, out_dir, ('xlsx',))
+    sheets = pd.read_excel(os.path.join(out_dir, 'result.xlsx'), sheet_name=None)
+
+    for sheet, attr in RESULT_VARS.items():
+        expected, keys = records(opt, attr)
+        got = sheets[sheet].astype({key: str for key in keys}).sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got[keys], expected[keys])
+        np.testing.assert_allclose(got['level'], expected['level'], rtol=1e-12, atol=1e-12)
+    assert sheets['Objective']['Objective'][0] == pytest.approx(opt.OBJ.toValue())
+    assert len(sheets['Cap_Installed']) == int((opt.Zcap.records['level'] > 0.5).sum())
+
+
+@pytest.mark.parametrize('float32', [False, True])
+def test_parquet_round_trip(solved, float32):
+    pq = pytest.importorskip('pyarrow.parquet')
+    opt, tmp = solved
+    out_dir = os.path.join(tmp, f'parquet_{float32}')
+    # lo nho -> moi file co nhieu row group
+    ParquetExport(out_dir, float32=float32, chunk=7).write(opt)
+
+    for name, attr in RESULT_VARS.items():
+        expected, keys = records(opt, attr)
+        # thu muc TIME=<t> doc lai thanh cot TIME (hive partitioning)
+        got = pq.read_table(os.path.join(out_dir, name)).to_pandas()
+        got = got.astype({key: str for key in keys})[keys + ['level', 'marginal']]
+        got = got.sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got[keys], expected[keys])
+        rtol = 1e-6 if float32 else 0
+        np.testing.assert_allclose(got['level'], expected['level'], rtol=rtol, atol=1e-30)
+        np.testing.assert_allclose(got['marginal'], expected['marginal'], rtol=rtol, atol=1e-30)
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from misocp2 import MISOCP
+from powerflow import PowerFlow, model_levels
+from heuristic import zcap_to_qcap
+from solver import installed_zcap, OPTIMAL_STATUS
+
+
+@pytest.fixture(scope='module')
+def ieee33(tmp_path_factory):
+    # IEEE-33 (ieee33.xlsx) cat con 2 gio, 3 loai tu: vua gioi han license demo cua GAMS
+    tmp = tmp_path_factory.mktemp('ieee33')
+    xlsx_file = make_feeder(str(tmp / 'ieee33_2h.xlsx'), 33, hours=2, n_cap=3)
+    return xlsx_file, os.path.join(PATH_PY, 'config.json'), str(tmp)
+
+
+@pytest.fixture(scope='module')
+def solved(ieee33):
+    xlsx_file, json_file, workdir = ieee33
+    opt = MISOCP(xlsx_file, json_file, cache_dir=workdir, working_directory=workdir)
+    opt.build()
+    opt.opts.listing_file = os.path.join(workdir, 'ieee33.lst')
+    opt.MODEL.solve(solver=opt.solver, options=opt.opts)
+    assert opt.MODEL.status in OPTIMAL_STATUS
+    return opt
+
+
+def test_no_capacitor_base_case(ieee33):
+    xlsx_file, json_file, workdir = ieee33
+    opt = MISOCP(xlsx_file, json_file, cache_dir=workdir)
+    pf = PowerFlow(opt)
+    res = pf.solve()
+    assert res['converged']
+    # P nguon = tai + ton that; dien ap giam dan tu bus nguon
+    assert np.allclose(res['Pgen'], pf.P.sum(axis=0) + res['loss'])
+    assert np.all(res['Usqr'] <= opt.u_slack**2 + 1e-12)
+    assert np.isclose(np.sqrt(res['Usqr'][pf.topo.root]), opt.u_slack).all()
+
+
+def test_sweep_matches_miqcp(solved):
+    # noi long SOCP chat tai nghiem toi uu -> sweep voi cung Qcap cho lai dien ap, dong cong suat va ton that cua MIQCP
+    pf = PowerFlow(solved)
+    lv = model_levels(solved)
+    qcap = zcap_to_qcap(solved, installed_zcap(solved))
+    assert np.allclose(qcap, lv['qcap'], atol=1e-6)
+    res = pf.solve(qcap)
+    assert res['converged']
+    assert np.abs(res['Usqr'] - lv['Usqr']).max() < 1e-5
+    child = pf.topo.bfs_order[1:]
+    assert np.abs(res['Pbrn'][child] - lv['Pbrn'][child]).max() < 1e-5
+    assert np.abs(res['Qbrn'][child] - lv['Qbrn'][child]).max() < 1e-5
+    loss_model = (pf.R[:, None] * lv['Ibrn_sqr']).sum(axis=0)
+    assert np.allclose(res['loss'], loss_model, rtol=1e-4, atol=1e-9)
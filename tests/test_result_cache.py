@@ -0,0 +1,90 @@
+import os
+import json
+
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from misocp2 import MISOCP
+from cache import ResultCache
+from solver import OPTIMAL_STATUS
+
+
+def save(cache, key, kb, mtime):
+    # muc co kich thuoc ~kb KB, lan dung cuoi dat bang mtime cua meta.json
+    path = cache.save(key, {'status': 'OptimalGlobal', 'objective': 1.0, 'pad': 'x' * (kb << 10)})
+    os.utime(os.path.join(path, 'meta.json'), (mtime, mtime))
+    return path
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=1)
+    save(cache, 'a', 400, 1000)
+    save(cache, 'b', 400, 2000)
+    assert [os.path.basename(p) for _, _, p in cache.entries()] == ['a', 'b']
+
+    # doc 'a' -> 'a' thanh muc dung gan nhat, them 'c' vuot 1 MB -> xoa 'b'
+    assert cache.load('a')['objective'] == 1.0
+    save(cache, 'c', 400, 3000)
+    assert sorted(os.path.basename(p) for _, _, p in cache.entries()) == ['a', 'c']
+    assert cache.load('b') is None
+
+    # muc moi nhat luon duoc giu du vuot dung luong
+    save(cache, 'd', 1500, 4000)
+    assert [os.path.basename(p) for _, _, p in cache.entries()] == ['d']
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    path = save(cache, 'a', 1, 1000)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        f.write('{')
+    assert cache.load('a') is None
+
+
+@pytest.fixture(scope='module')
+def feeder(tmp_path_factory):
+    # IEEE-33 cat con 2 gio, 3 loai tu: vua license demo; cache ket qua bat trong config rieng
+    tmp = str(tmp_path_factory.mktemp('result_cache'))
+    xlsx_file = make_feeder(os.path.join(tmp, 'ieee33_2h.xlsx'), 33, hours=2, n_cap=3)
+    with open(os.path.join(PATH_PY, 'config.json'), encoding='utf-8') as f:
+        config = json.load(f)
+    config['result_cache'] = {'enabled': True, 'dir': os.path.join(tmp, 'rc'), 'max_mb': 64}
+    json_file = os.path.join(tmp, 'config.json')
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return xlsx_file, json_file, tmp
+
+
+def build(feeder):
+    xlsx_file, json_file, tmp = feeder
+    opt = MISOCP(xlsx_file, json_file, cache_dir=tmp, working_directory=tmp)
+    opt.build()
+    opt.opts.listing_file = os.path.join(tmp, 'result_cache.lst')
+    return opt
+
+
+def test_solve_hit_and_refresh(feeder):
+    first = build(feeder)
+    miss = first.Solve()
+    assert miss['cache'] == 'miss'
+    assert first.MODEL.status in OPTIMAL_STATUS
+    zcap = first.Zcap.records.copy()
+
+    # mo hinh moi cung du lieu: lay nghiem tu cache, khong goi solver
+    second = build(feeder)
+    hit = second.Solve()
+    assert hit['cache'] == 'hit'
+    assert (second.status, second.objective_value) == (miss['status'], miss['objective'])
+    assert second.Zcap.records['level'].tolist() == zcap['level'].tolist()
+
+    # refresh: giai lai va ghi de dung muc cu
+    cache = ResultCache(os.path.join(feeder[2], 'rc'))
+    (_, _, path), = cache.entries()
+    created = os.path.getmtime(os.path.join(path, 'meta.json'))
+    os.utime(os.path.join(path, 'meta.json'), (created - 100, created - 100))
+    fresh = second.Solve(refresh=True)
+    assert fresh['cache'] == 'miss'
+    assert second.MODEL.status in OPTIMAL_STATUS
+    assert fresh['objective'] == pytest.approx(miss['objective'])
+    (mtime, _, path_after), = cache.entries()
+    assert path_after == path and mtime > created - 100
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from scenario import ScenarioRunner
+
+
+@pytest.fixture(scope='module')
+def runner(tmp_path_factory):
+    # IEEE-33 cat con 2 gio, 3 loai tu: vua license demo; mot mo hinh dung chung cho moi kich ban
+    tmp = str(tmp_path_factory.mktemp('scenario'))
+    xlsx_file = make_feeder(os.path.join(tmp, 'ieee33_2h.xlsx'), 33, hours=2, n_cap=3)
+    return ScenarioRunner(xlsx_file, os.path.join(PATH_PY, 'config.json'), cache_dir=tmp, working_directory=tmp)
+
+
+def usqr_lower(opt):
+    df = opt.Usqr.records
+    return df.loc[df.iloc[:, 0].astype(str) != str(opt.id_slack), 'lower'].unique()
+
+
+def test_parameter_updates_between_solves(runner):
+    base = runner.solve({'name': 'base'})
+    assert base['status'] in ('OptimalGlobal', 'OptimalLocal')
+
+    # UMIN moi phai vao gioi han Usqr cua mo hinh da tao
+    tight = runner.solve({'name': 'tight', 'volt_lower': 0.96})
+    assert np.allclose(usqr_lower(runner.opt), 0.96**2)
+    assert tight['objective'] >= base['objective'] * (1 - 1e-5)
+
+    # tai tang -> ton that tang
+    heavy = runner.solve({'name': 'heavy', 'Residential': [1.2 * v for v in runner.base['Residential']]})
+    assert heavy['objective'] > base['objective']
+
+    # Y = 0: khong lap tu nao
+    none = runner.solve({'name': 'none', 'Y': 0, 'volt_lower': 0.9})
+    assert none['n_cap'] == 0
+
+    # kich ban rong tra mo hinh ve gia tri goc (cap nhat truoc khong con hieu luc)
+    again = runner.solve({'name': 'again'})
+    assert np.allclose(usqr_lower(runner.opt), runner.base['volt_lower']**2)
+    assert again['objective'] == pytest.approx(base['objective'], rel=1e-6)
+    assert again['installed'] == base['installed']
+
+
+def test_rejects_unknown_parameter(runner):
+    with pytest.raises(KeyError):
+        runner.apply({'not_a_parameter': 1})
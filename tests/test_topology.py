@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from topology import FeederTopology
+
+
+# 1 - 2 - 3 - 4, 2 - 5 - 6; nhanh (3, 2) va (6, 5) ghi nguoc chieu dong cong suat trong sheet line
+ID_BUS = [1, 2, 3, 4, 5, 6]
+F_BUS = [1, 3, 3, 2, 6]
+T_BUS = [2, 2, 4, 5, 5]
+
+
+@pytest.fixture
+def topo():
+    return FeederTopology(ID_BUS, F_BUS, T_BUS, 1)
+
+
+def test_parent_and_depth(topo):
+    assert topo.get_parent(1) == []
+    assert [topo.get_parent(bus)[0] for bus in (2, 3, 4, 5, 6)] == [1, 2, 3, 2, 5]
+    assert topo.depth.tolist() == [0, 1, 2, 3, 2, 3]
+    # bfs_order xep theo do sau, bat dau tu bus nguon
+    assert topo.bfs_order[0] == topo.root
+    assert np.all(np.diff(topo.depth[topo.bfs_order]) >= 0)
+
+
+def test_oriented_lines(topo):
+    f_bus, t_bus = topo.oriented()
+    assert list(zip(f_bus, t_bus)) == [(1, 2), (2, 3), (3, 4), (2, 5), (5, 6)]
+    assert topo.line_reversed.tolist() == [False, True, False, False, True]
+    # parent_line tro ve dong cua sheet line
+    assert [topo.parent_line[topo.pos[bus]] for bus in (2, 3, 4, 5, 6)] == [0, 1, 2, 3, 4]
+
+
+def test_paths_and_subtrees(topo):
+    assert topo.path_to_root(4) == [4, 3, 2, 1]
+    assert topo.path_lines(6) == [4, 3, 0]
+    assert sorted(topo.subtree(2)) == [2, 3, 4, 5, 6]
+    assert sorted(topo.get_child(2)) == [3, 5]
+    assert topo.in_subtree(6, 5) and not topo.in_subtree(4, 5)
+    assert topo.subtree_size().tolist() == [6, 5, 2, 1, 2, 1]
+    load = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+    assert topo.subtree_sum(load).tolist() == [15.0, 15.0, 5.0, 3.0, 9.0, 5.0]
+
+
+def test_rejects_non_radial():
+    with pytest.raises(ValueError):
+        FeederTopology([1, 2, 3], [1, 2, 3], [2, 3, 1], 1)
+    with pytest.raises(ValueError):
+        FeederTopology([1, 2, 3, 4], [1, 3, 4], [2, 4, 3], 1)
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+from synthetic import make_feeder, PATH_PY
+from misocp2 import MISOCP
+from solver import OPTIMAL_STATUS
+
+
+@pytest.fixture(scope='module')
+def frozen(tmp_path_factory):
+    # IEEE-33 cat con 2 gio, 3 loai tu: vua license demo; mo hinh dong bang voi LoadData la tham so thay doi
+    tmp = str(tmp_path_factory.mktemp('update'))
+    xlsx_file = make_feeder(os.path.join(tmp, 'ieee33_2h.xlsx'), 33, hours=2, n_cap=3)
+    opt = MISOCP(xlsx_file, os.path.join(PATH_PY, 'config.json'), cache_dir=tmp, working_directory=tmp)
+    opt.build()
+    opt.opts.listing_file = os.path.join(tmp, 'update.lst')
+    opt.Freeze()
+    return opt
+
+
+def test_frozen_resolve_after_update_load(frozen):
+    base = frozen.Solve()
+    assert frozen.MODEL.status in OPTIMAL_STATUS
+
+    # tai tang 20% chi cap nhat LoadData trong mo hinh dong bang -> ton that tang
+    frozen.PrfData.setRecords(
+        [(t, prf_type, 1.2 * prf) for prf_type, prfs in
+         (('Residential', frozen.res_prf), ('Industrial', frozen.ind_prf), ('Commercial', frozen.com_prf))
+         for t, prf in zip(frozen.time, prfs)]
+    )
+    frozen.update_Load()
+    assert frozen.frozen
+    heavy = frozen.Solve()
+    assert frozen.MODEL.status in OPTIMAL_STATUS
+    assert heavy['objective'] > base['objective']
+
+
+def test_update_profile_rejects_new_horizon(frozen):
+    res_prf = list(frozen.res_prf)
+    n = len(frozen.time) + 1
+    df = pd.DataFrame({'Time': [f't{k + 1}' for k in range(n)], 'Residential': [0.5] * n,
+                       'Commercial': [0.5] * n, 'Industrial': [0.5] * n})
+    with pytest.raises(ValueError):
+        frozen.update_profile(df)
+    assert frozen.res_prf == res_prf
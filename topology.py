@@ -0,0 +1,129 @@
+from collections import deque
+import numpy as np
+
+
+class FeederTopology:
+    # chi so cau truc luoi hinh tia, tao mot lan tu sheet line
+    def __init__(self, id_bus, f_bus, t_bus, id_slack):
+        self.id_bus = list(id_bus)
+        self.n_bus = len(self.id_bus)
+        self.n_line = len(f_bus)
+        self.pos = {bus: k for k, bus in enumerate(self.id_bus)}
+        self.root = self.pos[id_slack]
+
+        if self.n_line != self.n_bus - 1:
+            raise ValueError(f'Luoi khong hinh tia: {self.n_bus} bus, {self.n_line} nhanh')
+
+        f_pos = np.array([self.pos[b] for b in f_bus], dtype=np.int64)
+        t_pos = np.array([self.pos[b] for b in t_bus], dtype=np.int64)
+
+        # adjacency vo huong dang CSR
+        ends = np.concatenate([f_pos, t_pos])
+        others = np.concatenate([t_pos, f_pos])
+        lines = np.concatenate([np.arange(self.n_line)] * 2)
+        idx = np.argsort(ends, kind='stable')
+        adj_ptr = np.zeros(self.n_bus + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=self.n_bus), out=adj_ptr[1:])
+        adj_bus, adj_line = others[idx], lines[idx]
+
+        # BFS tu bus nguon: dinh huong nhanh cha -> con
+        self.parent = np.full(self.n_bus, -1, dtype=np.int64)
+        self.parent_line = np.full(self.n_bus, -1, dtype=np.int64)
+        self.depth = np.full(self.n_bus, -1, dtype=np.int64)
+        self.depth[self.root] = 0
+        order = []
+        queue = deque([self.root])
+        while queue:
+            u = queue.popleft()
+            order.append(u)
+            for k in range(adj_ptr[u], adj_ptr[u + 1]):
+                v = adj_bus[k]
+                if self.depth[v] < 0:
+                    self.depth[v] = self.depth[u] + 1
+                    self.parent[v] = u
+                    self.parent_line[v] = adj_line[k]
+                    queue.append(v)
+        if len(order) != self.n_bus:
+            raise ValueError(f'Luoi khong lien thong: {self.n_bus - len(order)} bus khong noi toi bus nguon')
+        self.bfs_order = np.array(order, dtype=np.int64)
+        # cac bus theo tung muc do sau (bfs_order da sap xep theo depth)
+        self.levels = np.split(self.bfs_order, np.cumsum(np.bincount(self.depth))[:-1])
+
+        # child CSR theo thu tu BFS
+        children = self.bfs_order[1:]
+        idx = np.argsort(self.parent[children], kind='stable')
+        self.child_idx = children[idx]
+        self.child_ptr = np.zeros(self.n_bus + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parent[children], minlength=self.n_bus), out=self.child_ptr[1:])
+
+        # nhanh theo huong dong cong suat (cha, con), giu thu tu dong cua sheet line
+        self.line_from = np.empty(self.n_line, dtype=np.int64)
+        self.line_to = np.empty(self.n_line, dtype=np.int64)
+        self.line_from[self.parent_line[children]] = self.parent[children]
+        self.line_to[self.parent_line[children]] = children
+        self.line_reversed = self.line_from != f_pos
+
+        # thu tu DFS (preorder): cay con cua u = preorder[tin[u]:tout[u]]
+        self.tin = np.zeros(self.n_bus, dtype=np.int64)
+        preorder = []
+        stack = [self.root]
+        while stack:
+            u = stack.pop()
+            self.tin[u] = len(preorder)
+            preorder.append(u)
+            stack.extend(self.child_idx[self.child_ptr[u]:self.child_ptr[u + 1]][::-1])
+        self.preorder = np.array(preorder, dtype=np.int64)
+        self.tout = self.tin + self.subtree_size()
+
+    def subtree_size(self):
+        size = np.ones(self.n_bus, dtype=np.int64)
+        for v in self.bfs_order[:0:-1]:
+            size[self.parent[v]] += size[v]
+        return size
+
+    # tong dai luong theo cay con (vd: tai phia sau moi bus), x co the la mang (bus, ...)
+    def subtree_sum(self, x):
+        acc = np.array(x, dtype=float, copy=True)
+        for v in self.bfs_order[:0:-1]:
+            acc[self.parent[v]] += acc[v]
+        return acc
+
+    # tra cuu theo ID bus
+    def get_parent(self, bus):
+        p = self.parent[self.pos[bus]]
+        return [] if p < 0 else [self.id_bus[p]]
+
+    def get_child(self, bus):
+        u = self.pos[bus]
+        return [self.id_bus[v] for v in self.child_idx[self.child_ptr[u]:self.child_ptr[u + 1]]]
+
+    def in_subtree(self, bus, root):
+        u, r = self.pos[bus], self.pos[root]
+        return self.tin[r] <= self.tin[u] < self.tout[r]
+
+    def subtree(self, bus):
+        u = self.pos[bus]
+        return [self.id_bus[v] for v in self.preorder[self.tin[u]:self.tout[u]]]
+
+    def path_to_root(self, bus):
+        path = []
+        u = self.pos[bus]
+        while u >= 0:
+            path.append(self.id_bus[u])
+            u = self.parent[u]
+        return path
+
+    def path_lines(self, bus):
+        lines = []
+        u = self.pos[bus]
+        while self.parent[u] >= 0:
+            lines.append(self.parent_line[u])
+            u = self.parent[u]
+        return lines
+
+    # danh sach nhanh (cha, con) theo ID bus, cung thu tu voi sheet line
+    def oriented(self):
+        return (
+            [self.id_bus[u] for u in self.line_from],
+            [self.id_bus[v] for v in self.line_to],
+        )